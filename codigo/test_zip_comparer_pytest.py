@@ -3,13 +3,33 @@ import os
 import zipfile
 import logging
 import sys
+from collections import Counter
 from unittest.mock import patch, MagicMock
 from datetime import datetime
 import tempfile
 import shutil
 import tkinter as tk
 from tkinter import ttk
-from zip_comparer_v0_4_5 import load_recent_zips, save_recent_zips, select_zip, compare, create_test_zips_if_not_exist, node_map, RECENT_ZIPS_1, RECENT_ZIPS_2, MAX_RECENT
+from zip_comparer_v0_4_5 import load_recent_zips, save_recent_zips, select_zip, compare, create_test_zips_if_not_exist, row_items, item_rows, path_items, clear_item_maps, RECENT_ZIPS_1, RECENT_ZIPS_2, MAX_RECENT
+import threading
+import subprocess
+import io
+import json
+import csv
+import base64
+import zlib
+import struct
+from zip_diff_engine import compare_zips, stream_diff, CompareCancelled, read_members, read_listing, read_sorted_listing, merge_listings
+from zip_diff_export import write_ndjson
+from zip_html_report import build_chunks, css_color
+from zip_cache import ListingCache, HashCache, ResultCache
+from zip_entry_store import pack_dos, unpack_dos
+from zip_content import compare_members, raw_streams_equal, can_compare_raw, ArchiveMapping
+import zip_comparer_v0_4_5
+import zip_diff_engine
+import zip_compare_cli
+import zip_columnar
+from zip_canvas_view import DiffCanvasView
 
 # Configuración de logging para los tests
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -42,14 +62,14 @@ def tk_env():
 @pytest.fixture
 def clean_globals():
     """Limpia las variables globales antes y después de cada test."""
-    global RECENT_ZIPS_1, RECENT_ZIPS_2, node_map
+    global RECENT_ZIPS_1, RECENT_ZIPS_2
     RECENT_ZIPS_1.clear()
     RECENT_ZIPS_2.clear()
-    node_map.clear()
+    clear_item_maps()
     yield
     RECENT_ZIPS_1.clear()
     RECENT_ZIPS_2.clear()
-    node_map.clear()
+    clear_item_maps()
 
 @pytest.fixture
 def create_zip(temp_dir):
@@ -125,7 +145,7 @@ def test_compare_identical_zips(tk_env, create_zip, clean_globals):
     assert len(items2) == 1, "Debería haber un item en tree2"
     assert tree1.item(items1[0])['tags'] == ('same',), "El archivo debería estar etiquetado como 'same'"
     assert tree2.item(items2[0])['tags'] == ('same',), "El archivo debería estar etiquetado como 'same'"
-    assert 'file.txt' in node_map, "node_map debería contener file.txt"
+    assert path_items('file.txt') == (items1[0], items2[0]), "Los mapas deberían contener file.txt"
 
 def test_compare_different_zips(tk_env, create_zip, clean_globals):
     """Prueba la comparación de ZIPs con diferencias."""
@@ -193,4 +213,576 @@ def test_logging_info_messages(tk_env, create_zip, clean_globals, caplog):
         "Total de miembros únicos: 1"
     ]
     for msg in expected:
-        assert msg in caplog.text, f"Mensaje INFO no encontrado: {msg}"
\ No newline at end of file
+        assert msg in caplog.text, f"Mensaje INFO no encontrado: {msg}"
+
+
+def test_compare_zips_headless(create_zip):
+    """Prueba el motor de comparación sin Tk: estados de archivo y agregados de directorio."""
+    zip1 = create_zip('test1.zip', {'dir/same.txt': 'Igual', 'dir/diff.txt': 'ZIP1', 'only1.txt': 'Solo en ZIP1'})
+    zip2 = create_zip('test2.zip', {'dir/same.txt': 'Igual', 'dir/diff.txt': 'ZIP2 distinto', 'only2.txt': 'Solo en ZIP2'})
+    result = compare_zips(zip1, zip2)
+    statuses = {e.path: e.status for e in result.entries}
+    assert statuses == {'dir/diff.txt': 'content_diff', 'dir/same.txt': 'same', 'only1.txt': 'only_zip1', 'only2.txt': 'only_zip2'}
+    assert result.dir_tags['dir/'] == {'content_diff': 1, 'same': 1}, "Agregado incorrecto para dir/"
+    assert result.dir_status('dir/') == 'dir_diff', "dir/ debería ser 'dir_diff'"
+
+
+def test_compare_zips_date_diff(temp_dir):
+    """Prueba que el motor detecta archivos con igual contenido y distinta fecha."""
+    paths = []
+    for name, date in (('a.zip', (2020, 1, 1, 0, 0, 0)), ('b.zip', (2021, 1, 1, 0, 0, 0))):
+        path = os.path.join(temp_dir, name)
+        with zipfile.ZipFile(path, 'w') as z:
+            z.writestr(zipfile.ZipInfo('file.txt', date), 'Contenido')
+        paths.append(path)
+    result = compare_zips(*paths)
+    assert [e.status for e in result.entries] == ['date_diff'], "file.txt debería ser 'date_diff'"
+    assert result.dir_status('') == 'dir_diff', "La raíz debería ser 'dir_diff'"
+
+
+def test_compare_zips_node_index(create_zip):
+    """Prueba el índice de nodos por ruta: directorios implícitos y padres antes que hijos."""
+    zip1 = create_zip('test1.zip', {'a/b/c.txt': 'C', 'a.txt': 'A'})
+    zip2 = create_zip('test2.zip', {'a/d.txt': 'D'})
+    result = compare_zips(zip1, zip2)
+    assert list(result.nodes) == ['a.txt', 'a/', 'a/b/', 'a/b/c.txt', 'a/d.txt']
+    assert result.children[''] == ['a.txt', 'a/'], "Hijos de la raíz incorrectos"
+    assert result.children['a/'] == ['a/b/', 'a/d.txt'], "Hijos de a/ incorrectos"
+    assert result.nodes['a/b/'].is_dir and result.nodes['a/b/'].name == 'b'
+
+
+def test_compare_lazy_load(tk_env, create_zip, clean_globals):
+    """Prueba que en modo perezoso solo se inserta el primer nivel y los hijos al expandir."""
+    root, tree1, tree2 = tk_env
+    zip1 = create_zip('test1.zip', {'dir/sub/file.txt': 'Contenido'})
+    zip2 = create_zip('test2.zip', {'dir/sub/file.txt': 'Contenido'})
+    with patch.object(zip_comparer_v0_4_5, 'LAZY_LOAD', True):
+        compare(zip1, zip2, tree1, tree2)
+    assert path_items('dir/') and not path_items('dir/sub/'), "Solo debería cargarse el primer nivel"
+    assert zip_comparer_v0_4_5.expand_lazy('dir/', tree1, tree2), "dir/ debería tener hijos pendientes"
+    assert path_items('dir/sub/'), "dir/sub/ debería cargarse al expandir dir/"
+    sub1, sub2 = path_items('dir/sub/')
+    assert tree1.item(sub1)['text'] == 'sub' and tree2.item(sub2)['text'] == 'sub'
+
+
+def test_item_maps_are_inverse(tk_env, create_zip, clean_globals):
+    """Prueba que los mapas entre filas e items se corresponden en ambos sentidos sin recorrer los árboles."""
+    root, tree1, tree2 = tk_env
+    zip1 = create_zip('test1.zip', {'a/b/c/hondo.txt': 'uno', 'raiz.txt': 'R'})
+    zip2 = create_zip('test2.zip', {'a/b/c/hondo.txt': 'dos'})
+    compare(zip1, zip2, tree1, tree2)
+    result = zip_comparer_v0_4_5.current_result
+    assert len(row_items) == len(result.nodes), "Cada nodo insertado tiene sus dos items"
+    for row, (item1, item2) in row_items.items():
+        assert item_rows[0][item1] == row and item_rows[1][item2] == row
+        assert tree1.item(item1)['text'] == result.entry(row).name
+    item1, item2 = path_items('a/b/c/hondo.txt')
+    assert tree1.parent(item1) == path_items('a/b/c/')[0] and tree2.parent(item2) == path_items('a/b/c/')[1]
+
+
+def test_canvas_view_expand_collapse(tk_env, create_zip):
+    """Prueba que la vista virtual solo mantiene las filas visibles al expandir y contraer."""
+    root, tree1, tree2 = tk_env
+    zip1 = create_zip('test1.zip', {'dir/sub/file.txt': 'Contenido', 'top.txt': 'Arriba'})
+    zip2 = create_zip('test2.zip', {'dir/sub/file.txt': 'Contenido'})
+    view = DiffCanvasView(root)
+    view.set_result(compare_zips(zip1, zip2))
+    assert view.rows == [('dir/', 0), ('top.txt', 0)], "Solo deberían verse las filas de primer nivel"
+    view.toggle(0)
+    view.toggle(1)
+    assert [path for path, depth in view.rows] == ['dir/', 'dir/sub/', 'dir/sub/file.txt', 'top.txt']
+    view.toggle(0)
+    assert view.rows == [('dir/', 0), ('top.txt', 0)], "Contraer dir/ debería ocultar sus descendientes"
+
+
+def test_compare_zips_progress_and_cancel(create_zip):
+    """Prueba el informe de progreso y la cancelación del motor."""
+    zip1 = create_zip('test1.zip', {'a.txt': 'AAAA', 'b.txt': 'BB'})
+    zip2 = create_zip('test2.zip', {'a.txt': 'AAAA'})
+    updates = []
+    compare_zips(zip1, zip2, progress=lambda *p: updates.append(p))
+    assert updates[-1] == (3, 3, 10, 10), "El último progreso debería cubrir las entradas de ambos ZIPs y todos los bytes"
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(CompareCancelled):
+        compare_zips(zip1, zip2, cancel=cancel)
+
+
+def test_compare_zips_verify_content_crc_collision(create_zip):
+    """Prueba que la verificación con hash detecta contenidos distintos con el mismo CRC-32."""
+    # 'plumless' y 'buckeroo' tienen el mismo tamaño y el mismo CRC-32
+    zip1 = create_zip('test1.zip', {'dir/collision.txt': 'plumless', 'dir/same.txt': 'Igual'})
+    zip2 = create_zip('test2.zip', {'dir/collision.txt': 'buckeroo', 'dir/same.txt': 'Igual'})
+    assert compare_zips(zip1, zip2).entries[0].status == 'same', "Sin verificación el CRC no distingue"
+    result = compare_zips(zip1, zip2, verify='hash', workers=2)
+    statuses = {e.path: e.status for e in result.entries}
+    assert statuses == {'dir/collision.txt': 'content_diff', 'dir/same.txt': 'same'}
+    assert result.dir_tags['dir/'] == {'content_diff': 1, 'same': 1}, "Los agregados deberían actualizarse"
+    assert result.entries[0].hash1 != result.entries[0].hash2, "Los hashes de collision.txt deberían diferir"
+
+
+def test_compare_members_first_difference(temp_dir):
+    """Prueba la comparación por bloques: desplazamiento de la primera diferencia y salida temprana."""
+    path = os.path.join(temp_dir, 'members.zip')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        z.writestr('a.bin', b'x' * 10000 + b'A' + b'y' * 5000)
+        z.writestr('b.bin', b'x' * 10000 + b'B' + b'y' * 5000)
+        z.writestr('c.bin', b'x' * 10000 + b'A' + b'y' * 5000)
+        z.writestr('short.bin', b'x' * 10000)
+    with zipfile.ZipFile(path) as z:
+        assert compare_members(z, 'a.bin', z, 'b.bin', chunk_size=4096) == 10000
+        assert compare_members(z, 'a.bin', z, 'c.bin', chunk_size=4096) is None
+        assert compare_members(z, 'a.bin', z, 'short.bin', chunk_size=4096) == 10000
+
+
+def test_compare_zips_verify_bytes(create_zip):
+    """Prueba la verificación byte a byte: colisión de CRC y desplazamiento de la diferencia."""
+    zip1 = create_zip('test1.zip', {'collision.txt': 'plumless', 'changed.txt': 'abcdef'})
+    zip2 = create_zip('test2.zip', {'collision.txt': 'buckeroo', 'changed.txt': 'abcXef'})
+    result = compare_zips(zip1, zip2, verify='bytes')
+    entries = {e.path: e for e in result.entries}
+    assert entries['collision.txt'].status == 'content_diff' and entries['collision.txt'].diff_offset == 0
+    assert entries['changed.txt'].diff_offset == 3, "La primera diferencia de changed.txt está en el byte 3"
+
+
+def test_raw_streams_equal(create_zip):
+    """Prueba la comparación de datos comprimidos con entradas en distintas posiciones del ZIP."""
+    zip1 = create_zip('test1.zip', {'a.txt': 'Contenido ' * 100, 'b.txt': 'Uno ' * 100})
+    zip2 = create_zip('test2.zip', {'pad/relleno.txt': 'Relleno', 'a.txt': 'Contenido ' * 100, 'b.txt': 'Dos ' * 100})
+    with zipfile.ZipFile(zip1) as z1, zipfile.ZipFile(zip2) as z2:
+        a1, a2 = z1.getinfo('a.txt'), z2.getinfo('a.txt')
+        b1, b2 = z1.getinfo('b.txt'), z2.getinfo('b.txt')
+    assert a1.header_offset != a2.header_offset
+    with ArchiveMapping(zip1) as map1, ArchiveMapping(zip2) as map2:
+        assert can_compare_raw(a1, a2) and raw_streams_equal(map1, a1, map2, a2), "a.txt debería ser idéntico"
+        assert can_compare_raw(b1, b2) and not raw_streams_equal(map1, b1, map2, b2), "b.txt debería diferir"
+
+
+def test_compare_zips_verify_stored_mmap(temp_dir):
+    """Prueba la verificación de entradas STORED sobre la proyección en memoria de los ZIPs."""
+    paths = []
+    for name, data in (('a.zip', b'0123456789' * 1000), ('b.zip', b'0123456789' * 500 + b'X' + b'0123456789' * 500)):
+        path = os.path.join(temp_dir, name)
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as z:
+            z.writestr('same.bin', b'S' * 3000)
+            z.writestr('data.bin', data)
+        paths.append(path)
+    result = compare_zips(*paths, verify='bytes')
+    entries = {e.path: e for e in result.entries}
+    assert entries['data.bin'].diff_offset == 5000, "La diferencia de data.bin está en el byte 5000"
+    assert entries['same.bin'].status == 'same' and entries['same.bin'].diff_offset is None
+    hashed = compare_zips(*paths, verify='hash')
+    assert {e.path: e.status for e in hashed.entries} == {'data.bin': 'content_diff', 'same.bin': 'same'}
+
+
+def test_read_members_fast_matches_zipfile(temp_dir):
+    """Prueba que el lector del directorio central coincide con zipfile (ZIP64 y datos antepuestos)."""
+    path = os.path.join(temp_dir, 'zip64.zip')
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as z:
+        with z.open('grande.bin', 'w', force_zip64=True) as f:
+            f.write(b'x' * 1000)
+        z.writestr('dir/', '')
+        z.writestr('dir/año.txt', 'Contenido')
+    assert read_members(path) == read_members(path, fast=False), "Listado ZIP64 distinto de zipfile"
+    prefixed = os.path.join(temp_dir, 'sfx.zip')
+    with open(path, 'rb') as src, open(prefixed, 'wb') as dst:
+        dst.write(b'MZ' + b'\0' * 1000 + src.read())
+    members = read_members(prefixed)
+    assert members == read_members(prefixed, fast=False), "Posiciones con datos antepuestos distintas de zipfile"
+    assert set(members) == {'grande.bin', 'dir/', 'dir/año.txt'}
+
+
+def test_read_members_wrapped_entry_count(temp_dir):
+    """Prueba que el directorio central se recorre por tamaño aunque el número de entradas dé la vuelta."""
+    path = os.path.join(temp_dir, 'wrapped.zip')
+    with zipfile.ZipFile(path, 'w') as z:
+        for name in ('a.txt', 'b/', 'b/c.txt'):
+            z.writestr(name, name)
+    with open(path, 'r+b') as f:
+        data = f.read()
+        # Sin ZIP64, 65537 entradas quedan como 1 en los dos contadores del EOCD (16 bits)
+        f.seek(data.rindex(b'PK\x05\x06') + 8)
+        f.write(struct.pack('<2H', 1, 1))
+    members = read_members(path)
+    assert set(members) == {'a.txt', 'b/', 'b/c.txt'}, "Se han perdido entradas al confiar en el EOCD"
+    assert members == read_members(path, fast=False)
+
+
+def test_listing_cache_hit_invalidation_and_eviction(temp_dir, create_zip):
+    """Prueba la caché de listados: aciertos, invalidación al cambiar el ZIP y expulsión LRU."""
+    cache = ListingCache(os.path.join(temp_dir, 'cache'))
+    zip1 = create_zip('test1.zip', {'a.txt': 'A'})
+    loads = []
+    loader = lambda: loads.append(1) or read_listing(zip1)
+    first = cache.load_listing(zip1, loader)
+    assert cache.load_listing(zip1, loader) == first and len(loads) == 1, "La segunda lectura debería salir de la caché"
+    create_zip('test1.zip', {'a.txt': 'A', 'b.txt': 'B'})
+    assert set(cache.load_listing(zip1, loader)) == {'a.txt', 'b.txt'} and len(loads) == 2, "El ZIP modificado debería releerse"
+    small = ListingCache(cache.directory, max_bytes=1)
+    zip2 = create_zip('test2.zip', {'c.txt': 'C'})
+    small.load_listing(zip2, lambda: read_listing(zip2))
+    assert cache.load_listing(zip1, loader) and len(loads) == 3, "El listado antiguo debería haberse expulsado"
+
+
+def test_hash_cache_reused_across_pairs(temp_dir, create_zip):
+    """Prueba la caché de hashes: un ZIP ya verificado no se vuelve a leer al compararlo con otro."""
+    cache = HashCache(os.path.join(temp_dir, 'cache'))
+    zip1 = create_zip('test1.zip', {'collision.txt': 'plumless'})
+    zip2 = create_zip('test2.zip', {'collision.txt': 'buckeroo'})
+    zip3 = create_zip('test3.zip', {'pad.txt': 'Relleno', 'collision.txt': 'buckeroo'})
+    with patch('zip_diff_engine.hash_member', wraps=zip_diff_engine.hash_member) as hashed:
+        first = compare_zips(zip1, zip2, verify='hash', hash_cache=cache)
+        assert hashed.call_count == 2
+        second = compare_zips(zip1, zip3, verify='hash', hash_cache=cache)
+        assert hashed.call_count == 3, "Solo debería calcularse el hash de test3.zip"
+        compare_zips(zip1, zip2, verify='hash', hash_cache=cache)
+        assert hashed.call_count == 3, "Todos los hashes deberían salir de la caché"
+    assert second.nodes['collision.txt'].status == 'content_diff'
+    assert second.nodes['collision.txt'].hash1 == first.nodes['collision.txt'].hash1
+    small = HashCache(cache.directory, max_entries=1)
+    small.store('huella', 'sha256', {(0, 1): 'a', (0, 2): 'b'})
+    assert len(small.load(zip1, 'sha256')[1]) + len(small.load(zip2, 'sha256')[1]) == 0, "Deberían quedar solo los más recientes"
+
+
+def test_stream_diff_flushes_hash_cache(temp_dir, create_zip):
+    """Prueba que al verificar en streaming los hashes nuevos se guardan por tandas, sin esperar al final."""
+    cache = HashCache(os.path.join(temp_dir, 'cache'))
+    # Mismo tamaño y CRC con distinto contenido: hay que calcular el hash de cada lado
+    zip1 = create_zip('test1.zip', {f'f{i}.txt': 'plumless' for i in range(6)})
+    zip2 = create_zip('test2.zip', {f'f{i}.txt': 'buckeroo' for i in range(6)})
+    with patch.object(zip_diff_engine, 'HASH_FLUSH_ENTRIES', 2):
+        entries = stream_diff(zip1, zip2, verify='hash', workers=1, hash_cache=cache)
+        for _ in range(3):
+            next(entries)
+        assert len(cache.load(zip1, 'sha256')[1]) >= 2, "Los hashes deberían guardarse antes de terminar"
+        assert [e.status for e in entries] == ['content_diff'] * 3
+    assert len(cache.load(zip1, 'sha256')[1]) == len(cache.load(zip2, 'sha256')[1]) == 6
+
+
+def test_unusable_cache_directory(temp_dir, create_zip):
+    """Prueba que un directorio de caché que no se puede crear solo desactiva la caché."""
+    blocker = os.path.join(temp_dir, 'archivo')
+    with open(blocker, 'w') as f:
+        f.write('no es un directorio')
+    bad_dir = os.path.join(blocker, 'cache')
+    zip1 = create_zip('test1.zip', {'a.txt': 'uno'})
+    zip2 = create_zip('test2.zip', {'a.txt': 'uno'})
+    result = compare_zips(zip1, zip2, verify='hash', cache=ListingCache(directory=bad_dir),
+                          hash_cache=HashCache(directory=bad_dir), result_cache=ResultCache(directory=bad_dir))
+    assert result.summary() == {'same': 1}
+    assert ResultCache(directory=bad_dir).load(zip1, zip2, 'listado')[1] is None
+
+
+def test_result_cache_reuse_and_invalidation(temp_dir, create_zip):
+    """Prueba la caché de resultados: reutilización sin abrir los ZIPs e invalidación al modificarlos."""
+    cache = ResultCache(os.path.join(temp_dir, 'cache'))
+    zip1 = create_zip('test1.zip', {'dir/same.txt': 'Igual', 'dir/diff.txt': 'ZIP1'})
+    zip2 = create_zip('test2.zip', {'dir/same.txt': 'Igual', 'dir/diff.txt': 'ZIP2 distinto', 'b.txt': 'B'})
+    first = compare_zips(zip1, zip2, result_cache=cache)
+    with patch('zip_diff_engine.read_sorted_listing', side_effect=AssertionError("No debería abrirse el ZIP")):
+        cached = compare_zips(zip1, zip2, result_cache=cache)
+    assert [(e.path, e.status, e.info1, e.info2) for e in cached.entries] == \
+        [(e.path, e.status, e.info1, e.info2) for e in first.entries]
+    assert cached.dir_tags == first.dir_tags and cached.children == first.children
+    create_zip('test2.zip', {'dir/same.txt': 'Igual', 'dir/diff.txt': 'ZIP1'})
+    assert compare_zips(zip1, zip2, result_cache=cache).summary() == {'same': 2}, "El ZIP modificado debería recompararse"
+
+
+def test_prewarm_caches(temp_dir, create_zip):
+    """Prueba la precarga: listados en caché, resultado de la última pareja y archivos inexistentes ignorados."""
+    cache_dir = os.path.join(temp_dir, 'cache')
+    zip1 = create_zip('test1.zip', {'a.txt': 'A'})
+    zip2 = create_zip('test2.zip', {'a.txt': 'B'})
+    missing = os.path.join(temp_dir, 'borrado.zip')
+    zip_comparer_v0_4_5.prewarm_caches([zip1, missing, zip2, zip1], (zip1, zip2),
+                                       ListingCache(cache_dir), ResultCache(cache_dir))
+    assert ListingCache(cache_dir).load_listing(zip1, lambda: pytest.fail("El listado debería estar en caché"))
+    with patch('zip_diff_engine.read_sorted_listing', side_effect=AssertionError("No debería abrirse el ZIP")):
+        assert compare_zips(zip1, zip2, result_cache=ResultCache(cache_dir)).summary() == {'content_diff': 1}
+    cancel = threading.Event()
+    cancel.set()
+    zip_comparer_v0_4_5.prewarm_caches([zip1], cancel=cancel, cache=ListingCache(os.path.join(temp_dir, 'otra')))
+    assert not os.path.exists(os.path.join(temp_dir, 'otra')), "La precarga cancelada no debería hacer nada"
+
+
+def test_cli_exit_codes(create_zip, temp_dir, capsys):
+    """Prueba la línea de comandos: códigos de salida, --fail-on y que no importa tkinter ni numpy."""
+    zip1 = create_zip('test1.zip', {'same.txt': 'Igual', 'only1.txt': 'Solo en ZIP1'})
+    zip2 = create_zip('test2.zip', {'same.txt': 'Igual'})
+    assert zip_compare_cli.main([zip1, zip1]) == zip_compare_cli.EXIT_SAME
+    assert zip_compare_cli.main([zip1, zip2, '--list']) == zip_compare_cli.EXIT_DIFFERENT
+    assert 'only_zip1\tonly1.txt' in capsys.readouterr().out
+    assert zip_compare_cli.main([zip1, zip2, '--fail-on', 'content_diff,only_zip2', '-q']) == zip_compare_cli.EXIT_SAME
+    assert zip_compare_cli.main([zip1, os.path.join(temp_dir, 'no_existe.zip')]) == zip_compare_cli.EXIT_ERROR
+    code = "import sys, zip_compare_cli; sys.exit(any(m in sys.modules for m in ('tkinter', 'sqlite3', 'numpy')))"
+    assert subprocess.run([sys.executable, '-c', code], cwd=os.path.dirname(zip_compare_cli.__file__)).returncode == 0
+
+
+def test_stream_diff_export(create_zip, temp_dir):
+    """Prueba la exportación en streaming: NDJSON/CSV con un registro por entrada y verificación en orden."""
+    zip1 = create_zip('test1.zip', {'a/collision.txt': 'plumless', 'b.txt': 'B', 'only1.txt': '1'})
+    zip2 = create_zip('test2.zip', {'a/collision.txt': 'buckeroo', 'b.txt': 'B'})
+    entries = list(stream_diff(zip1, zip2, verify='hash', workers=2))
+    assert [(e.path, e.status) for e in entries] == [('a/collision.txt', 'content_diff'), ('b.txt', 'same'), ('only1.txt', 'only_zip1')]
+    out = io.StringIO()
+    assert write_ndjson(stream_diff(zip1, zip2), out) == 3
+    first = json.loads(out.getvalue().splitlines()[0])
+    assert first['path'] == 'a/collision.txt' and first['size2'] == 8 and first['crc1'] == first['crc2']
+    output = os.path.join(temp_dir, 'diff.csv')
+    assert zip_compare_cli.main([zip1, zip2, '--format', 'csv', '-o', output, '-q', '--fail-on', 'only_zip2']) == 0
+    with open(output, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [r['status'] for r in rows] == ['same', 'same', 'only_zip1'] and rows[2]['size2'] == ''
+
+
+def test_export_zero_dos_date(temp_dir):
+    """Prueba que una entrada con fecha DOS cero (1980-00-00) se exporta sin error."""
+    zip1 = os.path.join(temp_dir, 'cero1.zip')
+    zip2 = os.path.join(temp_dir, 'cero2.zip')
+    for path in (zip1, zip2):
+        with zipfile.ZipFile(path, 'w') as z:
+            z.writestr(zipfile.ZipInfo('cero.txt', (1980, 0, 0, 0, 0, 0)), 'Contenido')
+    out = io.StringIO()
+    assert write_ndjson(stream_diff(zip1, zip2), out) == 1
+    record = json.loads(out.getvalue())
+    assert record['date1'] == record['date2'] == '1980-00-00T00:00:00'
+    assert record['status'] == 'same'
+
+
+def test_html_report_lazy_chunks(create_zip, temp_dir):
+    """Prueba el informe HTML: solo bloques comprimidos con los hijos de cada directorio, sin filas en el DOM."""
+    zip1 = create_zip('test1.zip', {'dir/sub/a.txt': 'A', 'dir/b.txt': 'B', 'only1.txt': '1'})
+    zip2 = create_zip('test2.zip', {'dir/sub/a.txt': 'A', 'dir/b.txt': 'B distinto'})
+    result = compare_zips(zip1, zip2)
+    chunks = [json.loads(zlib.decompress(base64.b64decode(c))) for c in build_chunks(result)]
+    assert [row[0] for row in chunks[0]] == ['dir', 'only1.txt'], "El bloque 0 son los hijos de la raíz"
+    assert chunks[0][1][1:3] == ['only_zip1', 'placeholder']
+    assert [row[0] for row in chunks[chunks[0][0][7]]] == ['b.txt', 'sub'], "dir/ debería apuntar a su bloque"
+    output = os.path.join(temp_dir, 'informe.html')
+    assert zip_compare_cli.main([zip1, zip2, '--html', output, '-q']) == zip_compare_cli.EXIT_DIFFERENT
+    with open(output, encoding='utf-8') as f:
+        page = f.read()
+    assert 'only1.txt' not in page and '<tbody id="rows"></tbody>' in page, "Las filas solo deberían crearse al expandir"
+    assert 'Directorio con Diferencias' in page and css_color('gray95') == '#f2f2f2'
+
+
+def test_merge_listings_sorted_join(temp_dir):
+    """Prueba el recorrido a la par de listados ordenados: orden, exclusivos y nombres repetidos."""
+    listing1 = [('a', 1), ('c', 3), ('d', 4)]
+    listing2 = [('b', 20), ('c', 30), ('e', 50)]
+    assert list(merge_listings(listing1, listing2)) == [
+        ('a', 1, None), ('b', None, 20), ('c', 3, 30), ('d', 4, None), ('e', None, 50)]
+    path = os.path.join(temp_dir, 'dup.zip')
+    with pytest.warns(UserWarning), zipfile.ZipFile(path, 'w') as z:
+        z.writestr('z.txt', 'Z')
+        z.writestr('a.txt', 'primero')
+        z.writestr('a.txt', 'último')
+    listing = read_sorted_listing(path)
+    assert [name for name, _ in listing] == ['a.txt', 'z.txt'], "Ordenado y sin repetidos"
+    assert listing[0][1][0] == len('último'.encode('utf-8')), "Como getinfo(), gana la última entrada repetida"
+
+
+def test_detect_moves(temp_dir):
+    """Prueba la detección de archivos movidos y renombrados por (tamaño, CRC) y su confirmación."""
+    zip1 = os.path.join(temp_dir, 'moves1.zip')
+    zip2 = os.path.join(temp_dir, 'moves2.zip')
+    with zipfile.ZipFile(zip1, 'w') as z:
+        z.writestr('src/util.py', 'def util(): pass\n')
+        z.writestr('docs/old_name.txt', 'Documentación\n')
+        z.writestr('empty.txt', '')
+        z.writestr('a/plumless', 'plumless')
+    with zipfile.ZipFile(zip2, 'w') as z:
+        z.writestr('lib/util.py', 'def util(): pass\n')
+        z.writestr('docs/new_name.txt', 'Documentación\n')
+        z.writestr('other/empty.txt', '')
+        z.writestr('b/buckeroo', 'buckeroo')  # Mismo tamaño y CRC32 que 'plumless'
+    result = compare_zips(zip1, zip2, moves='crc')
+    nodes = result.nodes
+    assert nodes['src/util.py'].status == 'moved' and nodes['src/util.py'].counterpart == 'lib/util.py'
+    assert nodes['lib/util.py'].counterpart == 'src/util.py'
+    assert nodes['docs/new_name.txt'].counterpart == 'docs/old_name.txt', "Renombrado en el mismo directorio"
+    assert nodes['empty.txt'].status == 'only_zip1', "Los archivos vacíos no se emparejan"
+    assert nodes['b/buckeroo'].counterpart == 'a/plumless', "Solo tamaño y CRC: la colisión se acepta"
+    assert result.dir_tags['src/']['moved'] == 1 and result.dir_tags['src/']['only_zip1'] == 0
+    assert nodes['lib/util.py'].side_tag(1) == 'placeholder' and nodes['lib/util.py'].side_tag(2) == 'moved'
+    confirmed = compare_zips(zip1, zip2, moves='hash')
+    assert confirmed.nodes['a/plumless'].status == 'only_zip1', "El hash descarta la colisión de CRC"
+    assert confirmed.nodes['src/util.py'].counterpart == 'lib/util.py'
+    assert compare_zips(zip1, zip2).nodes['src/util.py'].status == 'only_zip1', "Sin moves no se detectan"
+
+
+def test_detect_similar_moves(temp_dir):
+    """Prueba el emparejamiento por similitud MinHash de textos renombrados con pequeñas ediciones."""
+    words = [f"palabra{i}" for i in range(400)]
+    original = ' '.join(words)
+    edited = ' '.join('cambio' if i % 80 == 40 else word for i, word in enumerate(words))
+    zip1 = os.path.join(temp_dir, 'similar1.zip')
+    zip2 = os.path.join(temp_dir, 'similar2.zip')
+    with zipfile.ZipFile(zip1, 'w') as z:
+        z.writestr('src/modulo.py', original)
+        z.writestr('src/otro.txt', ' '.join(f"otro{i}" for i in range(400)))
+        z.writestr('imagen.bin', b'\0' + original.encode())
+    with zipfile.ZipFile(zip2, 'w') as z:
+        z.writestr('lib/modulo_nuevo.py', edited)
+        z.writestr('lib/distinto.txt', ' '.join(f"distinto{i}" for i in range(400)))
+        z.writestr('imagen2.bin', b'\0' + edited.encode())
+    assert compare_zips(zip1, zip2, moves='crc').nodes['src/modulo.py'].status == 'only_zip1'
+    result = compare_zips(zip1, zip2, moves='similar')
+    moved = result.nodes['src/modulo.py']
+    assert moved.status == 'moved' and moved.counterpart == 'lib/modulo_nuevo.py'
+    assert 0.8 <= moved.similarity < 1
+    assert result.nodes['lib/modulo_nuevo.py'].counterpart == 'src/modulo.py'
+    assert '% similar' in result.nodes['lib/modulo_nuevo.py'].move_note()
+    assert result.nodes['src/otro.txt'].status == 'only_zip1', "Los textos distintos no se emparejan"
+    assert result.nodes['imagen.bin'].status == 'only_zip1', "Los binarios no se resumen"
+    strict = compare_zips(zip1, zip2, moves='similar', similarity=1.0)
+    assert strict.nodes['src/modulo.py'].status == 'only_zip1', "El umbral limita las parejas"
+    with patch.object(zip_diff_engine, 'SKETCH_PROCESS_MIN_BYTES', 0):
+        in_processes = compare_zips(zip1, zip2, moves='similar', workers=2)
+    assert in_processes.nodes['src/modulo.py'].similarity == moved.similarity, "Los procesos dan los mismos sketches"
+
+
+def test_sketch_reads_bounded(create_zip):
+    """Prueba que los textos se leen por tandas: no se leen todos antes de calcular el primer sketch."""
+    zip1 = create_zip('sketch1.zip', {f'viejo/f{i}.txt': f'texto numero {i} con varias palabras' for i in range(20)})
+    zip2 = create_zip('sketch2.zip', {'nuevo.txt': 'otro texto distinto'})
+    member_text, text_sketch = zip_diff_engine.member_text, zip_diff_engine.text_sketch
+    reads, first_sketch = [], []
+    def sketch(data):
+        first_sketch.append(first_sketch[0] if first_sketch else len(reads))
+        return text_sketch(data)
+    with patch.object(zip_diff_engine, 'member_text', side_effect=lambda *a: reads.append(1) or member_text(*a)), \
+            patch.object(zip_diff_engine, 'text_sketch', side_effect=sketch):
+        compare_zips(zip1, zip2, moves='similar', workers=1)
+    assert len(reads) == 21 and first_sketch[0] <= 4, "Se han leído todos los textos antes de resumir el primero"
+
+def test_aggregate_dirs_counts_and_bytes(create_zip):
+    """Prueba los agregados de abajo arriba: recuentos anidados, bytes de cada lado y texto de cambios."""
+    zip1 = create_zip('agg1.zip', {'a/b/c.txt': 'uno', 'a/b/d.txt': 'igual', 'a/e.txt': 'borrado', 'a/vacio/': ''})
+    zip2 = create_zip('agg2.zip', {'a/b/c.txt': 'otro distinto', 'a/b/d.txt': 'igual', 'a/f.txt': 'nuevo'})
+    result = compare_zips(zip1, zip2)
+    assert result.dir_tags['a/b/'] == {'content_diff': 1, 'same': 1}
+    assert result.dir_tags['a/'] == {'content_diff': 1, 'same': 1, 'only_zip1': 1, 'only_zip2': 1}
+    assert result.dir_tags[''] == result.dir_tags['a/'], "La raíz suma todo el árbol"
+    assert 'a/vacio/' not in result.dir_tags and result.dir_bytes['a/vacio/'] == (0, 0)
+    assert result.dir_bytes['a/b/'] == (len('uno') + len('igual'), len('otro distinto') + len('igual'))
+    assert result.dir_bytes['a/'][0] == len('uno') + len('igual') + len('borrado')
+    assert result.dir_changes('a/') == '1 cambiados / 1 añadidos / 1 eliminados'
+    assert result.dir_changes('a/vacio/') == ''
+    assert result.summary() == {'content_diff': 1, 'same': 1, 'only_zip1': 1, 'only_zip2': 1}
+
+
+def test_odd_member_names_with_moves(temp_dir):
+    """Prueba nombres con barra inicial o doble y componentes '.' al cambiar estados (movidos)."""
+    names = ('/abs/x', 'a//b', 'x/./y', '//', 'igual.txt')
+    zip1 = os.path.join(temp_dir, 'raros1.zip')
+    zip2 = os.path.join(temp_dir, 'raros2.zip')
+    with zipfile.ZipFile(zip1, 'w') as z:
+        for name in names:
+            z.writestr(zipfile.ZipInfo(name), f'datos {name}')
+    with zipfile.ZipFile(zip2, 'w') as z:
+        for name in names[:3]:
+            z.writestr(zipfile.ZipInfo(name + '_nuevo'), f'datos {name}')
+        z.writestr(zipfile.ZipInfo('igual.txt'), 'datos igual.txt')
+    result = compare_zips(zip1, zip2, moves='crc')
+    assert result.nodes['a//b'].counterpart == 'a//b_nuevo'
+    assert result.nodes['x/./y'].status == 'moved' and +result.dir_tags['x/'] == {'moved': 2}
+    assert result.summary() == {'moved': 6, 'same': 1}, "Los recuentos de la raíz siguen cuadrando"
+
+
+def test_merkle_dir_hashes_and_moved_dirs(temp_dir):
+    """Prueba los hashes de Merkle: subárboles idénticos en O(1) y directorios movidos como una pareja."""
+    files = {f'pkg/sub/f{i}.txt': f'contenido {i}' for i in range(5)}
+    files['pkg/raiz.txt'] = 'raíz'
+    zip1 = os.path.join(temp_dir, 'merkle1.zip')
+    zip2 = os.path.join(temp_dir, 'merkle2.zip')
+    with zipfile.ZipFile(zip1, 'w') as z:
+        for name, data in files.items():
+            z.writestr(name, data)
+            z.writestr('igual/' + name, data)
+    with zipfile.ZipFile(zip2, 'w') as z:
+        for name, data in files.items():
+            z.writestr('nuevo/' + name, data)
+            z.writestr('igual/' + name, data)
+    result = compare_zips(zip1, zip2, moves='crc')
+    assert result.same_subtree('igual/') and not result.same_subtree('')
+    assert result.dir_hashes['pkg/'][1] is None and result.dir_hashes['pkg/'][0] == result.dir_hashes['nuevo/pkg/'][1]
+    assert result.moved_dirs == [('pkg/', 'nuevo/pkg/')], "Solo se empareja el directorio más externo"
+    assert result.nodes['pkg/sub/'].counterpart == 'nuevo/pkg/sub/'
+    assert result.nodes['pkg/sub/f3.txt'].counterpart == 'nuevo/pkg/sub/f3.txt'
+    assert result.present(result.nodes['pkg/'], 1) and not result.present(result.nodes['pkg/'], 2)
+    assert result.summary() == {'moved': 12, 'same': 6}
+    cache = ResultCache(directory=temp_dir)
+    compare_zips(zip1, zip2, moves='crc', result_cache=cache)
+    cached = compare_zips(zip1, zip2, moves='crc', result_cache=cache)
+    assert cached.moved_dirs == result.moved_dirs and cached.nodes['nuevo/pkg/'].counterpart == 'pkg/'
+    # n/ coincide con d/, pero contiene n/x/, ya emparejado con c/: no se vuelve a emparejar
+    nested1 = os.path.join(temp_dir, 'nested1.zip')
+    nested2 = os.path.join(temp_dir, 'nested2.zip')
+    with zipfile.ZipFile(nested1, 'w') as z:
+        z.writestr('c/f.txt', 'F')
+        z.writestr('d/x/f.txt', 'F')
+    with zipfile.ZipFile(nested2, 'w') as z:
+        z.writestr('n/x/f.txt', 'F')
+    assert compare_zips(nested1, nested2, moves='crc').moved_dirs == [('c/', 'n/x/')]
+
+
+def test_entry_store_compact_rows(create_zip):
+    """Prueba el almacén por columnas: componentes internados, búsqueda por ruta y vistas que escriben en él."""
+    assert unpack_dos(pack_dos((2024, 2, 29, 23, 59, 58))) == (2024, 2, 29, 23, 59, 58)
+    files = {f'd{i}/comun.txt': f'texto {i}' for i in range(4)}
+    zip1 = create_zip('store1.zip', files)
+    zip2 = create_zip('store2.zip', dict(files, **{'d0/comun.txt': 'otro', 'nuevo.txt': 'N'}))
+    result = compare_zips(zip1, zip2)
+    store = result.store
+    assert store.components.count('comun.txt') == 1, "Los nombres repetidos se guardan una vez"
+    assert [store.path(store.find(p)) for p in ('d2/', 'd2/comun.txt')] == ['d2/', 'd2/comun.txt']
+    assert store.find('d2/otro.txt') is None and 'd9/' not in result.nodes
+    entry = result.nodes['d0/comun.txt']
+    assert entry.status == 'content_diff' and entry.info2.file_size == len('otro')
+    assert entry.info1.date_time == unpack_dos(pack_dos(entry.info1.date_time))
+    result.nodes['d1/comun.txt'].counterpart = 'x.txt'
+    assert result.entries[1].path == 'd1/comun.txt' and result.entries[1].counterpart == 'x.txt'
+    assert [e.name for e in result.child_entries('')] == ['d0', 'd1', 'd2', 'd3', 'nuevo.txt']
+    assert store.nbytes() < 100 * len(store), "Las columnas ocupan pocos bytes por fila"
+
+
+def _columnar_zips(temp_dir):
+    """Crea dos ZIP con fechas fijas para las pruebas por columnas y devuelve sus rutas."""
+    paths = []
+    for name, files in (('col1.zip', {'a/igual.txt': ('x', 0), 'a/fecha.txt': ('y', 0), 'b/c/otro.txt': ('z', 0)}),
+                        ('col2.zip', {'a/igual.txt': ('x', 0), 'a/fecha.txt': ('y', 2), 'b/c/otro.txt': ('zz', 0),
+                                      'nuevo.txt': ('n', 0)})):
+        paths.append(os.path.join(temp_dir, name))
+        with zipfile.ZipFile(paths[-1], 'w') as z:
+            for member, (data, seconds) in files.items():
+                z.writestr(zipfile.ZipInfo(member, (2020, 1, 2, 3, 4, 6 + seconds)), data)
+    return paths
+
+
+def test_columnar_python(temp_dir):
+    """Prueba la clasificación, los agregados y las fechas por columnas con los recorridos en Python."""
+    with patch.object(zip_columnar, '_np', False):
+        result = compare_zips(*_columnar_zips(temp_dir))
+        dates = result.format_dates(result.entries)
+    assert [e.status for e in result.entries] == ['date_diff', 'same', 'content_diff', 'only_zip2']
+    assert +result.dir_tags[''] == Counter(date_diff=1, same=1, content_diff=1, only_zip2=1)
+    assert result.dir_bytes['a/'] == (2, 2) and result.dir_bytes['b/'] == (1, 2)
+    assert dates[0] == ('2020-01-02 03:04:06', '2020-01-02 03:04:08')
+    assert dates[-1] == ('', '2020-01-02 03:04:06')
+
+
+def test_columnar_backends_agree(temp_dir):
+    """Prueba que la clasificación, los agregados y las fechas con NumPy coinciden con los de Python."""
+    pytest.importorskip('numpy')
+    paths = _columnar_zips(temp_dir)
+    with patch.object(zip_columnar, 'NUMPY_MIN_ROWS', 0):
+        assert zip_columnar.backend() == 'numpy'
+        result = compare_zips(*paths)
+        dates = result.format_dates(result.entries)
+    fallback = compare_zips(*paths)
+    assert zip_columnar.backend(len(fallback.store)) == 'python', "Las comparaciones pequeñas no usan NumPy"
+    assert [e.status for e in result.entries] == [e.status for e in fallback.entries]
+    assert (fallback.dir_tags, fallback.dir_bytes, fallback.dir_hashes) == (result.dir_tags, result.dir_bytes,
+                                                                             result.dir_hashes)
+    assert dates == fallback.format_dates(fallback.entries)
@@ -7,7 +7,7 @@ from unittest.mock import patch, MagicMock
 from datetime import datetime
 import tempfile
 import shutil
-from zip_comparer_v0_4_5 import load_recent_zips, save_recent_zips, select_zip, compare, create_test_zips_if_not_exist, node_map, RECENT_ZIPS_1, RECENT_ZIPS_2, MAX_RECENT
+from zip_comparer_v0_4_5 import load_recent_zips, save_recent_zips, select_zip, compare, create_test_zips_if_not_exist, path_items, clear_item_maps, RECENT_ZIPS_1, RECENT_ZIPS_2, MAX_RECENT
 import tkinter as tk
 from tkinter import ttk
 
@@ -35,10 +35,10 @@ class TestZipComparator(unittest.TestCase):
             tree.tag_configure('placeholder', background='gray95', foreground='gray50')
             tree.tag_configure('dir_diff', background='lightcoral')
         # Limpiar listas globales
-        global RECENT_ZIPS_1, RECENT_ZIPS_2, node_map
+        global RECENT_ZIPS_1, RECENT_ZIPS_2
         RECENT_ZIPS_1.clear()
         RECENT_ZIPS_2.clear()
-        node_map.clear()
+        clear_item_maps()
 
     def tearDown(self):
         """Limpia el entorno después de cada test."""
@@ -116,7 +116,7 @@ class TestZipComparator(unittest.TestCase):
         self.assertEqual(len(items2), 1, "Debería haber un item en tree2")
         self.assertEqual(self.tree1.item(items1[0])['tags'], ('same',), "El archivo debería estar etiquetado como 'same'")
         self.assertEqual(self.tree2.item(items2[0])['tags'], ('same',), "El archivo debería estar etiquetado como 'same'")
-        self.assertIn('file.txt', node_map, "node_map debería contener file.txt")
+        self.assertEqual(path_items('file.txt'), (items1[0], items2[0]), "Los mapas deberían contener file.txt")
 
     def test_compare_different_zips(self):
         """Prueba la comparación de ZIPs con diferencias."""
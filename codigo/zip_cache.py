@@ -0,0 +1,302 @@
+# Caché persistente del comparador de ZIP
+#
+# Descripción:
+# Guarda en disco (SQLite en el directorio de caché del usuario) datos costosos de obtener de
+# archivos ZIP que se comparan una y otra vez, identificados por una huella del archivo.
+# - Huella de un ZIP: ruta, tamaño, fecha de modificación y hash del final del archivo (EOCD).
+# - Listados del directorio central: al reabrir un ZIP sin cambios no se vuelve a analizar.
+# - Hashes de contenido de las entradas, por huella del ZIP, posición y CRC de la entrada: se
+#   reutilizan aunque el ZIP se compare después con otro distinto.
+# - Resultados completos de comparar dos ZIPs, por las huellas de ambos y el tipo de comparación:
+#   volver a elegir una pareja reciente muestra su resultado sin abrir ninguno de los dos.
+# - Tamaño máximo configurable con expulsión LRU (las entradas usadas hace más tiempo salen primero).
+# - Acceso seguro desde varios hilos y procesos: modo WAL, espera ante bloqueos y escrituras en
+#   transacciones BEGIN IMMEDIATE.
+# - Cualquier fallo de la caché se registra y se ignora: la comparación continúa sin ella.
+#
+# Dependencias:
+# - Python 3.x
+# - sqlite3, marshal, hashlib, os, sys, time, logging, contextlib (módulos estándar de Python)
+
+import hashlib
+import logging
+import marshal
+import os
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE = 'cache.sqlite3'
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+HASH_CACHE_MAX_ENTRIES = 2000000
+RESULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+# Segundos de espera cuando otro proceso tiene bloqueada la base de datos
+LOCK_TIMEOUT = 30
+# Bytes finales del ZIP incluidos en la huella: EOCD con comentario máximo y registros ZIP64
+FINGERPRINT_TAIL = 22 + 0xFFFF + 76
+# Formato de los datos serializados; cambia con la versión de marshal
+LISTING_FORMAT = f'listing-v1-marshal{marshal.version}'
+RESULT_FORMAT = f'result-v5-marshal{marshal.version}'
+
+
+def user_cache_dir():
+    """Directorio de caché del usuario para CompZIPAS según el sistema operativo."""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or os.path.expanduser(os.path.join('~', 'AppData', 'Local'))
+    elif sys.platform == 'darwin':
+        base = os.path.expanduser(os.path.join('~', 'Library', 'Caches'))
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser(os.path.join('~', '.cache'))
+    return os.path.join(base, 'CompZIPAS')
+
+
+def archive_fingerprint(path):
+    """Calcula la huella de un ZIP: ruta, tamaño, fecha de modificación y hash de su final (EOCD)."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    digest = hashlib.sha256(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\0".encode('utf-8'))
+    with open(path, 'rb') as f:
+        f.seek(max(0, stat.st_size - FINGERPRINT_TAIL))
+        digest.update(f.read())
+    return digest.hexdigest()
+
+
+class SqliteCache:
+    """Base de las cachés persistentes: un archivo SQLite compartido por hilos y procesos.
+
+    Cada operación abre su propia conexión, así que puede usarse desde cualquier hilo. El modo
+    WAL permite lecturas concurrentes y las escrituras toman el bloqueo al empezar (BEGIN
+    IMMEDIATE), esperando hasta LOCK_TIMEOUT si otro proceso está escribiendo.
+    """
+
+    SCHEMA = (
+        '''CREATE TABLE IF NOT EXISTS listings (
+            fingerprint TEXT PRIMARY KEY, path TEXT, format TEXT, data BLOB,
+            size INTEGER, last_used REAL)''',
+        'CREATE INDEX IF NOT EXISTS listings_last_used ON listings (last_used)',
+        '''CREATE TABLE IF NOT EXISTS hashes (
+            fingerprint TEXT, header_offset INTEGER, crc INTEGER, algorithm TEXT, digest TEXT,
+            last_used REAL, PRIMARY KEY (fingerprint, header_offset, crc, algorithm))''',
+        'CREATE INDEX IF NOT EXISTS hashes_last_used ON hashes (last_used)',
+        '''CREATE TABLE IF NOT EXISTS results (
+            fingerprint1 TEXT, fingerprint2 TEXT, variant TEXT, path1 TEXT, path2 TEXT, format TEXT,
+            data BLOB, size INTEGER, last_used REAL, PRIMARY KEY (fingerprint1, fingerprint2, variant))''',
+        'CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)',
+    )
+
+    def __init__(self, directory=None):
+        self.directory = directory or user_cache_dir()
+        self.path = os.path.join(self.directory, CACHE_FILE)
+        self._initialized = False
+
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(self.directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=LOCK_TIMEOUT, isolation_level=None)
+        if not self._initialized:
+            connection.execute('PRAGMA journal_mode=WAL')
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+            self._initialized = True
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        """Conexión con una transacción de escritura que se confirma al salir sin errores."""
+        connection = self._connect()
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield connection
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _evict_bytes(connection, table, max_bytes):
+        """Elimina las filas de la tabla menos usadas recientemente hasta que su tamaño total respete max_bytes."""
+        total = connection.execute(f'SELECT COALESCE(SUM(size), 0) FROM {table}').fetchone()[0]
+        if total <= max_bytes:
+            return
+        for rowid, size in connection.execute(f'SELECT rowid, size FROM {table} ORDER BY last_used').fetchall():
+            connection.execute(f'DELETE FROM {table} WHERE rowid = ?', (rowid,))
+            total -= size
+            logger.debug(f"Fila {rowid} de {table} expulsada de la caché")
+            if total <= max_bytes:
+                break
+
+
+class ListingCache(SqliteCache):
+    """Caché persistente de listados de ZIP (nombre -> campos) con tamaño máximo y expulsión LRU."""
+
+    def __init__(self, directory=None, max_bytes=CACHE_MAX_BYTES):
+        super().__init__(directory)
+        self.max_bytes = max_bytes
+
+    def load_listing(self, zip_file, loader):
+        """Devuelve el listado del ZIP desde la caché o, si no está o ha cambiado, lo obtiene con loader().
+
+        La huella se calcula antes de leer el ZIP, de modo que un archivo modificado durante la
+        lectura nunca queda guardado con la huella de su nueva versión.
+        """
+        try:
+            fingerprint = archive_fingerprint(zip_file)
+        except OSError as e:
+            logger.warning(f"No se pudo calcular la huella de {zip_file}: {str(e)}")
+            return loader()
+        listing = self._get(fingerprint)
+        if listing is not None:
+            logger.info(f"Listado de {zip_file} leído de la caché ({len(listing)} entradas)")
+            return listing
+        listing = loader()
+        self._put(fingerprint, zip_file, listing)
+        return listing
+
+    def _get(self, fingerprint):
+        try:
+            with self._transaction() as connection:
+                row = connection.execute('SELECT format, data FROM listings WHERE fingerprint = ?',
+                                         (fingerprint,)).fetchone()
+                if row is None or row[0] != LISTING_FORMAT:
+                    return None
+                connection.execute('UPDATE listings SET last_used = ? WHERE fingerprint = ?',
+                                   (time.time(), fingerprint))
+            names, fields = marshal.loads(row[1])
+            return dict(zip(names, fields))
+        except (OSError, sqlite3.Error, ValueError, EOFError, TypeError) as e:
+            logger.warning(f"Error al leer la caché de listados: {str(e)}")
+            return None
+
+    def _put(self, fingerprint, zip_file, listing):
+        path = os.path.abspath(zip_file)
+        try:
+            data = marshal.dumps((list(listing), list(listing.values())))
+            with self._transaction() as connection:
+                # Las versiones anteriores del mismo archivo ya no sirven
+                connection.execute('DELETE FROM listings WHERE path = ?', (path,))
+                connection.execute('INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?, ?, ?)',
+                                   (fingerprint, path, LISTING_FORMAT, data, len(data), time.time()))
+                self._evict_bytes(connection, 'listings', self.max_bytes)
+            logger.debug(f"Listado de {zip_file} guardado en caché ({len(data)} bytes)")
+        except (OSError, sqlite3.Error, ValueError) as e:
+            logger.warning(f"Error al guardar en la caché de listados: {str(e)}")
+
+
+class HashCache(SqliteCache):
+    """Caché persistente de hashes de contenido por (huella del ZIP, posición, CRC, algoritmo).
+
+    El número de hashes guardados está limitado a max_entries, con expulsión LRU.
+    """
+
+    def __init__(self, directory=None, max_entries=HASH_CACHE_MAX_ENTRIES):
+        super().__init__(directory)
+        self.max_entries = max_entries
+
+    def load(self, zip_file, algorithm):
+        """Devuelve (huella, {(header_offset, CRC): hash}) con los hashes conocidos del ZIP.
+
+        La huella es None si no se pudo calcular; en ese caso no se guardarán hashes del ZIP.
+        """
+        try:
+            fingerprint = archive_fingerprint(zip_file)
+        except OSError as e:
+            logger.warning(f"No se pudo calcular la huella de {zip_file}: {str(e)}")
+            return None, {}
+        try:
+            with self._transaction() as connection:
+                rows = connection.execute(
+                    'SELECT header_offset, crc, digest FROM hashes WHERE fingerprint = ? AND algorithm = ?',
+                    (fingerprint, algorithm)).fetchall()
+                if rows:
+                    connection.execute('UPDATE hashes SET last_used = ? WHERE fingerprint = ? AND algorithm = ?',
+                                       (time.time(), fingerprint, algorithm))
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Error al leer la caché de hashes: {str(e)}")
+            return fingerprint, {}
+        logger.debug(f"{len(rows)} hashes de {zip_file} leídos de la caché")
+        return fingerprint, {(offset, crc): digest for offset, crc, digest in rows}
+
+    def store(self, fingerprint, algorithm, digests):
+        """Guarda los hashes {(header_offset, CRC): hash} de un ZIP y aplica el límite de entradas."""
+        if fingerprint is None or not digests:
+            return
+        now = time.time()
+        try:
+            with self._transaction() as connection:
+                connection.executemany('INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?)',
+                                       ((fingerprint, offset, crc, algorithm, digest, now)
+                                        for (offset, crc), digest in digests.items()))
+                excess = connection.execute('SELECT COUNT(*) FROM hashes').fetchone()[0] - self.max_entries
+                if excess > 0:
+                    connection.execute('DELETE FROM hashes WHERE rowid IN '
+                                       '(SELECT rowid FROM hashes ORDER BY last_used LIMIT ?)', (excess,))
+                    logger.debug(f"{excess} hashes expulsados de la caché")
+            logger.debug(f"{len(digests)} hashes guardados en caché")
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Error al guardar en la caché de hashes: {str(e)}")
+
+
+class ResultCache(SqliteCache):
+    """Caché persistente de resultados completos por (huella de ZIP1, huella de ZIP2, tipo de comparación).
+
+    Los datos son las tuplas de zip_diff_engine.result_to_data(). Un resultado deja de usarse en
+    cuanto cambia cualquiera de los dos ZIPs, porque cambia su huella.
+    """
+
+    def __init__(self, directory=None, max_bytes=RESULT_CACHE_MAX_BYTES):
+        super().__init__(directory)
+        self.max_bytes = max_bytes
+
+    def load(self, zip1_file, zip2_file, variant):
+        """Devuelve (clave, datos) del resultado guardado para la pareja, o (clave, None) si no hay.
+
+        La clave identifica la versión actual de ambos ZIPs y se pasa a store() tras comparar;
+        es None si no se pudo calcular alguna huella (en ese caso no se guardará nada).
+        """
+        try:
+            key = (archive_fingerprint(zip1_file), archive_fingerprint(zip2_file),
+                   os.path.abspath(zip1_file), os.path.abspath(zip2_file))
+        except OSError as e:
+            logger.warning(f"No se pudo calcular la huella de {zip1_file} o {zip2_file}: {str(e)}")
+            return None, None
+        try:
+            with self._transaction() as connection:
+                row = connection.execute(
+                    'SELECT format, data FROM results WHERE fingerprint1 = ? AND fingerprint2 = ? AND variant = ?',
+                    (key[0], key[1], variant)).fetchone()
+                if row is None or row[0] != RESULT_FORMAT:
+                    return key, None
+                connection.execute(
+                    'UPDATE results SET last_used = ? WHERE fingerprint1 = ? AND fingerprint2 = ? AND variant = ?',
+                    (time.time(), key[0], key[1], variant))
+            data = marshal.loads(row[1])
+        except (OSError, sqlite3.Error, ValueError, EOFError, TypeError) as e:
+            logger.warning(f"Error al leer la caché de resultados: {str(e)}")
+            return key, None
+        logger.info(f"Resultado de {zip1_file} y {zip2_file} leído de la caché ({len(row[1])} bytes)")
+        return key, data
+
+    def store(self, key, variant, data):
+        """Guarda el resultado de comparar la versión de los ZIPs identificada por la clave de load()."""
+        if key is None:
+            return
+        fingerprint1, fingerprint2, path1, path2 = key
+        try:
+            blob = marshal.dumps(data)
+            with self._transaction() as connection:
+                # Los resultados de versiones anteriores de la misma pareja ya no sirven
+                connection.execute('DELETE FROM results WHERE path1 = ? AND path2 = ? AND variant = ?',
+                                   (path1, path2, variant))
+                connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                   (fingerprint1, fingerprint2, variant, path1, path2, RESULT_FORMAT,
+                                    blob, len(blob), time.time()))
+                self._evict_bytes(connection, 'results', self.max_bytes)
+            logger.debug(f"Resultado de {path1} y {path2} guardado en caché ({len(blob)} bytes)")
+        except (OSError, sqlite3.Error, ValueError) as e:
+            logger.warning(f"Error al guardar en la caché de resultados: {str(e)}")
@@ -0,0 +1,189 @@
+# Vista virtualizada de diferencias sobre Canvas
+#
+# Descripción:
+# Alternativa a los dos Treeview para archivos ZIP con millones de entradas. Dibuja lado a lado,
+# en dos Canvas, solo las filas que caben en la ventana a partir del modelo de zip_diff_engine.
+# - El número de elementos del Canvas es constante (filas visibles), sin importar el tamaño del ZIP.
+# - Mismos colores que la leyenda de main().
+# - Los directorios muestran los bytes de cada lado y el recuento de diferencias que contienen.
+# - Desplazamiento sincronizado de ambos paneles con una única barra (como sync_scroll).
+# - Expansión/contracción de directorios con clic en el indicador o doble clic.
+#
+# Dependencias:
+# - Python 3.x
+# - tkinter (incluido con la instalación estándar de Python)
+# - zip_diff_engine
+
+import tkinter as tk
+from tkinter import ttk
+import logging
+
+from zip_diff_engine import TAG_STYLES
+
+logger = logging.getLogger(__name__)
+
+SELECTED_STYLE = {'background': 'steelblue', 'foreground': 'white'}
+
+
+class DiffCanvasView(tk.Frame):
+    """Vista lado a lado que solo dibuja las filas visibles del modelo de diferencias."""
+
+    ROW_HEIGHT = 20
+    INDENT = 16
+    MARKER_WIDTH = 14
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.result = None
+        self.rows = []  # Filas visibles: (ruta, profundidad)
+        self.expanded = set()
+        self.selected = None
+        self.top = 0  # Índice de la primera fila dibujada
+
+        header = tk.Frame(self)
+        header.pack(fill='x')
+        tk.Label(header, text='Archivos ZIP 1', anchor='w').pack(side='left', fill='x', expand=True)
+        tk.Label(header, text='Archivos ZIP 2', anchor='w').pack(side='left', fill='x', expand=True)
+
+        body = tk.Frame(self)
+        body.pack(fill='both', expand=True)
+        self.canvas1 = tk.Canvas(body, background='white', highlightthickness=0)
+        self.canvas1.pack(side='left', fill='both', expand=True)
+        self.canvas2 = tk.Canvas(body, background='white', highlightthickness=0)
+        self.canvas2.pack(side='left', fill='both', expand=True)
+        self.scroll = ttk.Scrollbar(body, orient='vertical', command=self.yview)
+        self.scroll.pack(side='right', fill='y')
+
+        for canvas in (self.canvas1, self.canvas2):
+            canvas.bind('<Configure>', lambda event: self.redraw())
+            canvas.bind('<Button-1>', self.on_click)
+            canvas.bind('<Double-Button-1>', self.on_double_click)
+            canvas.bind('<MouseWheel>', lambda event: self.yview('scroll', -1 if event.delta > 0 else 1, 'units'))
+            canvas.bind('<Button-4>', lambda event: self.yview('scroll', -1, 'units'))
+            canvas.bind('<Button-5>', lambda event: self.yview('scroll', 1, 'units'))
+
+    def set_result(self, result):
+        """Muestra un nuevo DiffResult con todos los directorios contraídos."""
+        self.result = result
+        self.expanded.clear()
+        self.selected = None
+        self.top = 0
+        self.rows = [(path, 0) for path in result.children['']]
+        logger.debug(f"Vista virtual con {len(self.rows)} filas de primer nivel")
+        self.redraw()
+
+    def visible_count(self):
+        """Número de filas que caben en el panel."""
+        return max(1, self.canvas1.winfo_height() // self.ROW_HEIGHT)
+
+    def yview(self, *args):
+        """Desplaza ambos paneles a la vez (acepta los mismos argumentos que Treeview.yview)."""
+        if not args:
+            return
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * len(self.rows))
+        elif args[0] == 'scroll':
+            step = self.visible_count() if args[2] == 'pages' else 1
+            self.top += int(args[1]) * step
+        self.top = max(0, min(self.top, len(self.rows) - self.visible_count()))
+        self.redraw()
+        return 'break'
+
+    def toggle(self, index):
+        """Expande o contrae el directorio de la fila indicada, actualizando solo su tramo de filas."""
+        path, depth = self.rows[index]
+        if path in self.expanded:
+            self.expanded.discard(path)
+            end = index + 1
+            while end < len(self.rows) and self.rows[end][1] > depth:
+                end += 1
+            del self.rows[index + 1:end]
+            logger.debug(f"Contraído {path}")
+        else:
+            self.expanded.add(path)
+            self.rows[index + 1:index + 1] = self._subtree_rows(path, depth + 1)
+            logger.debug(f"Expandido {path}")
+
+    def _subtree_rows(self, dir_path, depth):
+        """Filas visibles bajo un directorio, respetando los subdirectorios ya expandidos."""
+        rows = []
+        stack = [(path, depth) for path in reversed(self.result.children[dir_path])]
+        while stack:
+            path, level = stack.pop()
+            rows.append((path, level))
+            if path in self.expanded:
+                stack.extend((child, level + 1) for child in reversed(self.result.children[path]))
+        return rows
+
+    def _row_at(self, event):
+        index = self.top + event.y // self.ROW_HEIGHT
+        return index if index < len(self.rows) else None
+
+    def on_click(self, event):
+        """Selecciona la fila en ambos paneles; si se pulsa el indicador de un directorio lo expande."""
+        index = self._row_at(event)
+        if index is None:
+            return
+        path, depth = self.rows[index]
+        self.selected = path
+        marker_x = 4 + depth * self.INDENT
+        if self.result.nodes[path].is_dir and marker_x <= event.x < marker_x + self.MARKER_WIDTH:
+            self.toggle(index)
+        self.redraw()
+
+    def on_double_click(self, event):
+        index = self._row_at(event)
+        if index is not None and self.result.nodes[self.rows[index][0]].is_dir:
+            self.toggle(index)
+            self.redraw()
+
+    def _row_style(self, entry, side):
+        """Estilo de una fila en el panel indicado (1 o 2), con las mismas reglas que los Treeview."""
+        if entry.path == self.selected:
+            return SELECTED_STYLE
+        if entry.is_dir:
+            tag = self.result.dir_status(entry.path) if entry.path in self.result.dir_tags else None
+        else:
+            tag = entry.side_tag(side)
+        return TAG_STYLES.get(tag, TAG_STYLES['same'])
+
+    def _draw_row(self, canvas, side, entry, depth, y, date):
+        width = canvas.winfo_width()
+        style = self._row_style(entry, side)
+        foreground = style.get('foreground', 'black')
+        canvas.create_rectangle(0, y, width, y + self.ROW_HEIGHT, fill=style['background'], outline='')
+        x = 4 + depth * self.INDENT
+        text_y = y + self.ROW_HEIGHT // 2
+        if entry.is_dir and self.result.children[entry.path]:
+            marker = '▾' if entry.path in self.expanded else '▸'
+            canvas.create_text(x, text_y, text=marker, anchor='w', fill=foreground)
+        canvas.create_text(x + self.MARKER_WIDTH, text_y, text=entry.name, anchor='w', fill=foreground)
+        if entry.is_dir:
+            # Bytes del lado y recuento de diferencias agregados por el modelo (columna "Cambios")
+            dir_bytes = self.result.dir_bytes.get(entry.path, (0, 0))[side - 1]
+            canvas.create_text(int(width * 0.55), text_y, text=f"{dir_bytes} bytes", anchor='w', fill=foreground)
+            canvas.create_text(int(width * 0.75), text_y, text=self.result.dir_changes(entry.path), anchor='w',
+                               fill=foreground)
+        info = entry.info1 if side == 1 else entry.info2
+        if not entry.is_dir and info:
+            canvas.create_text(int(width * 0.55), text_y, text=f"{info.file_size} bytes", anchor='w', fill=foreground)
+            canvas.create_text(int(width * 0.75), text_y, text=date, anchor='w', fill=foreground)
+
+    def redraw(self):
+        """Vuelve a dibujar solo las filas visibles de ambos paneles."""
+        self.canvas1.delete('all')
+        self.canvas2.delete('all')
+        if self.result is None or not self.rows:
+            self.scroll.set(0, 1)
+            return
+        count = self.visible_count()
+        visible = self.rows[self.top:self.top + count + 1]
+        entries = [self.result.nodes[path] for path, _ in visible]
+        # Solo se formatean, en bloque, las fechas de las filas visibles
+        dates = self.result.format_dates(entries)
+        for offset, ((path, depth), entry, (date1, date2)) in enumerate(zip(visible, entries, dates)):
+            y = offset * self.ROW_HEIGHT
+            self._draw_row(self.canvas1, 1, entry, depth, y, date1)
+            self._draw_row(self.canvas2, 2, entry, depth, y, date2)
+        total = len(self.rows)
+        self.scroll.set(self.top / total, min(1.0, (self.top + count) / total))
@@ -0,0 +1,135 @@
+# Lector rápido del directorio central de un ZIP
+#
+# Descripción:
+# Alternativa ligera a zipfile.ZipFile para obtener el listado de un ZIP. Proyecta el archivo en
+# memoria (mmap), localiza el registro de fin de directorio central (EOCD) y, si existen, el
+# localizador y el registro ZIP64, y recorre el directorio central generando solo los campos
+# que necesita el comparador (nombre, tamaños, CRC, fecha DOS, método, flags y posición).
+# - No crea un ZipInfo por entrada ni vuelve a consultar cada nombre con getinfo().
+# - Admite ZIP64 (más de 65535 entradas, tamaños y posiciones de más de 4 GB) y datos antepuestos
+#   al ZIP (por ejemplo, autoextraíbles), ajustando las posiciones como zipfile.
+# - Como zipfile, el directorio central se recorre hasta consumir su tamaño y no según el número de
+#   entradas del EOCD, que en los ZIP sin ZIP64 con más de 65535 entradas da la vuelta.
+#
+# Dependencias:
+# - Python 3.x
+# - mmap, os, struct, zipfile (módulos estándar de Python)
+
+import mmap
+import os
+import struct
+import zipfile
+
+# Registro de fin de directorio central (EOCD)
+END_ARCHIVE = struct.Struct('<4s4H2LH')
+END_ARCHIVE_SIGNATURE = b'PK\x05\x06'
+# Localizador y registro de fin de directorio central ZIP64
+END_ARCHIVE64_LOCATOR = struct.Struct('<4sLQL')
+END_ARCHIVE64_LOCATOR_SIGNATURE = b'PK\x06\x07'
+END_ARCHIVE64 = struct.Struct('<4sQ2H2L4Q')
+END_ARCHIVE64_SIGNATURE = b'PK\x06\x06'
+# Cabecera de entrada del directorio central
+CENTRAL_DIR = struct.Struct('<4s4B4HL2L5H2L')
+CENTRAL_DIR_SIGNATURE = b'PK\x01\x02'
+
+# Campo extra ZIP64 y valor que indica que el dato real está en él
+ZIP64_EXTRA_ID = 0x0001
+ZIP64_LIMIT = 0xFFFFFFFF
+MAX_COMMENT = 0xFFFF
+
+UTF8_FLAG = 0x800
+
+
+def dos_date_time(date, time):
+    """Convierte fecha y hora DOS en la tupla date_time de zipfile."""
+    return ((date >> 9) + 1980, (date >> 5) & 0xF, date & 0x1F,
+            time >> 11, (time >> 5) & 0x3F, (time & 0x1F) * 2)
+
+
+def find_central_directory(buffer):
+    """Localiza el directorio central. Devuelve (inicio, tamaño, número de entradas, desplazamiento).
+
+    El desplazamiento es el número de bytes antepuestos al ZIP, que hay que sumar a las
+    posiciones de las cabeceras locales (igual que hace zipfile).
+    """
+    size = len(buffer)
+    location = buffer.rfind(END_ARCHIVE_SIGNATURE, max(0, size - END_ARCHIVE.size - MAX_COMMENT))
+    if location < 0 or location + END_ARCHIVE.size > size:
+        raise zipfile.BadZipFile("File is not a zip file")
+    (_, _, _, _, entries, size_cd, offset_cd, _) = END_ARCHIVE.unpack_from(buffer, location)
+
+    zip64_records = 0
+    locator = location - END_ARCHIVE64_LOCATOR.size
+    if locator >= 0 and buffer[locator:locator + 4] == END_ARCHIVE64_LOCATOR_SIGNATURE:
+        # Como zipfile, el registro ZIP64 se busca justo antes del localizador
+        record = locator - END_ARCHIVE64.size
+        if record < 0 or buffer[record:record + 4] != END_ARCHIVE64_SIGNATURE:
+            raise zipfile.BadZipFile("Corrupt ZIP64 end of central directory record")
+        (_, _, _, _, _, _, _, entries, size_cd, offset_cd) = END_ARCHIVE64.unpack_from(buffer, record)
+        zip64_records = END_ARCHIVE64.size + END_ARCHIVE64_LOCATOR.size
+
+    concat = location - zip64_records - size_cd - offset_cd
+    if concat < 0:
+        raise zipfile.BadZipFile("Bad offset for central directory")
+    return offset_cd + concat, size_cd, entries, concat
+
+
+def _zip64_extra(extra, file_size, compress_size, header_offset):
+    """Sustituye los campos marcados como 0xFFFFFFFF por sus valores del campo extra ZIP64."""
+    position = 0
+    while position + 4 <= len(extra):
+        tag, length = struct.unpack_from('<2H', extra, position)
+        position += 4
+        if tag == ZIP64_EXTRA_ID:
+            values = iter(struct.unpack_from(f'<{length // 8}Q', extra, position))
+            try:
+                if file_size == ZIP64_LIMIT:
+                    file_size = next(values)
+                if compress_size == ZIP64_LIMIT:
+                    compress_size = next(values)
+                if header_offset == ZIP64_LIMIT:
+                    header_offset = next(values)
+            except StopIteration:
+                raise zipfile.BadZipFile("Corrupt extra field 0001 (ZIP64)") from None
+            break
+        position += length
+    return file_size, compress_size, header_offset
+
+
+def iter_central_directory(path):
+    """Recorre el directorio central de un ZIP y genera (nombre, campos) por entrada.
+
+    campos es la tupla (file_size, CRC, date_time, compress_size, compress_type, header_offset, flag_bits).
+    Se leen entradas hasta consumir el tamaño del directorio central; el número de entradas del
+    EOCD no se usa, porque puede haber dado la vuelta (módulo 65536) en los ZIP sin ZIP64.
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise zipfile.BadZipFile("File is not a zip file")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            start, size_cd, _, concat = find_central_directory(buffer)
+            position, end = start, start + size_cd
+            unpack = CENTRAL_DIR.unpack_from
+            while position < end:
+                if position + CENTRAL_DIR.size > end:
+                    raise zipfile.BadZipFile("Truncated central directory")
+                (signature, _, _, _, _, flag_bits, compress_type, time, date, crc, compress_size,
+                 file_size, name_length, extra_length, comment_length, _, _, _, header_offset) = unpack(buffer, position)
+                if signature != CENTRAL_DIR_SIGNATURE:
+                    raise zipfile.BadZipFile("Bad magic number for central directory")
+                position += CENTRAL_DIR.size
+                raw_name = buffer[position:position + name_length]
+                position += name_length
+                if ZIP64_LIMIT in (file_size, compress_size, header_offset):
+                    file_size, compress_size, header_offset = _zip64_extra(
+                        buffer[position:position + extra_length], file_size, compress_size, header_offset)
+                position += extra_length + comment_length
+
+                name = raw_name.decode('utf-8' if flag_bits & UTF8_FLAG else 'cp437')
+                # Mismas normalizaciones del nombre que zipfile.ZipInfo
+                if '\x00' in name:
+                    name = name[:name.index('\x00')]
+                if os.sep != '/' and os.sep in name:
+                    name = name.replace(os.sep, '/')
+                yield name, (file_size, crc, dos_date_time(date, time), compress_size,
+                             compress_type, header_offset + concat, flag_bits)
@@ -0,0 +1,191 @@
+# Operaciones por columnas sobre el almacén de entradas (NumPy opcional)
+#
+# Descripción:
+# Clasificación de los archivos, agregados por directorio y formato de fechas calculados sobre las
+# columnas de un zip_entry_store.EntryStore, en lugar de entrada a entrada.
+# - Si NumPy está instalado, las columnas se leen como arrays sin copiarlas (numpy.frombuffer) y
+#   todo se calcula con operaciones vectorizadas; si no, con un recorrido en Python que da el mismo
+#   resultado. NumPy se importa la primera vez que hace falta y solo a partir de NUMPY_MIN_ROWS
+#   filas, así que no retrasa el arranque de la CLI ni de la interfaz ni las comparaciones pequeñas.
+# - classify_rows: estado de todos los archivos a la vez, comparando presencia, tamaño, CRC y fecha
+#   (las mismas reglas que zip_diff_engine.classify()).
+# - dir_rollups: recuento de estados y bytes de cada lado por directorio, de abajo arriba.
+# - format_dates: fechas de un lado como texto, en bloque y solo para las filas pedidas (las que
+#   se van a mostrar).
+#
+# Dependencias:
+# - Python 3.x
+# - struct, collections (módulos estándar de Python)
+# - zip_entry_store
+# - numpy (opcional)
+
+import struct
+from collections import Counter
+
+from zip_entry_store import RECORD, IS_DIR, IN_ZIP1, IN_ZIP2, unpack_dos
+
+# Por debajo de este número de filas el recorrido en Python es más rápido que importar NumPy
+NUMPY_MIN_ROWS = 50000
+
+# Solo tamaño, CRC y fecha DOS de cada registro, para el recorrido en Python
+_COMPARED = struct.Struct(f'<QII{RECORD.size - 16}x')
+
+DATE_FORMAT = '%04d-%02d-%02d %02d:%02d:%02d'
+
+_np = None  # Módulo numpy una vez importado, o False si no está instalado
+_RECORD_DTYPE = None
+
+
+def _numpy(rows):
+    """Devuelve numpy para operar sobre rows filas, o None si no está instalado o no compensa.
+
+    Se importa la primera vez que se necesita; con él se crea el tipo estructurado del registro.
+    """
+    global _np, _RECORD_DTYPE
+    if rows < NUMPY_MIN_ROWS:
+        return None
+    if _np is None:
+        try:
+            import numpy
+        except ImportError:  # Sin NumPy se usan los recorridos en Python
+            _np = False
+        else:
+            # Registro de zip_entry_store.RECORD ('<QIIQHQH', sin relleno) como tipo estructurado
+            _RECORD_DTYPE = numpy.dtype({
+                'names': ['size', 'crc', 'dos', 'compress_size', 'compress_type', 'offset', 'flag_bits'],
+                'formats': ['<u8', '<u4', '<u4', '<u8', '<u2', '<u8', '<u2'],
+                'offsets': [0, 8, 12, 16, 24, 26, 34],
+                'itemsize': RECORD.size,
+            })
+            _np = numpy
+    return _np or None
+
+
+def backend(rows=NUMPY_MIN_ROWS):
+    """Nombre de la implementación que se usaría para rows filas: 'numpy' o 'python'."""
+    return 'python' if _numpy(rows) is None else 'numpy'
+
+
+def classify_rows(store, statuses):
+    """Asigna el estado de todos los archivos del almacén (los directorios no cambian).
+
+    statuses son los estados (solo en ZIP1, solo en ZIP2, contenido distinto, fecha distinta,
+    iguales); las fechas se comparan empaquetadas en formato DOS.
+    """
+    if not len(store):
+        return
+    only1, only2, content, date, same = (store.status_code(status) for status in statuses)
+    np = _numpy(len(store))
+    if np is None:
+        status = store.status
+        pairs = zip(_COMPARED.iter_unpack(store.sides[0].data), _COMPARED.iter_unpack(store.sides[1].data))
+        for row, (flag, ((size1, crc1, dos1), (size2, crc2, dos2))) in enumerate(zip(store.flags, pairs)):
+            if flag & IS_DIR:
+                continue
+            if not flag & IN_ZIP1:
+                status[row] = only2
+            elif not flag & IN_ZIP2:
+                status[row] = only1
+            elif size1 != size2 or crc1 != crc2:
+                status[row] = content
+            else:
+                status[row] = date if dos1 != dos2 else same
+        return
+    flags = np.frombuffer(store.flags, np.uint8)
+    side1 = np.frombuffer(store.sides[0].data, _RECORD_DTYPE)
+    side2 = np.frombuffer(store.sides[1].data, _RECORD_DTYPE)
+    codes = np.where(side1['dos'] != side2['dos'], date, same).astype(np.uint8)
+    codes[(side1['size'] != side2['size']) | (side1['crc'] != side2['crc'])] = content
+    codes[(flags & IN_ZIP2) == 0] = only1
+    codes[(flags & IN_ZIP1) == 0] = only2
+    files = (flags & IS_DIR) == 0
+    # Vista escribible sobre la columna de estados: se actualiza sin copiarla
+    np.frombuffer(store.status, np.uint8)[files] = codes[files]
+
+
+def dir_rollups(store):
+    """Recuento de estados y bytes de cada lado de los archivos que contiene cada directorio.
+
+    Devuelve ({fila de directorio: Counter de estados}, {fila de directorio: (bytes1, bytes2)});
+    el primero solo incluye los directorios que contienen algún archivo.
+    """
+    np = _numpy(len(store))
+    if np is None:
+        return _dir_rollups_python(store)
+    dir_rows = np.fromiter(store.children, np.int64, len(store.children))
+    if not len(store):
+        return {}, {int(row): (0, 0) for row in dir_rows}
+    # Índice denso de cada directorio (fila + 1, para que la raíz, fila -1, ocupe la posición 0)
+    slot = np.zeros(len(store) + 1, np.int64)
+    slot[dir_rows + 1] = np.arange(len(dir_rows))
+    flags = np.frombuffer(store.flags, np.uint8)
+    parent_slot = slot[np.frombuffer(store.parent, np.int32).astype(np.int64) + 1]
+    files = (flags & IS_DIR) == 0
+    file_dirs = parent_slot[files]
+    width = len(store.statuses)
+    codes = np.frombuffer(store.status, np.uint8)[files].astype(np.int64)
+    counts = np.bincount(file_dirs * width + codes, minlength=len(dir_rows) * width).reshape(len(dir_rows), width)
+    sizes = np.zeros((len(dir_rows), 2), np.uint64)
+    # Los lados ausentes tienen el registro a ceros, así que suman 0 bytes
+    np.add.at(sizes[:, 0], file_dirs, np.frombuffer(store.sides[0].data, _RECORD_DTYPE)['size'][files])
+    np.add.at(sizes[:, 1], file_dirs, np.frombuffer(store.sides[1].data, _RECORD_DTYPE)['size'][files])
+    # Cada subdirectorio suma sus totales al padre, empezando por los más profundos
+    dir_parents = parent_slot[dir_rows[1:]]
+    depth = [0] * len(dir_rows)
+    for index, parent in enumerate(dir_parents.tolist(), 1):
+        depth[index] = depth[parent] + 1
+    depth = np.array(depth)
+    for level in range(int(depth.max()), 0, -1):
+        members = np.nonzero(depth == level)[0]
+        np.add.at(counts, dir_parents[members - 1], counts[members])
+        np.add.at(sizes, dir_parents[members - 1], sizes[members])
+    statuses = store.statuses
+    row_tags = {}
+    for row, row_counts in zip(dir_rows.tolist(), counts.tolist()):
+        if any(row_counts):
+            row_tags[row] = Counter({statuses[code]: count for code, count in enumerate(row_counts) if count})
+    row_bytes = {row: (bytes1, bytes2) for row, (bytes1, bytes2) in zip(dir_rows.tolist(), sizes.tolist())}
+    return row_tags, row_bytes
+
+
+def _dir_rollups_python(store):
+    """dir_rollups() sin NumPy: recorrido de abajo arriba por los hijos de cada directorio."""
+    flags, status, statuses = store.flags, store.status, store.statuses
+    size_crc1, size_crc2 = store.sides[0].size_crc, store.sides[1].size_crc
+    row_tags, row_bytes = {}, {}
+    # children guarda cada directorio después de su padre: al revés, los subdirectorios van antes
+    for dir_row in reversed(store.children):
+        counts = Counter()
+        bytes1 = bytes2 = 0
+        for child in store.children[dir_row]:
+            if flags[child] & IS_DIR:
+                if child in row_tags:
+                    counts.update(row_tags[child])
+                child_bytes1, child_bytes2 = row_bytes[child]
+                bytes1 += child_bytes1
+                bytes2 += child_bytes2
+            else:
+                counts[statuses[status[child]]] += 1
+                bytes1 += size_crc1(child)[0]
+                bytes2 += size_crc2(child)[0]
+        if counts:
+            row_tags[dir_row] = counts
+        row_bytes[dir_row] = (bytes1, bytes2)
+    return row_tags, row_bytes
+
+
+def format_dates(store, rows, side):
+    """Fechas de las filas indicadas en el lado 1 o 2, como 'AAAA-MM-DD hh:mm:ss' ('' si faltan)."""
+    present = IN_ZIP1 if side == 1 else IN_ZIP2
+    records = store.sides[side - 1]
+    np = _numpy(len(rows))
+    if np is None:
+        return [DATE_FORMAT % unpack_dos(RECORD.unpack_from(records.data, row * RECORD.size)[2])
+                if store.flags[row] & present else '' for row in rows]
+    indices = np.asarray(rows, np.int64)
+    dos = np.frombuffer(records.data, _RECORD_DTYPE)['dos'][indices]
+    shown = (np.frombuffer(store.flags, np.uint8)[indices] & present) != 0
+    columns = ((dos >> 25) + 1980, (dos >> 21) & 0xF, (dos >> 16) & 0x1F,
+               (dos >> 11) & 0x1F, (dos >> 5) & 0x3F, (dos & 0x1F) * 2)
+    return [DATE_FORMAT % fields if visible else ''
+            for visible, fields in zip(shown.tolist(), zip(*(column.tolist() for column in columns)))]
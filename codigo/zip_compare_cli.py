@@ -0,0 +1,172 @@
+# Comparador de ZIP - Línea de comandos
+#
+# Descripción:
+# Compara dos archivos ZIP sin interfaz gráfica, pensado para integración continua (por ejemplo,
+# comprobar que un artefacto reconstruido coincide con el publicado). Usa zip_diff_engine y no
+# importa tkinter; las cachés (sqlite3) solo se cargan si se piden, para arrancar rápido.
+# - Imprime un resumen con el número de archivos por estado.
+# - Código de salida: 0 si no hay diferencias que cuenten como fallo, 1 si las hay, 2 ante errores.
+# - --fail-on elige qué estados cuentan como fallo (por defecto, todos los que indican diferencia).
+# - --verify activa la verificación de contenido (hash o bytes); --list muestra las entradas distintas.
+# - --format ndjson/csv vuelca un registro por entrada a medida que se clasifica (zip_diff_export),
+#   sin construir el resultado completo; el resumen se escribe entonces en la salida de errores.
+# - --moves detecta archivos movidos o renombrados (mismo tamaño y CRC en otra ruta; 'hash' lo confirma;
+#   'similar' empareja además textos renombrados con ediciones, con similitud de al menos --similarity).
+#   Los directorios completos movidos se emparejan antes por su hash de Merkle.
+# - --html guarda además un informe HTML autocontenido (zip_html_report).
+#
+# Uso:
+#   python zip_compare_cli.py publicado.zip reconstruido.zip --fail-on content_diff,only_zip1 --verify hash
+#
+# Dependencias:
+# - Python 3.x
+# - argparse, logging, sys, collections (módulos estándar de Python)
+# - zip_diff_engine, zip_diff_export (zip_cache con --cache y zip_html_report con --html)
+
+import argparse
+import logging
+import sys
+from collections import Counter
+
+from zip_diff_engine import (compare_zips, stream_diff, DIFF_STATUSES, FILE_STATUSES, SAME, VERIFY_MODES,
+                             MOVES_MODES)
+from zip_content import HASH_ALGORITHMS, DEFAULT_HASH_ALGORITHM
+from zip_similarity import SIMILARITY_THRESHOLD
+from zip_diff_export import EXPORT_FORMATS, WRITERS
+
+logger = logging.getLogger(__name__)
+
+# Códigos de salida
+EXIT_SAME = 0
+EXIT_DIFFERENT = 1
+EXIT_ERROR = 2
+
+
+def parse_statuses(text):
+    """Convierte una lista de estados separados por comas en una tupla, validando cada uno."""
+    statuses = tuple(s.strip() for s in text.split(',') if s.strip())
+    unknown = [s for s in statuses if s not in DIFF_STATUSES]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"Estado desconocido: {', '.join(unknown)} (válidos: {', '.join(DIFF_STATUSES)})")
+    return statuses
+
+
+def parse_similarity(text):
+    """Convierte el umbral de similitud en un número en (0, 1]."""
+    try:
+        value = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Umbral no numérico: {text}")
+    if not 0 < value <= 1:
+        raise argparse.ArgumentTypeError(f"El umbral debe estar en (0, 1]: {text}")
+    return value
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Compara dos archivos ZIP y termina con código 1 si difieren (0 si no, 2 ante errores).")
+    parser.add_argument('zip1', help="Primer archivo ZIP (referencia)")
+    parser.add_argument('zip2', help="Segundo archivo ZIP")
+    parser.add_argument('--fail-on', type=parse_statuses, default=DIFF_STATUSES, metavar='ESTADOS',
+                        help=f"Estados que cuentan como fallo, separados por comas (por defecto: {','.join(DIFF_STATUSES)})")
+    parser.add_argument('--verify', choices=VERIFY_MODES, help="Verificación de contenido de las entradas con igual tamaño y CRC")
+    parser.add_argument('--hash', choices=HASH_ALGORITHMS, default=DEFAULT_HASH_ALGORITHM,
+                        help="Algoritmo de hash para --verify hash")
+    parser.add_argument('--moves', choices=MOVES_MODES,
+                        help="Detectar archivos movidos o renombrados (crc: tamaño y CRC; hash: además confirma el "
+                             "contenido; similar: además textos renombrados con cambios)")
+    parser.add_argument('--similarity', type=parse_similarity, default=SIMILARITY_THRESHOLD, metavar='UMBRAL',
+                        help=f"Similitud mínima (0-1] para --moves similar (por defecto: {SIMILARITY_THRESHOLD})")
+    parser.add_argument('--workers', type=int, help="Hilos para la verificación de contenido (por defecto, uno por CPU)")
+    parser.add_argument('--cache', action='store_true', help="Usar las cachés persistentes de listados, hashes y resultados")
+    parser.add_argument('--list', action='store_true', help="Mostrar las entradas con diferencias")
+    parser.add_argument('--format', choices=('text',) + EXPORT_FORMATS, default='text',
+                        help="text: resumen; ndjson/csv: un registro por entrada en streaming")
+    parser.add_argument('-o', '--output', help="Archivo de salida para --format ndjson/csv (por defecto, la salida estándar)")
+    parser.add_argument('--html', metavar='ARCHIVO', help="Guardar un informe HTML autocontenido (solo con --format text)")
+    parser.add_argument('-q', '--quiet', action='store_true', help="No imprimir nada; solo el código de salida")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Mostrar el logging del motor (nivel INFO)")
+    return parser
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos. Devuelve el código de salida."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.html and args.format != 'text':
+        parser.error("--html necesita el resultado completo: úselo con --format text")
+    if args.moves and args.format != 'text':
+        parser.error("--moves necesita el resultado completo: úselo con --format text")
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    caches = {}
+    if args.cache:
+        from zip_cache import ListingCache, HashCache, ResultCache
+        caches = {'cache': ListingCache(), 'hash_cache': HashCache(), 'result_cache': ResultCache()}
+
+    try:
+        if args.format == 'text':
+            result = compare_zips(args.zip1, args.zip2, verify=args.verify, hash_algorithm=args.hash,
+                                  workers=args.workers, moves=args.moves,
+                                  similarity=args.similarity, **caches)
+            summary, differing, moved_dirs = result.summary(), result.entries, result.moved_dirs
+            counts = (result.count1, result.count2)
+            if args.html:
+                from zip_html_report import write_html_report
+                write_html_report(result, args.html)
+        else:
+            caches.pop('result_cache', None)
+            summary, counts, moved_dirs = Counter(), None, []
+            differing = []
+            entries = stream_diff(args.zip1, args.zip2, verify=args.verify, hash_algorithm=args.hash,
+                                  workers=args.workers, **caches)
+            out = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+            try:
+                WRITERS[args.format](count_statuses(entries, summary, differing if args.list else None), out)
+            finally:
+                if args.output:
+                    out.close()
+    except Exception as e:
+        print(f"Error al comparar {args.zip1} y {args.zip2}: {str(e)}", file=sys.stderr)
+        return EXIT_ERROR
+
+    failed = [status for status in args.fail_on if summary[status]]
+    if not args.quiet:
+        # Con ndjson/csv la salida estándar es para los registros
+        report = sys.stdout if args.format == 'text' else sys.stderr
+        if args.list:
+            for old_dir, new_dir in moved_dirs:
+                print(f"moved\t{old_dir} -> {new_dir}", file=report)
+            for entry in differing:
+                if entry.is_dir or entry.status == SAME:
+                    continue
+                if entry.counterpart:
+                    # Cada movimiento aparece una sola vez, desde su ruta en ZIP1
+                    if entry.info1:
+                        similar = f"\t{entry.similarity:.0%}" if entry.similarity is not None else ''
+                        print(f"{entry.status}\t{entry.path} -> {entry.counterpart}{similar}", file=report)
+                else:
+                    print(f"{entry.status}\t{entry.path}", file=report)
+        if counts:
+            print(f"ZIP1: {args.zip1} ({counts[0]} entradas)", file=report)
+            print(f"ZIP2: {args.zip2} ({counts[1]} entradas)", file=report)
+        for status in FILE_STATUSES:
+            print(f"{status}: {summary[status]}", file=report)
+        print(f"Resultado: {'DIFERENTES (' + ', '.join(failed) + ')' if failed else 'IGUALES'}", file=report)
+    return EXIT_DIFFERENT if failed else EXIT_SAME
+
+
+def count_statuses(entries, summary, differing=None):
+    """Deja pasar las entradas contando los estados de los archivos en summary (y guardando las distintas)."""
+    for entry in entries:
+        if not entry.is_dir:
+            summary[entry.status] += 1
+            if differing is not None and entry.status != SAME:
+                differing.append(entry)
+        yield entry
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,27 +6,52 @@
 # usando colores, con marcadores para archivos faltantes para mantener los árboles alineados. Características:
 # - Desplazamiento, selección y expansión sincronizados entre árboles (activable/desactivable).
 # - Directorios expandibles con sincronización de expansión/contracción.
+# - Cada item de los árboles se asocia al insertarlo con su fila del modelo (y viceversa), así que sincronizar
+#   una selección o expansión no recorre los padres del item, sea cual sea la profundidad.
+# - Columna "Cambios" en los directorios (p. ej. "12 cambiados / 3 añadidos") y tamaño total de cada lado,
+#   para ver dónde se concentran las diferencias sin expandir nada.
+# - Carga perezosa (activable/desactivable): los hijos de un directorio se insertan al expandirlo.
+#   Aun sin ella, los subárboles idénticos en ambos ZIPs (hash de Merkle) solo se insertan al expandirlos.
+# - Vista virtual opcional sobre Canvas que solo dibuja las filas visibles (ZIPs con millones de entradas).
+# - Comparación en un hilo de trabajo con barra de progreso (entradas y bytes) y botón de cancelación.
+# - Verificación de contenido opcional en paralelo: SHA-256 para entradas con igual tamaño y CRC, o byte a byte
+#   por bloques indicando el primer byte distinto.
+# - Detección opcional de archivos movidos o renombrados (mismo contenido en otra ruta, o texto parecido),
+#   con selección enlazada entre ambos extremos.
+# - Cachés persistentes (activables/desactivables) de listados de ZIP, de hashes de contenido y de resultados:
+#   al volver a elegir una pareja reciente en los Combobox se muestra su resultado sin abrir los ZIPs.
+# - Exportación del resultado a un informe HTML autocontenido (árboles y leyenda, subárboles cargados al expandir).
+# - Precarga en segundo plano al arrancar (baja prioridad): listados de los ZIPs recientes y resultado de la
+#   última pareja comparada, para que la primera comparación sea inmediata.
 # - Niveles de logging configurables (DEBUG, INFO, WARNING, ERROR, CRITICAL).
 # - Carga automática de archivos ZIP de prueba en modo DEBUG.
 # - Creación condicional de archivos ZIP de prueba si no existen.
 # - Diferencias codificadas por colores: azul claro para solo ZIP1, verde claro para solo ZIP2, amarillo para diferencias de contenido,
-#   naranja para diferencias de fecha, blanco para idénticos, gris claro (texto y fondo) para marcadores, coral claro para directorios con diferencias.
+#   naranja para diferencias de fecha, ciruela para movidos, blanco para idénticos, gris claro (texto y fondo) para marcadores, coral claro para directorios con diferencias.
 # - Una leyenda con fondos coloreados explica los colores.
 # - Selectores de archivos en una línea, encima de los Treeview, usando Combobox con historial de archivos recientes (sin duplicados).
+# - La clasificación se realiza en zip_diff_engine (sin Tk); la interfaz solo pinta el modelo resultante.
 #
 # Dependencias:
 # - Python 3.x
 # - tkinter (incluido con la instalación estándar de Python)
-# - zipfile, os, logging, datetime, sys (módulos estándar de Python)
+# - zipfile, os, logging, sys (módulos estándar de Python)
 
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import zipfile
 import os
 import logging
-from datetime import datetime
 import sys
 import time
+import threading
+import queue
+import zip_diff_engine
+from zip_diff_engine import (compare_zips, result_from_data, result_variant, parent_dirs, CompareCancelled,
+                             check_cancel, VERIFY_HASH, VERIFY_BYTES, MOVES_CRC, MOVES_HASH, MOVES_SIMILAR)
+from zip_canvas_view import DiffCanvasView, TAG_STYLES
+from zip_cache import ListingCache, HashCache, ResultCache
+from zip_html_report import write_html_report
 
 # Configuración de logging
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -43,18 +68,49 @@ DEBUG = True
 # Variable para activar/desactivar sincronización
 ENABLE_SYNC = True
 
+# Variable para activar/desactivar la carga perezosa de los árboles
+LAZY_LOAD = True
+
+# Modo de verificación de contenido: None, 'hash' (SHA-256) o 'bytes' (byte a byte)
+VERIFY_MODE = None
+VERIFY_OPTIONS = {'Sin Verificar': None, 'SHA-256': VERIFY_HASH, 'Byte a Byte': VERIFY_BYTES}
+
+# Detección de archivos movidos o renombrados: None, 'crc' (tamaño y CRC), 'hash' (confirmada con SHA-256)
+# o 'similar' (además, textos renombrados con ediciones por similitud MinHash)
+MOVES_MODE = None
+MOVES_OPTIONS = {'No Detectar': None, 'Tamaño y CRC': MOVES_CRC, 'Confirmar SHA-256': MOVES_HASH,
+                 'Similares (MinHash)': MOVES_SIMILAR}
+
+# Variable para usar las cachés persistentes de listados, hashes de contenido y resultados
+USE_CACHE = True
+
+# Precarga al arrancar: listados de los ZIPs recientes y, opcionalmente, resultado de la última pareja
+PREWARM = True
+PREWARM_LAST_PAIR = True
+
+# Variable para usar la vista virtualizada (Canvas) en lugar de los Treeview
+VIRTUAL_VIEW = False
+
 # Listas para almacenar archivos recientes
 RECENT_ZIPS_1 = []
 RECENT_ZIPS_2 = []
 MAX_RECENT = 5
 
-# Mapa para sincronizar nodos entre árboles
-node_map = {}  # Ruta completa -> (id_tree1, id_tree2)
+# Mapas para sincronizar nodos entre árboles, creados al insertar cada nodo
+row_items = {}  # Fila del modelo (DiffResult.store) -> (id_tree1, id_tree2)
+item_rows = ({}, {})  # Por árbol (tree1, tree2): id de item -> fila del modelo
+
+# Modelo mostrado y directorios con hijos aún sin insertar (carga perezosa)
+current_result = None
+lazy_pending = {}  # Ruta de directorio -> (id_ficticio_tree1, id_ficticio_tree2)
 
 # Contador para filtrar eventos redundantes
 last_event_timestamp = 0
 EVENT_DEBOUNCE_TIME = 0.1  # Segundos para filtrar eventos cercanos
 
+# Intervalo de sondeo de la cola de la comparación en segundo plano
+POLL_INTERVAL_MS = 100
+
 def load_recent_zips():
     """Carga los archivos ZIP recientes desde un archivo."""
     global RECENT_ZIPS_1, RECENT_ZIPS_2
@@ -92,6 +148,7 @@ def set_log_level(level):
         'CRITICAL': logging.CRITICAL
     }
     logger.setLevel(levels.get(level, logging.INFO))
+    zip_diff_engine.logger.setLevel(levels.get(level, logging.INFO))
     logger.info(f"Nivel de logging configurado a {level}")
 
 def main():
@@ -133,10 +190,39 @@ def main():
     log_level = tk.StringVar(value='INFO')
     tk.OptionMenu(control_frame, log_level, 'DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL', 
                   command=lambda lvl: set_log_level(lvl)).pack(side='left', padx=5)
-    tk.Button(control_frame, text="Comparar", command=lambda: compare(zip1_path.get(), zip2_path.get(), tree1, tree2)).pack(side='left', padx=10)
+    compare_button = tk.Button(control_frame, text="Comparar", command=lambda: run_compare())
+    compare_button.pack(side='left', padx=10)
+    cancel_button = tk.Button(control_frame, text="Cancelar", state='disabled', command=lambda: cancel_compare())
+    cancel_button.pack(side='left', padx=5)
+    tk.Button(control_frame, text="Exportar HTML", command=lambda: export_html()).pack(side='left', padx=5)
     enable_sync_var = tk.BooleanVar(value=ENABLE_SYNC)
     tk.Checkbutton(control_frame, text="Habilitar Sincronización", variable=enable_sync_var, 
                    command=lambda: toggle_sync(enable_sync_var)).pack(side='left', padx=10)
+    lazy_load_var = tk.BooleanVar(value=LAZY_LOAD)
+    tk.Checkbutton(control_frame, text="Carga Perezosa", variable=lazy_load_var,
+                   command=lambda: toggle_lazy_load(lazy_load_var)).pack(side='left', padx=10)
+    tk.Label(control_frame, text="Verificación:").pack(side='left', padx=5)
+    verify_var = tk.StringVar(value='Sin Verificar')
+    tk.OptionMenu(control_frame, verify_var, *VERIFY_OPTIONS,
+                  command=lambda option: set_verify_mode(option)).pack(side='left', padx=5)
+    tk.Label(control_frame, text="Movidos:").pack(side='left', padx=5)
+    moves_var = tk.StringVar(value='No Detectar')
+    tk.OptionMenu(control_frame, moves_var, *MOVES_OPTIONS,
+                  command=lambda option: set_moves_mode(option)).pack(side='left', padx=5)
+    use_cache_var = tk.BooleanVar(value=USE_CACHE)
+    tk.Checkbutton(control_frame, text="Usar Caché", variable=use_cache_var,
+                   command=lambda: toggle_cache(use_cache_var)).pack(side='left', padx=10)
+    virtual_view_var = tk.BooleanVar(value=VIRTUAL_VIEW)
+    tk.Checkbutton(control_frame, text="Vista Virtual", variable=virtual_view_var,
+                   command=lambda: toggle_virtual_view(virtual_view_var)).pack(side='left', padx=10)
+
+    # Progreso de la comparación en segundo plano
+    progress_frame = tk.Frame(root)
+    progress_frame.pack(pady=2, fill='x')
+    progress_bar = ttk.Progressbar(progress_frame, orient='horizontal', mode='determinate', maximum=1)
+    progress_bar.pack(side='left', padx=10, fill='x', expand=True)
+    progress_label = tk.Label(progress_frame, text='', font=('Arial', 9))
+    progress_label.pack(side='left', padx=10)
 
     # Leyenda de colores
     legend_frame = tk.Frame(root)
@@ -150,6 +236,8 @@ def main():
     tk.Label(legend_frame, text="|", font=('Arial', 10)).pack(side='left')
     tk.Label(legend_frame, text="Fecha Diferente", background='orange', font=('Arial', 10)).pack(side='left', padx=2)
     tk.Label(legend_frame, text="|", font=('Arial', 10)).pack(side='left')
+    tk.Label(legend_frame, text="Movido", background='plum', font=('Arial', 10)).pack(side='left', padx=2)
+    tk.Label(legend_frame, text="|", font=('Arial', 10)).pack(side='left')
     tk.Label(legend_frame, text="Idéntico", background='white', font=('Arial', 10)).pack(side='left', padx=2)
     tk.Label(legend_frame, text="|", font=('Arial', 10)).pack(side='left')
     tk.Label(legend_frame, text="Marcador", background='gray95', foreground='gray50', font=('Arial', 10)).pack(side='left', padx=2)
@@ -161,17 +249,19 @@ def main():
     tree_frame.pack(fill='both', expand=True)
 
     # Árbol para ZIP 1
-    tree1 = ttk.Treeview(tree_frame, columns=('size', 'date'), show='tree headings')
+    tree1 = ttk.Treeview(tree_frame, columns=('size', 'date', 'changes'), show='tree headings')
     tree1.heading('#0', text='Archivos ZIP 1')
     tree1.heading('size', text='Tamaño')
     tree1.heading('date', text='Fecha')
+    tree1.heading('changes', text='Cambios')
     tree1.pack(side='left', fill='both', expand=True)
 
     # Árbol para ZIP 2
-    tree2 = ttk.Treeview(tree_frame, columns=('size', 'date'), show='tree headings')
+    tree2 = ttk.Treeview(tree_frame, columns=('size', 'date', 'changes'), show='tree headings')
     tree2.heading('#0', text='Archivos ZIP 2')
     tree2.heading('size', text='Tamaño')
     tree2.heading('date', text='Fecha')
+    tree2.heading('changes', text='Cambios')
     tree2.pack(side='left', fill='both', expand=True)
 
     # Scrollbars sincronizados
@@ -180,12 +270,160 @@ def main():
     tree1.configure(yscrollcommand=scroll.set)
     tree2.configure(yscrollcommand=scroll.set)
 
+    # Vista virtualizada alternativa (solo dibuja las filas visibles)
+    canvas_view = DiffCanvasView(root)
+    if VIRTUAL_VIEW:
+        tree_frame.pack_forget()
+        canvas_view.pack(fill='both', expand=True)
+
+    running = {'cancel': None}  # Evento de cancelación de la comparación en curso
+    trees_stale = {'value': False}  # Los Treeview muestran una comparación anterior a current_result
+    prewarm_cancel = threading.Event()  # Detiene la precarga de arranque
+
+    def run_compare():
+        """Lanza la comparación en un hilo de trabajo sin bloquear la interfaz."""
+        zip1_file, zip2_file = zip1_path.get(), zip2_path.get()
+        if not zip1_file or not zip2_file:
+            messagebox.showerror("Error", "Por favor, seleccione ambos archivos ZIP.")
+            logger.error("Falta selección de archivo ZIP")
+            return
+        logger.info(f"Iniciando comparación de {zip1_file} y {zip2_file}")
+        # La comparación pedida tiene prioridad sobre la precarga
+        prewarm_cancel.set()
+        compare_button.configure(state='disabled')
+        cancel_button.configure(state='normal')
+        progress_bar['value'] = 0
+        progress_label.configure(text='Leyendo archivos ZIP...')
+        running['cancel'] = compare_in_background(root, zip1_file, zip2_file, show_progress, finish_compare,
+                                                 verify=VERIFY_MODE, cache=ListingCache() if USE_CACHE else None,
+                                                 hash_cache=HashCache() if USE_CACHE else None,
+                                                 result_cache=ResultCache() if USE_CACHE else None,
+                                                 moves=MOVES_MODE)
+
+    def show_cached_result(event=None):
+        """Muestra al instante el resultado guardado de la pareja elegida, si ninguno de los ZIPs ha cambiado."""
+        zip1_file, zip2_file = zip1_path.get(), zip2_path.get()
+        if not USE_CACHE or running['cancel'] is not None or not zip1_file or not zip2_file:
+            return
+        _, data = ResultCache().load(zip1_file, zip2_file, result_variant(VERIFY_MODE, moves=MOVES_MODE))
+        if data is None:
+            logger.debug(f"Sin resultado en caché para {zip1_file} y {zip2_file}")
+            return
+        result = result_from_data(zip1_file, zip2_file, data)
+        finish_compare('done', result)
+        progress_bar['value'] = 1
+        progress_label.configure(text=f"Resultado de la caché: {len(result.entries)} entradas")
+
+    zip1_combo.bind('<<ComboboxSelected>>', show_cached_result)
+    zip2_combo.bind('<<ComboboxSelected>>', show_cached_result)
+
+    def cancel_compare():
+        """Solicita la cancelación de la comparación en curso."""
+        if running['cancel'] is not None:
+            running['cancel'].set()
+            cancel_button.configure(state='disabled')
+            progress_label.configure(text='Cancelando...')
+
+    def show_progress(done, total, done_bytes, total_bytes):
+        """Actualiza la barra de progreso (entradas y bytes procesados)."""
+        progress_bar['value'] = done / total if total else 1
+        progress_label.configure(text=f"{done}/{total} entradas, {done_bytes}/{total_bytes} bytes")
+
+    def finish_compare(status, payload):
+        """Recibe el resultado del hilo de trabajo y lo muestra en la vista activa."""
+        global current_result
+        running['cancel'] = None
+        compare_button.configure(state='normal')
+        cancel_button.configure(state='disabled')
+        if status == 'done':
+            progress_label.configure(text=f"Completado: {len(payload.entries)} entradas")
+            if VIRTUAL_VIEW:
+                # Exportación, sincronización y los Treeview usan también este resultado; los
+                # Treeview se vacían (sus mapas eran del anterior) y se pintan al volver a ellos
+                current_result = payload
+                tree1.delete(*tree1.get_children())
+                tree2.delete(*tree2.get_children())
+                clear_item_maps()
+                lazy_pending.clear()
+                trees_stale['value'] = True
+                canvas_view.set_result(payload)
+            else:
+                display_result(payload, tree1, tree2)
+        elif status == 'cancelled':
+            progress_bar['value'] = 0
+            progress_label.configure(text='Comparación cancelada')
+            logger.info("Comparación cancelada por el usuario")
+        else:
+            progress_label.configure(text='Error')
+            messagebox.showerror("Error", str(payload))
+            logger.error(f"Error durante la comparación: {str(payload)}")
+
+    def export_html():
+        """Guarda el resultado mostrado como informe HTML autocontenido."""
+        result = canvas_view.result if VIRTUAL_VIEW else current_result
+        if result is None:
+            messagebox.showerror("Error", "No hay ninguna comparación que exportar.")
+            logger.error("Exportación HTML sin comparación")
+            return
+        path = filedialog.asksaveasfilename(defaultextension='.html', filetypes=[('Informe HTML', '*.html')])
+        if not path:
+            return
+        try:
+            write_html_report(result, path)
+            logger.info(f"Informe HTML guardado en {path}")
+        except OSError as e:
+            messagebox.showerror("Error", str(e))
+            logger.error(f"Error al guardar el informe HTML: {str(e)}")
+
+    def toggle_virtual_view(var):
+        """Alterna entre los Treeview y la vista virtualizada."""
+        global VIRTUAL_VIEW
+        VIRTUAL_VIEW = var.get()
+        if VIRTUAL_VIEW:
+            tree_frame.pack_forget()
+            canvas_view.pack(fill='both', expand=True)
+            # Mostrar la última comparación de los Treeview si la vista aún no tiene una
+            if canvas_view.result is None and current_result is not None:
+                canvas_view.set_result(current_result)
+        else:
+            canvas_view.pack_forget()
+            tree_frame.pack(fill='both', expand=True)
+            # Pintar la comparación hecha con la vista virtual si los Treeview aún no la muestran
+            if trees_stale['value']:
+                trees_stale['value'] = False
+                display_result(current_result, tree1, tree2)
+        logger.info(f"Vista virtual {'habilitada' if VIRTUAL_VIEW else 'deshabilitada'}")
+
     def toggle_sync(var):
         """Activa o desactiva la sincronización."""
         global ENABLE_SYNC
         ENABLE_SYNC = var.get()
         logger.info(f"Sincronización {'habilitada' if ENABLE_SYNC else 'deshabilitada'}")
 
+    def toggle_lazy_load(var):
+        """Activa o desactiva la carga perezosa (se aplica en la siguiente comparación)."""
+        global LAZY_LOAD
+        LAZY_LOAD = var.get()
+        logger.info(f"Carga perezosa {'habilitada' if LAZY_LOAD else 'deshabilitada'}")
+
+    def set_verify_mode(option):
+        """Selecciona el modo de verificación de contenido."""
+        global VERIFY_MODE
+        VERIFY_MODE = VERIFY_OPTIONS[option]
+        logger.info(f"Verificación de contenido: {option}")
+
+    def set_moves_mode(option):
+        """Selecciona el modo de detección de archivos movidos."""
+        global MOVES_MODE
+        MOVES_MODE = MOVES_OPTIONS[option]
+        logger.info(f"Detección de movidos: {option}")
+
+    def toggle_cache(var):
+        """Activa o desactiva las cachés persistentes de listados, hashes y resultados."""
+        global USE_CACHE
+        USE_CACHE = var.get()
+        logger.info(f"Cachés persistentes {'habilitadas' if USE_CACHE else 'deshabilitadas'}")
+
     def sync_selection(event):
         """Sincroniza la selección entre árboles, si está habilitada."""
         global last_event_timestamp
@@ -203,13 +441,20 @@ def main():
         target_tree = tree2 if source_tree == tree1 else tree1
         logger.debug(f"Iniciando sync_selection desde {source_tree} a {target_tree}")
 
+        source_side = 0 if source_tree == tree1 else 1
         selected = source_tree.selection()
         target_selected = target_tree.selection()
         if selected:
-            selected_path = get_full_path(source_tree, selected[0])
-            logger.debug(f"Ruta seleccionada: {selected_path}")
-            if selected_path in node_map:
-                target_id = node_map[selected_path][1] if source_tree == tree1 else node_map[selected_path][0]
+            row = item_rows[source_side].get(selected[0])
+            logger.debug(f"Fila seleccionada: {row}")
+            items = row_items.get(row)
+            entry = current_result.entry(row) if current_result and row is not None else None
+            if entry is not None and entry.counterpart and current_result.present(entry, source_side + 1):
+                # Archivo o directorio movido: se selecciona su otro extremo, cargando y abriendo sus directorios
+                items = reveal_path(entry.counterpart, tree1, tree2)
+                logger.debug(f"Selección enlazada con el archivo movido {entry.counterpart}")
+            if items:
+                target_id = items[1 - source_side]
                 if target_id not in target_selected:
                     logger.debug(f"Actualizando selección a {target_id} en {target_tree}")
                     target_tree.selection_set(target_id)
@@ -218,7 +463,7 @@ def main():
                 else:
                     logger.debug("No se necesita cambio en la selección")
             else:
-                logger.debug(f"Ruta no encontrada en node_map: {selected_path}")
+                logger.debug(f"Item sin nodo en el otro árbol: {selected[0]}")
         else:
             if target_selected:
                 logger.debug(f"Eliminando selección en {target_tree}")
@@ -241,12 +486,13 @@ def main():
         source_tree = event.widget
         target_tree = tree2 if source_tree == tree1 else tree1
         logger.debug(f"Iniciando sync_open desde {source_tree} a {target_tree}")
+        source_side = 0 if source_tree == tree1 else 1
         item = source_tree.focus()
         if item:
-            item_path = get_full_path(source_tree, item)
-            logger.debug(f"Ruta del item: {item_path}")
-            if item_path in node_map:
-                target_id = node_map[item_path][1] if source_tree == tree1 else node_map[item_path][0]
+            items = row_items.get(item_rows[source_side].get(item))
+            logger.debug(f"Items del nodo: {items}")
+            if items:
+                target_id = items[1 - source_side]
                 source_open = source_tree.item(item, 'open')
                 target_open = target_tree.item(target_id, 'open')
                 if source_open != target_open:
@@ -259,39 +505,29 @@ def main():
                 else:
                     logger.debug("No se necesita cambio en el estado open")
             else:
-                logger.debug(f"Ruta no encontrada en node_map: {item_path}")
+                logger.debug(f"Item sin nodo en el otro árbol: {item}")
         logger.debug("Completado sync_open")
 
-    def get_full_path(tree, item):
-        """Obtiene la ruta completa de un item en el árbol."""
-        path = []
-        current = item
-        while current:
-            path.append(tree.item(current)['text'])
-            current = tree.parent(current)
-        full_path = '/'.join(reversed(path))
-        # Asegurar que los directorios terminen en '/'
-        if tree.item(item)['values'] == ['', ''] and not full_path.endswith('/'):
-            full_path += '/'
-        return full_path
+    def on_open(event):
+        """Carga los hijos pendientes del nodo expandido en ambos árboles y sincroniza la expansión."""
+        item = event.widget.focus()
+        row = item_rows[0 if event.widget == tree1 else 1].get(item) if item else None
+        if row is not None and current_result is not None:
+            expand_lazy(current_result.store.path(row), tree1, tree2)
+        sync_open(event)
 
     # Vincular eventos de selección y expansión
     tree1.bind('<<TreeviewSelect>>', sync_selection)
     tree2.bind('<<TreeviewSelect>>', sync_selection)
-    tree1.bind('<<TreeviewOpen>>', sync_open)
-    tree2.bind('<<TreeviewOpen>>', sync_open)
+    tree1.bind('<<TreeviewOpen>>', on_open)
+    tree2.bind('<<TreeviewOpen>>', on_open)
     tree1.bind('<<TreeviewClose>>', sync_open)
     tree2.bind('<<TreeviewClose>>', sync_open)
 
     # Configurar colores para diferencias
     for tree in (tree1, tree2):
-        tree.tag_configure('only_zip1', background='lightblue')
-        tree.tag_configure('only_zip2', background='lightgreen')
-        tree.tag_configure('content_diff', background='yellow')
-        tree.tag_configure('date_diff', background='orange')
-        tree.tag_configure('same', background='white')
-        tree.tag_configure('placeholder', background='gray95', foreground='gray50')
-        tree.tag_configure('dir_diff', background='lightcoral')
+        for tag, style in TAG_STYLES.items():
+            tree.tag_configure(tag, **style)
 
     # Crear archivos ZIP de prueba si no existen
     create_test_zips_if_not_exist()
@@ -313,6 +549,10 @@ def main():
         save_recent_zips()
         logger.info("Modo DEBUG: Cargados automáticamente test1.zip y test2.zip")
 
+    if PREWARM and USE_CACHE:
+        pair = (RECENT_ZIPS_1[0], RECENT_ZIPS_2[0]) if PREWARM_LAST_PAIR and RECENT_ZIPS_1 and RECENT_ZIPS_2 else None
+        start_prewarm(RECENT_ZIPS_1 + RECENT_ZIPS_2, pair, prewarm_cancel, verify=VERIFY_MODE, moves=MOVES_MODE)
+
     root.mainloop()
 
 def select_zip(path_var, combo, recent_list):
@@ -338,7 +578,7 @@ def sync_scroll(tree1, tree2, *args):
     return 'break'
 
 def compare(zip1_file, zip2_file, tree1, tree2):
-    """Compara dos archivos ZIP y muestra diferencias en los árboles."""
+    """Compara dos archivos ZIP con el motor sin interfaz y muestra el resultado en los árboles."""
     if not zip1_file or not zip2_file:
         messagebox.showerror("Error", "Por favor, seleccione ambos archivos ZIP.")
         logger.error("Falta selección de archivo ZIP")
@@ -347,121 +587,240 @@ def compare(zip1_file, zip2_file, tree1, tree2):
     logger.info(f"Iniciando comparación de {zip1_file} y {zip2_file}")
 
     try:
-        with zipfile.ZipFile(zip1_file) as z1, zipfile.ZipFile(zip2_file) as z2:
-            namelist1 = z1.namelist()
-            namelist2 = z2.namelist()
-            all_members = sorted(set(namelist1) | set(namelist2))
-            info1 = {name: z1.getinfo(name) for name in namelist1}
-            info2 = {name: z2.getinfo(name) for name in namelist2}
-
-            logger.info(f"Encontrados {len(namelist1)} archivos en ZIP1, {len(namelist2)} en ZIP2")
-            logger.info(f"Total de miembros únicos: {len(all_members)}")
-
-            # Limpiar árboles y mapa de nodos
-            tree1.delete(*tree1.get_children())
-            tree2.delete(*tree2.get_children())
-            global node_map
-            node_map.clear()
-            logger.debug("node_map limpiado")
-
-            # Estructura para almacenar nodos
-            parent_map1 = {'': ''}
-            parent_map2 = {'': ''}
-            dir_tags = {}  # Mapa para rastrear etiquetas de directorios
-
-            for full_path in all_members:
-                is_dir = full_path.endswith('/')
-                parts = full_path.rstrip('/').split('/')
-                parent1 = parent2 = ''
-                current_path = ''
-
-                for i, part in enumerate(parts):
-                    if i < len(parts) - 1 or is_dir:
-                        current_path = '/'.join(parts[:i+1]) + '/'
-                    else:
-                        current_path = '/'.join(parts[:i+1])
-
-                    # Árbol 1
-                    children1 = tree1.get_children(parent1)
-                    found1 = None
-                    for c in children1:
-                        if tree1.item(c)['text'] == part:
-                            found1 = c
-                            break
-
-                    # Árbol 2
-                    children2 = tree2.get_children(parent2)
-                    found2 = None
-                    for c in children2:
-                        if tree2.item(c)['text'] == part:
-                            found2 = c
-                            break
-
-                    inf1 = info1.get(full_path)
-                    inf2 = info2.get(full_path)
-
-                    if i < len(parts) - 1 or is_dir:
-                        # Directorio
-                        if not found1:
-                            found1 = tree1.insert(parent1, 'end', text=part, values=('', ''), open=False)
-                            parent_map1[current_path] = found1
-                        if not found2:
-                            found2 = tree2.insert(parent2, 'end', text=part, values=('', ''), open=False)
-                            parent_map2[current_path] = found2
-                    else:
-                        # Archivo
-                        size1 = f"{inf1.file_size} bytes" if inf1 else ''
-                        date1 = datetime(*inf1.date_time).strftime('%Y-%m-%d %H:%M:%S') if inf1 else ''
-                        size2 = f"{inf2.file_size} bytes" if inf2 else ''
-                        date2 = datetime(*inf2.date_time).strftime('%Y-%m-%d %H:%M:%S') if inf2 else ''
-
-                        tag = 'same'
-                        if not inf1:
-                            tag = 'only_zip2'
-                            found1 = tree1.insert(parent1, 'end', text=part, values=(size1, date1), tags=('placeholder',))
-                            found2 = tree2.insert(parent2, 'end', text=part, values=(size2, date2), tags=(tag,))
-                        elif not inf2:
-                            tag = 'only_zip1'
-                            found1 = tree1.insert(parent1, 'end', text=part, values=(size1, date1), tags=(tag,))
-                            found2 = tree2.insert(parent2, 'end', text=part, values=(size2, date2), tags=('placeholder',))
-                        else:
-                            if inf1.file_size != inf2.file_size or inf1.CRC != inf2.CRC:
-                                tag = 'content_diff'
-                            elif inf1.date_time != inf2.date_time:
-                                tag = 'date_diff'
-                            found1 = tree1.insert(parent1, 'end', text=part, values=(size1, date1), tags=(tag,))
-                            found2 = tree2.insert(parent2, 'end', text=part, values=(size2, date2), tags=(tag,))
-
-                        # Actualizar etiquetas de directorios padre
-                        for j in range(i, -1, -1):
-                            dir_path = '/'.join(parts[:j]) + '/' if j > 0 else ''
-                            if dir_path in parent_map1:
-                                dir_tags.setdefault(dir_path, set()).add(tag)
-                        logger.debug(f"Archivo procesado: {full_path}, Etiqueta: {tag}")
-
-                    parent1 = parent_map1.get(current_path, found1)
-                    parent2 = parent_map2.get(current_path, found2)
-
-                    # Mapear nodos para sincronización
-                    node_map[current_path] = (found1, found2)
-                    logger.debug(f"Añadido a node_map: {current_path} -> ({found1}, {found2})")
-
-            # Aplicar etiquetas a directorios según contenido
-            for dir_path, tags in dir_tags.items():
-                tag = 'same'
-                if 'only_zip1' in tags or 'only_zip2' in tags or 'content_diff' in tags or 'date_diff' in tags:
-                    tag = 'dir_diff'
-                if dir_path in parent_map1:
-                    tree1.item(parent_map1[dir_path], tags=(tag,))
-                    tree2.item(parent_map2[dir_path], tags=(tag,))
-                logger.debug(f"Directorio {dir_path} etiquetado como {tag}")
-
-            logger.debug(f"node_map final: {node_map}")
-
+        display_result(compare_zips(zip1_file, zip2_file), tree1, tree2)
     except Exception as e:
         messagebox.showerror("Error", str(e))
         logger.error(f"Error durante la comparación: {str(e)}")
 
+def clear_item_maps():
+    """Vacía los mapas entre filas del modelo e items de los árboles."""
+    row_items.clear()
+    item_rows[0].clear()
+    item_rows[1].clear()
+
+def display_result(result, tree1, tree2):
+    """Sustituye el contenido de los árboles y sus mapas por un resultado completo (hilo de Tk)."""
+    tree1.delete(*tree1.get_children())
+    tree2.delete(*tree2.get_children())
+    global current_result
+    clear_item_maps()
+    lazy_pending.clear()
+    current_result = result
+    logger.debug("Mapas de items limpiados")
+
+    populate_trees(result, tree1, tree2, lazy=LAZY_LOAD)
+
+    logger.debug(f"Items insertados: {len(row_items)} nodos")
+
+def compare_in_background(root, zip1_file, zip2_file, on_progress, on_done, verify=None, cache=None,
+                          hash_cache=None, result_cache=None, moves=None):
+    """Ejecuta compare_zips en un hilo de trabajo y entrega sus mensajes en el hilo de Tk.
+
+    El hilo solo construye el modelo; los árboles y sus mapas de items se tocan exclusivamente desde
+    on_done, así que una comparación cancelada o fallida no deja nada a medias.
+    on_done recibe ('done', DiffResult), ('cancelled', None) o ('error', excepción).
+    Devuelve el threading.Event que cancela la comparación.
+    """
+    messages = queue.Queue()
+    cancel_event = threading.Event()
+
+    def worker():
+        try:
+            result = compare_zips(zip1_file, zip2_file, progress=lambda *p: messages.put(('progress', p)),
+                                  cancel=cancel_event, verify=verify, cache=cache, hash_cache=hash_cache,
+                                  result_cache=result_cache, moves=moves)
+            messages.put(('done', result))
+        except CompareCancelled:
+            messages.put(('cancelled', None))
+        except Exception as e:
+            messages.put(('error', e))
+
+    def poll():
+        last_progress = None
+        try:
+            while True:
+                kind, payload = messages.get_nowait()
+                if kind == 'progress':
+                    last_progress = payload
+                    continue
+                if last_progress:
+                    on_progress(*last_progress)
+                on_done(kind, payload)
+                return
+        except queue.Empty:
+            pass
+        if last_progress:
+            on_progress(*last_progress)
+        root.after(POLL_INTERVAL_MS, poll)
+
+    threading.Thread(target=worker, daemon=True).start()
+    root.after(POLL_INTERVAL_MS, poll)
+    return cancel_event
+
+def prewarm_caches(zip_files, pair=None, cache=None, result_cache=None, cancel=None, verify=None, moves=None):
+    """Analiza y guarda en caché los listados de los ZIPs indicados y, si se da pair, su resultado.
+
+    Los archivos inexistentes o dañados se ignoran. Se detiene sin error si cancel se activa.
+    """
+    cache = cache or ListingCache()
+    try:
+        for zip_file in dict.fromkeys(zip_files):
+            check_cancel(cancel)
+            if not os.path.isfile(zip_file):
+                continue
+            try:
+                zip_diff_engine.read_sorted_listing(zip_file, cache=cache)
+            except (OSError, zipfile.BadZipFile) as e:
+                logger.debug(f"Precarga: no se pudo leer {zip_file}: {str(e)}")
+        if pair and all(os.path.isfile(zip_file) for zip_file in pair):
+            compare_zips(*pair, cancel=cancel, verify=verify, moves=moves, cache=cache,
+                         result_cache=result_cache or ResultCache())
+            logger.info(f"Precarga: resultado de {pair[0]} y {pair[1]} listo")
+    except CompareCancelled:
+        logger.debug("Precarga cancelada")
+    except Exception as e:
+        logger.warning(f"Error durante la precarga: {str(e)}")
+
+def lower_thread_priority():
+    """Baja la prioridad del hilo actual cuando el sistema lo permite (Linux asigna prioridad por hilo)."""
+    if sys.platform.startswith('linux') and hasattr(os, 'setpriority'):
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except OSError as e:
+            logger.debug(f"No se pudo bajar la prioridad del hilo: {str(e)}")
+
+def start_prewarm(zip_files, pair, cancel, verify=None, moves=None):
+    """Lanza prewarm_caches en un hilo de baja prioridad y devuelve el hilo."""
+    def worker():
+        lower_thread_priority()
+        prewarm_caches(zip_files, pair, cancel=cancel, verify=verify, moves=moves)
+
+    thread = threading.Thread(target=worker, name='prewarm', daemon=True)
+    thread.start()
+    logger.info(f"Precarga en segundo plano de {len(set(zip_files))} ZIPs recientes")
+    return thread
+
+def insert_node(result, entry, tree1, tree2, dates=None):
+    """Inserta un nodo del modelo en ambos árboles, con su padre resuelto por fila en row_items.
+
+    dates son las fechas (ZIP1, ZIP2) ya formateadas con DiffResult.format_dates(); si no se
+    indican se formatean solo las de este nodo.
+    """
+    full_path = entry.path
+    row = entry.row
+    parent1, parent2 = row_items.get(result.store.parent[row], ('', ''))
+    if entry.is_dir:
+        tags = (result.dir_status(full_path),) if full_path in result.dir_tags else ()
+        # Bytes de cada lado y recuento de diferencias, ya agregados en el modelo
+        bytes1, bytes2 = result.dir_bytes.get(full_path, (0, 0))
+        changes1 = changes2 = result.dir_changes(full_path)
+        if entry.counterpart:
+            if result.present(entry, 1):
+                changes1 += entry.move_note(in_zip1=True)
+            else:
+                changes2 += entry.move_note(in_zip1=False)
+        found1 = tree1.insert(parent1, 'end', text=entry.name, values=(f"{bytes1} bytes", '', changes1),
+                              tags=tags, open=False)
+        found2 = tree2.insert(parent2, 'end', text=entry.name, values=(f"{bytes2} bytes", '', changes2),
+                              tags=tags, open=False)
+        logger.debug(f"Directorio {full_path} etiquetado como {tags}")
+    else:
+        inf1 = entry.info1
+        inf2 = entry.info2
+        size1 = f"{inf1.file_size} bytes" if inf1 else ''
+        size2 = f"{inf2.file_size} bytes" if inf2 else ''
+        date1, date2 = dates or result.format_dates([entry])[0]
+        if entry.diff_offset is not None:
+            size1 += f" (dif. en byte {entry.diff_offset})"
+            size2 += f" (dif. en byte {entry.diff_offset})"
+        if entry.counterpart:
+            if entry.info1:
+                size1 += entry.move_note()
+            else:
+                size2 += entry.move_note()
+
+        tag = entry.status
+        found1 = tree1.insert(parent1, 'end', text=entry.name, values=(size1, date1, ''), tags=(entry.side_tag(1),))
+        found2 = tree2.insert(parent2, 'end', text=entry.name, values=(size2, date2, ''), tags=(entry.side_tag(2),))
+        logger.debug(f"Archivo procesado: {full_path}, Etiqueta: {tag}")
+
+    # Mapear nodos en ambos sentidos para la sincronización
+    row_items[row] = (found1, found2)
+    item_rows[0][found1] = row
+    item_rows[1][found2] = row
+    logger.debug(f"Fila {row} ({full_path}) -> ({found1}, {found2})")
+    return found1, found2
+
+def insert_children(result, dir_path, tree1, tree2):
+    """Inserta los hijos directos de un directorio; los subdirectorios reciben un hijo ficticio."""
+    entries = result.child_entries(dir_path)
+    # Fechas de todos los hijos en bloque: solo se formatean las de los nodos que se insertan
+    for entry, dates in zip(entries, result.format_dates(entries)):
+        found1, found2 = insert_node(result, entry, tree1, tree2, dates)
+        if entry.is_dir and result.children[entry.path]:
+            defer_children(entry.path, found1, found2, tree1, tree2)
+
+def defer_children(dir_path, found1, found2, tree1, tree2):
+    """Deja pendientes los hijos de un directorio ya insertado, con un hijo ficticio para que muestre
+    el indicador de expansión; expand_lazy() los inserta al abrirlo."""
+    dummy1 = tree1.insert(found1, 'end', text='...', tags=('placeholder',))
+    dummy2 = tree2.insert(found2, 'end', text='...', tags=('placeholder',))
+    lazy_pending[dir_path] = (dummy1, dummy2)
+
+def expand_lazy(dir_path, tree1, tree2):
+    """Materializa en ambos árboles los hijos pendientes de un directorio. Devuelve True si había."""
+    pending = lazy_pending.pop(dir_path, None)
+    if pending is None or current_result is None:
+        return False
+    tree1.delete(pending[0])
+    tree2.delete(pending[1])
+    insert_children(current_result, dir_path, tree1, tree2)
+    logger.debug(f"Hijos de {dir_path} cargados bajo demanda")
+    return True
+
+def path_items(full_path):
+    """Items (id_tree1, id_tree2) de una ruta ya insertada en los árboles, o None."""
+    if current_result is None:
+        return None
+    return row_items.get(current_result.store.find(full_path))
+
+def reveal_path(full_path, tree1, tree2):
+    """Carga (si hay carga perezosa) y abre en ambos árboles los directorios que contienen una ruta.
+
+    Devuelve los items (id_tree1, id_tree2) de la ruta, o None si no está en los árboles.
+    """
+    for dir_path in reversed(parent_dirs(full_path)[:-1]):
+        expand_lazy(dir_path, tree1, tree2)
+        items = path_items(dir_path)
+        if items:
+            tree1.item(items[0], open=True)
+            tree2.item(items[1], open=True)
+    return path_items(full_path)
+
+def populate_trees(result, tree1, tree2, lazy=False):
+    """Inserta el modelo en ambos árboles: completo, o solo el primer nivel en modo perezoso.
+
+    En modo completo, los subárboles idénticos en ambos ZIPs (mismo hash de Merkle) no se insertan:
+    quedan pendientes como en la carga perezosa hasta que se expanden.
+    """
+    if lazy:
+        insert_children(result, '', tree1, tree2)
+        return
+    # El índice garantiza que los padres aparecen antes que sus hijos, y las rutas de un
+    # subárbol son consecutivas
+    skipped = None
+    shown = []
+    for entry in result.nodes.values():
+        if skipped and entry.path.startswith(skipped):
+            continue
+        shown.append(entry)
+        if entry.is_dir and result.children[entry.path] and result.same_subtree(entry.path):
+            skipped = entry.path
+    for entry, dates in zip(shown, result.format_dates(shown)):
+        found1, found2 = insert_node(result, entry, tree1, tree2, dates)
+        if entry.is_dir and result.children[entry.path] and result.same_subtree(entry.path):
+            defer_children(entry.path, found1, found2, tree1, tree2)
+
 def create_test_zips_if_not_exist():
     """Crea archivos ZIP de prueba solo si no existen."""
     if os.path.exists('test1.zip') and os.path.exists('test2.zip'):
@@ -0,0 +1,196 @@
+# Acceso al contenido de las entradas de un ZIP
+#
+# Descripción:
+# Funciones de bajo nivel para leer el contenido de las entradas de un ZIP por bloques,
+# sin cargar nunca una entrada completa en memoria. Las usa zip_diff_engine cuando la
+# comparación de listados (tamaño y CRC) no es suficiente.
+# - Hash criptográfico (SHA-256 o BLAKE2) de una entrada, leyendo por bloques.
+# - Comparación byte a byte de dos entradas por bloques, con salida en la primera diferencia.
+# - Comparación directa de los datos comprimidos (sin descomprimir) cuando ambas entradas usan
+#   el mismo método y tamaño comprimido.
+# - Proyección en memoria (mmap) de los archivos ZIP: los datos comprimidos y las entradas STORED
+#   se comparan y se calculan sus hashes directamente sobre la proyección, sin copias.
+#
+# Dependencias:
+# - Python 3.x
+# - zipfile, hashlib, os, struct, mmap (módulos estándar de Python)
+
+import hashlib
+import mmap
+import os
+import struct
+import zipfile
+
+# Tamaño de bloque para leer el contenido de las entradas
+CHUNK_SIZE = 1024 * 1024
+
+# Algoritmos de hash admitidos para la verificación de contenido
+HASH_ALGORITHMS = ('sha256', 'blake2b')
+DEFAULT_HASH_ALGORITHM = 'sha256'
+
+# Cabecera local de archivo: firma, versión, flags, método, hora, fecha, CRC, tamaños, longitudes
+LOCAL_HEADER_FORMAT = '<4s5H3L2H'
+LOCAL_HEADER_SIZE = struct.calcsize(LOCAL_HEADER_FORMAT)
+LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+
+
+class CompareCancelled(Exception):
+    """Se lanza cuando la comparación se cancela antes de terminar."""
+
+
+def check_cancel(cancel):
+    """Lanza CompareCancelled si se ha solicitado la cancelación (cancel es un threading.Event)."""
+    if cancel is not None and cancel.is_set():
+        raise CompareCancelled("Comparación cancelada")
+
+
+def default_workers():
+    """Número de hilos de trabajo por defecto: uno por CPU disponible."""
+    return os.cpu_count() or 1
+
+
+def hash_member(archive, name, algorithm=DEFAULT_HASH_ALGORITHM, chunk_size=CHUNK_SIZE, cancel=None):
+    """Calcula el hash de una entrada de un ZipFile abierto, leyéndola por bloques.
+
+    Devuelve el hash en hexadecimal. Lanza CompareCancelled si cancel (threading.Event) se activa.
+    """
+    digest = hashlib.new(algorithm)
+    with archive.open(name) as member:
+        while True:
+            check_cancel(cancel)
+            chunk = member.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def views_equal(view1, view2):
+    """Compara dos memoryview de bytes sin copiarlos, por palabras de 8 bytes (mucho más rápido que byte a byte)."""
+    if len(view1) != len(view2):
+        return False
+    words = len(view1) // 8 * 8
+    return view1[:words].cast('Q') == view2[:words].cast('Q') and view1[words:] == view2[words:]
+
+
+def first_mismatch(chunk1, chunk2):
+    """Devuelve la posición del primer byte distinto entre dos bloques (o la longitud común)."""
+    view1, view2 = memoryview(chunk1), memoryview(chunk2)
+    low, high = 0, min(len(chunk1), len(chunk2))
+    if views_equal(view1[:high], view2[:high]):
+        return high
+    # Búsqueda binaria con comparaciones de memoria: la diferencia está siempre en [low, high)
+    while high - low > 1:
+        middle = (low + high) // 2
+        if views_equal(view1[low:middle], view2[low:middle]):
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def compare_members(archive1, name1, archive2, name2, chunk_size=CHUNK_SIZE, cancel=None):
+    """Compara dos entradas descomprimiéndolas a la par por bloques de tamaño fijo.
+
+    Devuelve el desplazamiento del primer byte distinto, o None si son idénticas. Se detiene en
+    el primer bloque distinto y nunca mantiene en memoria más de un bloque por entrada, por lo
+    que sirve para entradas ZIP64 mayores que la RAM.
+    """
+    offset = 0
+    with archive1.open(name1) as member1, archive2.open(name2) as member2:
+        while True:
+            check_cancel(cancel)
+            chunk1 = member1.read(chunk_size)
+            chunk2 = member2.read(chunk_size)
+            if chunk1 != chunk2:
+                return offset + first_mismatch(chunk1, chunk2)
+            if not chunk1:
+                return None
+            offset += len(chunk1)
+
+
+def data_offset(buffer, header_offset):
+    """Devuelve la posición de los datos comprimidos de una entrada a partir de su cabecera local."""
+    if header_offset + LOCAL_HEADER_SIZE > len(buffer):
+        raise ValueError(f"Cabecera local truncada en {header_offset}")
+    fields = struct.unpack_from(LOCAL_HEADER_FORMAT, buffer, header_offset)
+    if fields[0] != LOCAL_HEADER_SIGNATURE:
+        raise ValueError(f"Firma de cabecera local incorrecta en {header_offset}")
+    # Las longitudes del nombre y del campo extra de la cabecera local pueden diferir del directorio central
+    return header_offset + LOCAL_HEADER_SIZE + fields[9] + fields[10]
+
+
+def can_compare_raw(info1, info2):
+    """Indica si dos entradas pueden compararse por sus datos comprimidos (mismo método y tamaño, sin cifrar)."""
+    return (info1.compress_type == info2.compress_type
+            and info1.compress_size == info2.compress_size
+            and not (info1.flag_bits | info2.flag_bits) & 0x1)
+
+
+def is_stored(info):
+    """Indica si una entrada está almacenada sin comprimir ni cifrar (sus datos son el contenido)."""
+    return info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1
+
+
+class ArchiveMapping:
+    """Proyección en memoria (mmap) de solo lectura de un archivo ZIP completo.
+
+    Puede compartirse entre hilos. Los memoryview devueltos por data_range() deben liberarse
+    (por ejemplo con un bloque with) antes de cerrar la proyección.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def data_range(self, info):
+        """Devuelve un memoryview, sin copia, de los datos comprimidos de una entrada."""
+        start = data_offset(self._map, info.header_offset)
+        if start + info.compress_size > len(self._map):
+            raise ValueError(f"Datos truncados para la entrada en {info.header_offset}")
+        return memoryview(self._map)[start:start + info.compress_size]
+
+
+def views_first_mismatch(view1, view2, chunk_size=CHUNK_SIZE, cancel=None):
+    """Compara dos rangos de memoria por bloques y devuelve el primer byte distinto, o None si son iguales."""
+    length = min(len(view1), len(view2))
+    for start in range(0, length, chunk_size):
+        check_cancel(cancel)
+        end = min(start + chunk_size, length)
+        if not views_equal(view1[start:end], view2[start:end]):
+            return start + first_mismatch(view1[start:end], view2[start:end])
+    return None if len(view1) == len(view2) else length
+
+
+def hash_view(view, algorithm=DEFAULT_HASH_ALGORITHM, chunk_size=CHUNK_SIZE, cancel=None):
+    """Calcula el hash de un rango de memoria por bloques (sin copias; hashlib libera el GIL)."""
+    digest = hashlib.new(algorithm)
+    for start in range(0, len(view), chunk_size):
+        check_cancel(cancel)
+        digest.update(view[start:start + chunk_size])
+    return digest.hexdigest()
+
+
+def raw_streams_equal(mapping1, info1, mapping2, info2, chunk_size=CHUNK_SIZE, cancel=None):
+    """Compara por bloques los datos comprimidos de dos entradas sin descomprimirlos.
+
+    Si son idénticos (con el mismo método), el contenido descomprimido también lo es. Devuelve
+    False en la primera diferencia; en ese caso hay que recurrir a la descompresión.
+    """
+    with mapping1.data_range(info1) as view1, mapping2.data_range(info2) as view2:
+        return views_first_mismatch(view1, view2, chunk_size, cancel) is None
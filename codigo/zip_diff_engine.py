@@ -0,0 +1,1099 @@
+# Motor de comparación de ZIP (sin interfaz gráfica)
+#
+# Descripción:
+# Este módulo contiene la lógica de comparación de dos archivos ZIP separada de la interfaz Tk.
+# Lee ambos archivos, clasifica cada entrada y devuelve un modelo de diferencias en memoria
+# (DiffResult) que puede ser consumido por la interfaz gráfica o por procesos por lotes sin display.
+# - Estados de archivo: only_zip1, only_zip2, content_diff, date_diff, same.
+# - Listado leído con el lector rápido del directorio central (zip_central_dir) en lugar de zipfile,
+#   opcionalmente a través de la caché persistente de listados (zip_cache.ListingCache).
+# - Los listados se ordenan una vez (la caché los guarda ya ordenados) y se recorren a la par
+#   (merge join), sin construir la unión de nombres ni diccionarios de MemberInfo intermedios.
+# - Agregados por directorio (recuento de estados y bytes de cada lado de los archivos que contiene),
+#   calculados en una sola pasada de abajo arriba sobre el índice de directorios. En la misma pasada
+#   se calcula un hash de Merkle por directorio y lado (nombres, tamaños y CRC de sus hijos): dos
+#   directorios con el mismo hash tienen el mismo contenido, sin recorrerlos.
+# - Índice de nodos por ruta (incluidos directorios implícitos) con sus hijos, para construir
+#   los árboles sin consultar los widgets. Las entradas se guardan en columnas compactas
+#   (zip_entry_store.EntryStore, con los componentes de ruta internados) y se leen con vistas
+#   StoredEntry, sin un objeto Python por entrada y lado.
+# - Los archivos se clasifican todos a la vez y los recuentos y bytes por directorio se agregan sobre
+#   esas columnas (zip_columnar), con operaciones vectorizadas si NumPy está instalado; las fechas
+#   se formatean en bloque y solo para las filas que se muestran.
+# - Verificación de contenido opcional, en paralelo por un grupo de hilos: las entradas con igual
+#   tamaño y CRC se comparan con un hash criptográfico, o byte a byte por bloques indicando el
+#   desplazamiento de la primera diferencia. Antes de descomprimir se comparan los datos
+#   comprimidos cuando ambas entradas usan el mismo método y tamaño comprimido. Ambos ZIPs se
+#   proyectan en memoria (mmap) y las entradas STORED se comparan directamente sobre la proyección.
+#   Los hashes pueden guardarse entre sesiones en una zip_cache.HashCache.
+# - Generación de las entradas en streaming (iter_diff, stream_diff, iter_verified) sin construir
+#   el DiffResult, para volcarlas a medida que se clasifican.
+# - Detección opcional de archivos movidos o renombrados: hash join por (tamaño, CRC) de los archivos
+#   presentes solo en uno de los ZIPs, confirmado opcionalmente con un hash criptográfico. En modo
+#   'similar', los archivos de texto que siguen sin pareja se emparejan además por similitud
+#   aproximada (sketches MinHash y LSH de zip_similarity), para los renombrados con ediciones. Los
+#   hilos solo leen y descomprimen esos textos; los sketches, en Python puro y limitados por el GIL,
+#   se calculan en un grupo de procesos.
+#   Antes se emparejan los directorios completos movidos o renombrados por su hash de Merkle.
+# - Resultados completos reutilizables entre sesiones (zip_cache.ResultCache) mientras ninguno de
+#   los dos ZIPs cambie.
+#
+# Dependencias:
+# - Python 3.x
+# - zipfile, hashlib, logging, multiprocessing, time, collections, dataclasses, operator, typing, concurrent.futures
+#   (módulos estándar de Python)
+# - zip_content, zip_central_dir, zip_columnar, zip_entry_store, zip_similarity
+
+import zipfile
+import hashlib
+import logging
+import multiprocessing
+import time
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from operator import itemgetter
+from typing import NamedTuple
+
+from zip_central_dir import iter_central_directory
+from zip_content import (hash_member, hash_view, compare_members, views_first_mismatch, can_compare_raw,
+                         raw_streams_equal, is_stored, ArchiveMapping, check_cancel, default_workers,
+                         CompareCancelled, DEFAULT_HASH_ALGORITHM)
+from zip_columnar import classify_rows, dir_rollups, format_dates
+from zip_entry_store import EntryStore, IS_DIR, IN_ZIP1, IN_ZIP2
+from zip_similarity import member_text, text_sketch, match_sketches, MAX_TEXT_SIZE, SIMILARITY_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+# Estados de comparación (coinciden con las etiquetas de color de la interfaz)
+ONLY_ZIP1 = 'only_zip1'
+ONLY_ZIP2 = 'only_zip2'
+CONTENT_DIFF = 'content_diff'
+DATE_DIFF = 'date_diff'
+SAME = 'same'
+MOVED = 'moved'  # Archivo renombrado o movido: solo en ZIP1 en una ruta y solo en ZIP2 en otra, con el mismo contenido
+DIR_DIFF = 'dir_diff'
+
+# Cada cuántas entradas se comprueba la cancelación y se informa del progreso
+PROGRESS_INTERVAL = 500
+# Segundos mínimos entre avisos de progreso durante la verificación de contenido
+PROGRESS_SECONDS = 0.1
+# Entradas verificadas tras las que se guardan en la caché los hashes nuevos (la memoria no crece
+# con el número de entradas al verificar en streaming)
+HASH_FLUSH_ENTRIES = 10000
+# Bytes de texto a partir de los cuales los sketches MinHash se calculan en un grupo de procesos;
+# con menos, arrancar los procesos cuesta más de lo que se gana
+SKETCH_PROCESS_MIN_BYTES = 8 * 1024 * 1024
+
+# Estilos de las etiquetas: los mismos colores que la leyenda de main() (nombres de color de Tk)
+TAG_STYLES = {
+    ONLY_ZIP1: {'background': 'lightblue'},
+    ONLY_ZIP2: {'background': 'lightgreen'},
+    CONTENT_DIFF: {'background': 'yellow'},
+    DATE_DIFF: {'background': 'orange'},
+    SAME: {'background': 'white'},
+    MOVED: {'background': 'plum'},
+    'placeholder': {'background': 'gray95', 'foreground': 'gray50'},
+    DIR_DIFF: {'background': 'lightcoral'},
+}
+
+FILE_STATUSES = (ONLY_ZIP1, ONLY_ZIP2, CONTENT_DIFF, DATE_DIFF, MOVED, SAME)
+DIFF_STATUSES = (ONLY_ZIP1, ONLY_ZIP2, CONTENT_DIFF, DATE_DIFF, MOVED)
+
+# Textos de los recuentos por directorio (columna "Cambios"), en este orden
+CHANGE_LABELS = ((CONTENT_DIFF, 'cambiados'), (ONLY_ZIP2, 'añadidos'), (ONLY_ZIP1, 'eliminados'),
+                 (MOVED, 'movidos'), (DATE_DIFF, 'con otra fecha'))
+
+# Modos de verificación de contenido
+VERIFY_HASH = 'hash'  # Hash criptográfico de las entradas con igual tamaño y CRC
+VERIFY_BYTES = 'bytes'  # Comparación byte a byte por bloques de todas las entradas presentes en ambos
+VERIFY_MODES = (VERIFY_HASH, VERIFY_BYTES)
+
+# Modos de detección de archivos movidos
+MOVES_CRC = 'crc'  # Mismo tamaño y CRC
+MOVES_HASH = 'hash'  # Mismo tamaño y CRC, confirmado con un hash criptográfico
+MOVES_SIMILAR = 'similar'  # Mismo tamaño y CRC y, para los textos restantes, similitud aproximada (MinHash)
+MOVES_MODES = (MOVES_CRC, MOVES_HASH, MOVES_SIMILAR)
+
+
+class MemberInfo(NamedTuple):
+    """Datos de una entrada del ZIP necesarios para la comparación (tupla inmutable, sin diccionario)."""
+    file_size: int
+    CRC: int
+    date_time: tuple
+    compress_size: int = 0
+    compress_type: int = 0
+    header_offset: int = 0
+    flag_bits: int = 0
+
+
+class _EntryMethods:
+    """Métodos comunes a DiffEntry y a las vistas de filas de un DiffResult (StoredEntry)."""
+    __slots__ = ()
+
+    @property
+    def name(self):
+        """Último componente de la ruta (texto mostrado en el árbol)."""
+        return self.path.rstrip('/').rsplit('/', 1)[-1]
+
+    @property
+    def parent(self):
+        """Ruta del directorio padre ('' para la raíz)."""
+        return parent_path(self.path)
+
+    def side_tag(self, side):
+        """Etiqueta de color de un archivo en el árbol indicado (1 o 2): 'placeholder' si falta en ese ZIP."""
+        return self.status if (self.info1 if side == 1 else self.info2) else 'placeholder'
+
+    def move_note(self, in_zip1=None):
+        """Nota de un archivo movido para las columnas de tamaño: hacia dónde (ZIP1) o desde dónde (ZIP2).
+
+        in_zip1 indica en qué lado está la entrada; por defecto, si tiene datos en ZIP1 (los
+        directorios implícitos no los tienen: véase DiffResult.present()).
+        """
+        if not self.counterpart:
+            return ''
+        in_zip1 = bool(self.info1) if in_zip1 is None else in_zip1
+        edited = f", {self.similarity:.0%} similar" if self.similarity is not None else ''
+        return f" (movido {'a' if in_zip1 else 'desde'} {self.counterpart}{edited})"
+
+
+@dataclass
+class DiffEntry(_EntryMethods):
+    """Entrada del modelo de diferencias (archivo o directorio presente en algún ZIP).
+
+    Es la forma independiente que generan iter_diff() y stream_diff(); dentro de un DiffResult las
+    entradas se guardan en columnas y se leen a través de vistas StoredEntry con los mismos atributos.
+    """
+    path: str
+    is_dir: bool
+    status: str = None
+    info1: MemberInfo = None
+    info2: MemberInfo = None
+    hash1: str = None  # Hash de contenido en ZIP1 (verificación 'hash' sin atajo de datos comprimidos)
+    hash2: str = None
+    diff_offset: int = None  # Primer byte distinto (solo con verificación byte a byte)
+    counterpart: str = None  # Ruta del otro extremo de un archivo movido (estado 'moved')
+    similarity: float = None  # Similitud estimada con counterpart si se movió con ediciones (modo 'similar')
+
+
+def _extra_property(key, doc):
+    """Atributo de StoredEntry guardado en el diccionario disperso del almacén."""
+    return property(lambda self: self._store.get_extra(self.row, key),
+                    lambda self, value: self._store.set_extra(self.row, key, value), doc=doc)
+
+
+class StoredEntry(_EntryMethods):
+    """Vista de una fila de un DiffResult con los atributos de DiffEntry.
+
+    No copia nada: cada atributo se lee de las columnas del EntryStore y las asignaciones se
+    escriben en ellas, así que varias vistas de la misma fila ven siempre los mismos datos.
+    """
+    __slots__ = ('_store', 'row')
+
+    def __init__(self, store, row):
+        self._store = store
+        self.row = row
+
+    def __eq__(self, other):
+        return isinstance(other, StoredEntry) and other._store is self._store and other.row == self.row
+
+    def __hash__(self):
+        return hash((id(self._store), self.row))
+
+    def __repr__(self):
+        return f"StoredEntry({self.path!r}, status={self.status!r})"
+
+    @property
+    def path(self):
+        return self._store.path(self.row)
+
+    @property
+    def is_dir(self):
+        return self._store.is_dir(self.row)
+
+    @property
+    def status(self):
+        store = self._store
+        return store.statuses[store.status[self.row]]
+
+    @status.setter
+    def status(self, status):
+        self._store.status[self.row] = self._store.status_code(status)
+
+    @property
+    def info1(self):
+        fields1 = self._store.fields(self.row, 1)
+        return fields1 and MemberInfo(*fields1)
+
+    @property
+    def info2(self):
+        fields2 = self._store.fields(self.row, 2)
+        return fields2 and MemberInfo(*fields2)
+
+    hash1 = _extra_property('hash1', "Hash de contenido en ZIP1")
+    hash2 = _extra_property('hash2', "Hash de contenido en ZIP2")
+    diff_offset = _extra_property('diff_offset', "Primer byte distinto (verificación byte a byte)")
+    counterpart = _extra_property('counterpart', "Ruta del otro extremo de un archivo movido")
+    similarity = _extra_property('similarity', "Similitud estimada con counterpart (modo 'similar')")
+
+
+class EntryList(Sequence):
+    """Secuencia de vistas de las entradas del listado de un DiffResult, en orden de ruta."""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self):
+        return len(self._store.listed)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [StoredEntry(self._store, row) for row in self._store.listed[index]]
+        return StoredEntry(self._store, self._store.listed[index])
+
+    def __iter__(self):
+        store = self._store
+        return (StoredEntry(store, row) for row in store.listed)
+
+
+class NodeIndex(Mapping):
+    """Índice ruta -> StoredEntry de todos los nodos (directorios implícitos incluidos), padres antes que hijos."""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self):
+        return len(self._store)
+
+    def __getitem__(self, path):
+        row = self._store.find(path)
+        if row is None:
+            raise KeyError(path)
+        return StoredEntry(self._store, row)
+
+    def __contains__(self, path):
+        return self._store.find(path) is not None
+
+    def __iter__(self):
+        store = self._store
+        return (store.path(row) for row in range(len(store)))
+
+    def values(self):
+        store = self._store
+        return [StoredEntry(store, row) for row in range(len(store))]
+
+
+class ChildIndex(Mapping):
+    """Índice ruta de directorio -> rutas de sus hijos en orden, calculadas al consultarlo."""
+
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self):
+        return len(self._store.children)
+
+    def __getitem__(self, dir_path):
+        store = self._store
+        row = store.dir_rows.get(dir_path)
+        if row is None:
+            raise KeyError(dir_path)
+        return [store.path(child) for child in store.children[row]]
+
+    def __contains__(self, dir_path):
+        return dir_path in self._store.dir_rows
+
+    def __iter__(self):
+        # children guarda cada directorio después de su padre
+        return (self._store.dir_paths[row] for row in self._store.children)
+
+
+class DiffResult:
+    """Resultado de comparar dos ZIPs: entradas ordenadas por ruta y agregados por directorio.
+
+    Las entradas se guardan en un zip_entry_store.EntryStore (columnas compactas); entries, nodes
+    y children son vistas sobre él con la interfaz de una lista y de diccionarios por ruta.
+    Los agregados por directorio (dir_tags, dir_bytes, dir_hashes) son diccionarios por ruta.
+    """
+
+    def __init__(self, zip1, zip2, count1=0, count2=0):
+        self.zip1 = zip1
+        self.zip2 = zip2
+        self.count1 = count1
+        self.count2 = count2
+        self.store = EntryStore()
+        self.entries = EntryList(self.store)
+        self.nodes = NodeIndex(self.store)
+        self.children = ChildIndex(self.store)
+        self.dir_tags = {}  # Ruta de directorio -> Counter de estados (si contiene archivos)
+        self.dir_bytes = {}  # Ruta de directorio -> (bytes en ZIP1, bytes en ZIP2)
+        self.dir_hashes = {}  # Ruta de directorio -> (hash de Merkle en ZIP1, en ZIP2) o None
+        self.moved_dirs = []  # Parejas (directorio en ZIP1, directorio en ZIP2) movidos
+
+    def entry(self, row):
+        """Vista de una fila del almacén."""
+        return StoredEntry(self.store, row)
+
+    def child_entries(self, dir_path):
+        """Vistas de los hijos directos de un directorio, sin buscarlos por ruta."""
+        store = self.store
+        return [StoredEntry(store, row) for row in store.children[store.dir_rows[dir_path]]]
+
+    def _dir_row(self, dir_path):
+        """Fila de un directorio, creándolo (y sus padres) como directorio implícito si falta."""
+        row = self.store.dir_rows.get(dir_path)
+        if row is None:
+            parent = parent_path(dir_path)
+            row = self.store.append(self._dir_row(parent), dir_path[len(parent):], True)
+        return row
+
+    def add_row(self, path, is_dir, status=None, fields1=None, fields2=None):
+        """Añade una entrada del listado a partir de sus campos y devuelve su fila.
+
+        Los directorios intermedios que falten se crean como implícitos; un directorio implícito que
+        aparece después como entrada del ZIP se completa con sus datos.
+        """
+        store = self.store
+        if is_dir and path in store.dir_rows:
+            row = store.dir_rows[path]
+            store.mark_listed(row, fields1, fields2)
+            return row
+        parent = parent_path(path)
+        return store.append(self._dir_row(parent), path[len(parent):], is_dir, status, fields1, fields2, listed=True)
+
+    def add_entry(self, entry):
+        """Añade una entrada del listado (DiffEntry) y devuelve su vista (los agregados se calculan
+        después con aggregate_dirs())."""
+        row = self.add_row(entry.path, entry.is_dir, entry.status, entry.info1, entry.info2)
+        stored = StoredEntry(self.store, row)
+        for key in ('hash1', 'hash2', 'diff_offset', 'counterpart', 'similarity'):
+            value = getattr(entry, key)
+            if value is not None:
+                setattr(stored, key, value)
+        return stored
+
+    def aggregate_dirs(self):
+        """Calcula dir_tags, dir_bytes y dir_hashes de abajo arriba.
+
+        Los recuentos y bytes salen de zip_columnar.dir_rollups() (vectorizados si hay NumPy).
+        children guarda cada directorio después de su padre, así que recorrido al revés cada
+        directorio se procesa después de todos sus subdirectorios y solo suma a sus hijos directos.
+        El hash de Merkle de un lado resume los nombres, tamaños y CRC de los hijos presentes en
+        ese lado (los subdirectorios, por su propio hash); es None si el directorio no está en él.
+        """
+        store = self.store
+        flags, components, names = store.flags, store.components, store.name
+        size_crc1, size_crc2 = store.sides[0].size_crc, store.sides[1].size_crc
+        row_tags, row_bytes = dir_rollups(store)
+        row_hashes = {}
+        for dir_row in reversed(store.children):
+            items1, items2 = [], []
+            for child in store.children[dir_row]:
+                name = components[names[child]]
+                if flags[child] & IS_DIR:
+                    hash1, hash2 = row_hashes[child]
+                    if hash1 is not None:
+                        items1.append((name.rstrip('/'), hash1))
+                    if hash2 is not None:
+                        items2.append((name.rstrip('/'), hash2))
+                else:
+                    if flags[child] & IN_ZIP1:
+                        items1.append((name,) + size_crc1(child))
+                    if flags[child] & IN_ZIP2:
+                        items2.append((name,) + size_crc2(child))
+            listed = flags[dir_row] if dir_row >= 0 else 0
+            # Los hijos ya están en orden de ruta en ambos lados, así que no hace falta ordenarlos
+            row_hashes[dir_row] = (_merkle(items1) if items1 or listed & IN_ZIP1 else None,
+                                   _merkle(items2) if items2 or listed & IN_ZIP2 else None)
+        dir_paths = store.dir_paths
+        self.dir_tags = {dir_paths[row]: counts for row, counts in row_tags.items()}
+        self.dir_bytes = {dir_paths[row]: value for row, value in row_bytes.items()}
+        self.dir_hashes = {dir_paths[row]: value for row, value in row_hashes.items()}
+
+    def format_dates(self, entries):
+        """Fechas (ZIP1, ZIP2) como texto de las entradas que se van a mostrar, formateadas en bloque."""
+        rows = [entry.row for entry in entries]
+        return list(zip(format_dates(self.store, rows, 1), format_dates(self.store, rows, 2)))
+
+    def present(self, entry, side):
+        """Indica si un archivo o directorio está en el ZIP indicado (1 o 2)."""
+        if entry.is_dir:
+            return self.dir_hashes.get(entry.path, (None, None))[side - 1] is not None
+        return bool(entry.info1 if side == 1 else entry.info2)
+
+    def same_subtree(self, dir_path):
+        """Indica en O(1) si un directorio es idéntico en ambos ZIPs (mismo hash de Merkle y sin diferencias)."""
+        hash1, hash2 = self.dir_hashes.get(dir_path, (None, None))
+        # Los recuentos recogen además fechas distintas o diferencias halladas al verificar el contenido
+        return hash1 is not None and hash1 == hash2 and self.dir_status(dir_path) == SAME
+
+    def set_status(self, entry, status):
+        """Cambia el estado de un archivo ya agregado, actualizando los recuentos de sus directorios."""
+        for dir_path in parent_dirs(entry.path):
+            counts = self.dir_tags[dir_path]
+            counts[entry.status] -= 1
+            counts[status] += 1
+        entry.status = status
+
+    def dir_status(self, dir_path):
+        """Devuelve 'dir_diff' si algún archivo del directorio difiere, 'same' si no."""
+        counts = self.dir_tags.get(dir_path)
+        if counts and any(counts[s] for s in DIFF_STATUSES):
+            return DIR_DIFF
+        return SAME
+
+    def dir_changes(self, dir_path):
+        """Resumen de los archivos con diferencias de un directorio, p. ej. '12 cambiados / 3 añadidos'."""
+        counts = self.dir_tags.get(dir_path)
+        if not counts:
+            return ''
+        return ' / '.join(f"{counts[status]} {label}" for status, label in CHANGE_LABELS if counts[status])
+
+    def summary(self):
+        """Devuelve el recuento total de archivos por estado (el agregado de la raíz)."""
+        return +self.dir_tags.get('', Counter())
+
+
+def _merkle(items):
+    """Hash de Merkle de un directorio a partir de las tuplas de sus hijos."""
+    return hashlib.blake2b(repr(items).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def result_to_data(result):
+    """Convierte un DiffResult en tuplas de tipos básicos (serializables con marshal).
+
+    Se guardan las entradas del listado con los campos de cada lado y los datos dispersos por fila.
+    """
+    store = result.store
+    return (result.count1, result.count2, result.moved_dirs,
+            [(store.path(row), store.is_dir(row), store.statuses[store.status[row]], store.fields(row, 1),
+              store.fields(row, 2), store.extra.get(row)) for row in store.listed])
+
+
+def result_from_data(zip1_file, zip2_file, data):
+    """Reconstruye un DiffResult (índice y agregados incluidos) a partir de result_to_data()."""
+    count1, count2, moved_dirs, entries = data
+    result = DiffResult(zip1_file, zip2_file, count1=count1, count2=count2)
+    store = result.store
+    for path, is_dir, status, fields1, fields2, extra in entries:
+        row = result.add_row(path, is_dir, status, fields1, fields2)
+        if extra:
+            store.extra[row] = dict(extra)
+    result.aggregate_dirs()
+    for old_dir, new_dir in moved_dirs:
+        _pair_dirs(result, old_dir, new_dir)
+    return result
+
+
+def read_listing(zip_file, fast=True):
+    """Lee el listado de un ZIP como diccionario nombre -> tupla con los campos de MemberInfo.
+
+    Por defecto usa el lector rápido del directorio central; con fast=False usa zipfile.ZipFile.
+    """
+    # Como getinfo(), ante nombres duplicados se conserva la última entrada
+    if fast:
+        return dict(iter_central_directory(zip_file))
+    with zipfile.ZipFile(zip_file) as z:
+        return {info.filename: (info.file_size, info.CRC, info.date_time, info.compress_size,
+                                info.compress_type, info.header_offset, info.flag_bits)
+                for info in z.infolist()}
+
+
+def read_sorted_listing(zip_file, fast=True, cache=None):
+    """Lee el listado de un ZIP como lista de (nombre, campos) ordenada por nombre, sin nombres repetidos.
+
+    cache, si se indica, es una zip_cache.ListingCache: un ZIP sin cambios no se vuelve a analizar.
+    El listado se guarda ya ordenado, así que al leerlo de la caché ordenarlo es un recorrido lineal.
+    """
+    if cache is None:
+        return sorted(read_listing(zip_file, fast).items(), key=itemgetter(0))
+    listing = cache.load_listing(zip_file, lambda: dict(sorted(read_listing(zip_file, fast).items(), key=itemgetter(0))))
+    return sorted(listing.items(), key=itemgetter(0))
+
+
+def read_members(zip_file, fast=True, cache=None):
+    """Lee el listado de un ZIP y devuelve un diccionario nombre -> MemberInfo, ordenado por nombre.
+
+    cache, si se indica, es una zip_cache.ListingCache: un ZIP sin cambios no se vuelve a analizar.
+    """
+    return {name: MemberInfo(*fields) for name, fields in read_sorted_listing(zip_file, fast, cache)}
+
+
+def merge_listings(listing1, listing2):
+    """Recorre a la par dos listados ordenados de read_sorted_listing() y genera (nombre, campos1, campos2).
+
+    campos1 o campos2 es None si el nombre solo está en uno de los dos listados.
+    """
+    iter1, iter2 = iter(listing1), iter(listing2)
+    item1, item2 = next(iter1, None), next(iter2, None)
+    while item1 is not None and item2 is not None:
+        if item1[0] == item2[0]:
+            yield item1[0], item1[1], item2[1]
+            item1, item2 = next(iter1, None), next(iter2, None)
+        elif item1[0] < item2[0]:
+            yield item1[0], item1[1], None
+            item1 = next(iter1, None)
+        else:
+            yield item2[0], None, item2[1]
+            item2 = next(iter2, None)
+    while item1 is not None:
+        yield item1[0], item1[1], None
+        item1 = next(iter1, None)
+    while item2 is not None:
+        yield item2[0], None, item2[1]
+        item2 = next(iter2, None)
+
+
+def classify(inf1, inf2):
+    """Clasifica un archivo según su presencia, tamaño/CRC y fecha en cada ZIP."""
+    if inf1 is None:
+        return ONLY_ZIP2
+    if inf2 is None:
+        return ONLY_ZIP1
+    if inf1.file_size != inf2.file_size or inf1.CRC != inf2.CRC:
+        return CONTENT_DIFF
+    if inf1.date_time != inf2.date_time:
+        return DATE_DIFF
+    return SAME
+
+
+def parent_path(full_path):
+    """Devuelve la ruta del directorio padre de una entrada ('' para la raíz)."""
+    head = full_path.rstrip('/').rpartition('/')[0]
+    return head + '/' if head else ''
+
+
+def parent_dirs(full_path):
+    """Devuelve las rutas de los directorios ancestros de una entrada, incluida la raíz ''.
+
+    Se obtienen con parent_path(), igual que el índice de directorios, así que coinciden con sus
+    claves también con nombres como '/abs/x', 'a//b' o 'x/./y'.
+    """
+    dirs = []
+    while full_path:
+        full_path = parent_path(full_path)
+        dirs.append(full_path)
+    return dirs
+
+
+def iter_diff(listing1, listing2, cancel=None):
+    """Genera, en orden de ruta, un DiffEntry clasificado por cada miembro de dos listados ordenados.
+
+    Los listados (de read_sorted_listing()) se recorren a la par con merge_listings(), sin construir
+    la unión de nombres; los MemberInfo se crean al generar cada entrada. Las entradas no se
+    guardan en ningún DiffResult, así que el consumidor decide qué conservar.
+    """
+    logger.info(f"Encontrados {len(listing1)} archivos en ZIP1, {len(listing2)} en ZIP2")
+    unique = 0
+    for unique, (full_path, fields1, fields2) in enumerate(merge_listings(listing1, listing2), 1):
+        if unique % PROGRESS_INTERVAL == 0:
+            check_cancel(cancel)
+        inf1 = MemberInfo(*fields1) if fields1 else None
+        inf2 = MemberInfo(*fields2) if fields2 else None
+        if full_path.endswith('/'):
+            yield DiffEntry(full_path, True, None, inf1, inf2)
+            continue
+        tag = classify(inf1, inf2)
+        logger.debug(f"Archivo clasificado: {full_path}, Etiqueta: {tag}")
+        yield DiffEntry(full_path, False, tag, inf1, inf2)
+    logger.info(f"Total de miembros únicos: {unique}")
+
+
+def stream_diff(zip1_file, zip2_file, verify=None, hash_algorithm=DEFAULT_HASH_ALGORITHM, workers=None,
+                cancel=None, cache=None, hash_cache=None):
+    """Compara dos ZIPs generando cada DiffEntry, con su estado final, en cuanto está clasificado.
+
+    A diferencia de compare_zips() no se construye ningún DiffResult: la memoria no crece con el
+    número de entradas ya generadas. Con verify, las entradas se verifican en paralelo y se
+    generan en el mismo orden, con una ventana acotada de entradas pendientes.
+    """
+    listing1 = read_sorted_listing(zip1_file, cache=cache)
+    check_cancel(cancel)
+    listing2 = read_sorted_listing(zip2_file, cache=cache)
+    check_cancel(cancel)
+    entries = iter_diff(listing1, listing2, cancel)
+    if not verify:
+        yield from entries
+        return
+    for entry, differs in iter_verified(zip1_file, zip2_file, entries, verify, hash_algorithm, workers,
+                                        cancel, hash_cache):
+        if differs:
+            entry.status = CONTENT_DIFF
+        yield entry
+
+
+def result_variant(verify=None, hash_algorithm=DEFAULT_HASH_ALGORITHM, moves=None, similarity=SIMILARITY_THRESHOLD):
+    """Identifica el tipo de comparación para la caché de resultados (verificación, algoritmo y movidos)."""
+    if verify == VERIFY_HASH:
+        variant = f"{verify}:{hash_algorithm}"
+    else:
+        variant = verify or 'listado'
+    if moves == MOVES_SIMILAR:
+        return f"{variant}+moves:{moves}:{similarity}"
+    return f"{variant}+moves:{moves}" if moves else variant
+
+
+def compare_zips(zip1_file, zip2_file, progress=None, cancel=None, verify=None,
+                 hash_algorithm=DEFAULT_HASH_ALGORITHM, workers=None, cache=None, hash_cache=None,
+                 result_cache=None, moves=None, similarity=SIMILARITY_THRESHOLD):
+    """Compara dos archivos ZIP y devuelve un DiffResult, sin depender de Tk.
+
+    progress, si se indica, se llama como progress(entradas, total_entradas, bytes, total_bytes).
+    cancel, si se indica, es un threading.Event; al activarse se lanza CompareCancelled.
+    verify ('hash' o 'bytes') activa además la verificación de contenido con verify_content().
+    cache, si se indica, es una zip_cache.ListingCache para reutilizar los listados ya analizados,
+    y hash_cache una zip_cache.HashCache para reutilizar los hashes de contenido.
+    result_cache, si se indica, es una zip_cache.ResultCache: si ninguno de los dos ZIPs ha cambiado
+    desde una comparación anterior del mismo tipo, se devuelve ese resultado sin abrirlos.
+    moves ('crc' o 'hash') activa la detección de archivos movidos o renombrados con detect_moves();
+    con 'similar' se buscan además con detect_similar() los renombrados con ediciones, con una
+    similitud estimada de al menos similarity.
+    """
+    if result_cache is not None:
+        variant = result_variant(verify, hash_algorithm, moves, similarity)
+        # Las huellas se calculan antes de leer los ZIPs, como en ListingCache
+        key, data = result_cache.load(zip1_file, zip2_file, variant)
+        if data is not None:
+            return result_from_data(zip1_file, zip2_file, data)
+
+    listing1 = read_sorted_listing(zip1_file, cache=cache)
+    check_cancel(cancel)
+    listing2 = read_sorted_listing(zip2_file, cache=cache)
+    check_cancel(cancel)
+
+    # El progreso cuenta entradas de ambos listados: la unión no se conoce hasta recorrerlos
+    total = len(listing1) + len(listing2)
+    total_bytes = sum(f[0] for _, f in listing1) + sum(f[0] for _, f in listing2)
+    done = done_bytes = 0
+
+    result = DiffResult(zip1_file, zip2_file, count1=len(listing1), count2=len(listing2))
+    logger.info(f"Encontrados {len(listing1)} archivos en ZIP1, {len(listing2)} en ZIP2")
+    unique = 0
+    for full_path, fields1, fields2 in merge_listings(listing1, listing2):
+        if unique % PROGRESS_INTERVAL == 0:
+            check_cancel(cancel)
+            if progress:
+                progress(done, total, done_bytes, total_bytes)
+        unique += 1
+        if fields1:
+            done += 1
+            done_bytes += fields1[0]
+        if fields2:
+            done += 1
+            done_bytes += fields2[0]
+        # Los archivos se clasifican después, todos a la vez, sobre las columnas del almacén
+        result.add_row(full_path, full_path.endswith('/'), None, fields1, fields2)
+    # Todo está ya en el almacén: los listados no deben seguir en memoria durante el resto de pasos
+    del listing1, listing2
+    logger.info(f"Total de miembros únicos: {unique}")
+    classify_rows(result.store, (ONLY_ZIP1, ONLY_ZIP2, CONTENT_DIFF, DATE_DIFF, SAME))
+    result.aggregate_dirs()
+
+    if progress:
+        progress(total, total, done_bytes, total_bytes)
+    if verify:
+        verify_content(result, verify, hash_algorithm, workers, progress, cancel, hash_cache)
+    if moves:
+        detect_moved_dirs(result)
+        detect_moves(result, confirm=moves == MOVES_HASH, algorithm=hash_algorithm, workers=workers, cancel=cancel)
+    if moves == MOVES_SIMILAR:
+        detect_similar(result, similarity, workers, cancel)
+    if result_cache is not None:
+        result_cache.store(key, variant, result_to_data(result))
+    return result
+
+
+# ZIPs abiertos durante la verificación y hashes ya conocidos de cada uno ({(posición, CRC): hash})
+VerifyArchives = namedtuple('VerifyArchives', 'zip1 zip2 map1 map2 known1 known2')
+
+
+def _raw_equal(archives, entry, cancel):
+    """Atajo: datos comprimidos idénticos con el mismo método implican contenido idéntico."""
+    return (can_compare_raw(entry.info1, entry.info2)
+            and raw_streams_equal(archives.map1, entry.info1, archives.map2, entry.info2, cancel=cancel))
+
+
+def _hash_side(archive, mapping, name, info, algorithm, cancel):
+    if is_stored(info):
+        with mapping.data_range(info) as view:
+            return hash_view(view, algorithm, cancel=cancel)
+    return hash_member(archive, name, algorithm, cancel=cancel)
+
+
+def _hash_pair(archives, entry, algorithm, cancel):
+    info1, info2 = entry.info1, entry.info2
+    entry.hash1 = archives.known1.get((info1.header_offset, info1.CRC))
+    entry.hash2 = archives.known2.get((info2.header_offset, info2.CRC))
+    if entry.hash1 is None or entry.hash2 is None:
+        if _raw_equal(archives, entry, cancel):
+            # Mismo contenido: el hash conocido de un lado vale para el otro
+            entry.hash1 = entry.hash2 = entry.hash1 or entry.hash2
+            return False
+        if entry.hash1 is None:
+            entry.hash1 = _hash_side(archives.zip1, archives.map1, entry.path, info1, algorithm, cancel)
+        if entry.hash2 is None:
+            entry.hash2 = _hash_side(archives.zip2, archives.map2, entry.path, info2, algorithm, cancel)
+    return entry.hash1 != entry.hash2
+
+
+def _compare_pair(archives, entry, algorithm, cancel):
+    if _raw_equal(archives, entry, cancel):
+        return False
+    if is_stored(entry.info1) and is_stored(entry.info2):
+        # Entradas sin comprimir: se comparan directamente sobre la proyección en memoria
+        with archives.map1.data_range(entry.info1) as view1, archives.map2.data_range(entry.info2) as view2:
+            entry.diff_offset = views_first_mismatch(view1, view2, cancel=cancel)
+    else:
+        entry.diff_offset = compare_members(archives.zip1, entry.path, archives.zip2, entry.path, cancel=cancel)
+    if entry.diff_offset is not None:
+        logger.debug(f"Primera diferencia en {entry.path}: byte {entry.diff_offset}")
+    return entry.diff_offset is not None
+
+
+def _new_hashes(entries, known, side):
+    """Hashes calculados en esta verificación que aún no estaban en la caché."""
+    digests = {}
+    for entry in entries:
+        info, digest = (entry.info1, entry.hash1) if side == 1 else (entry.info2, entry.hash2)
+        key = (info.header_offset, info.CRC)
+        if digest is not None and key not in known:
+            digests[key] = digest
+    return digests
+
+
+def _verify_statuses(mode):
+    """Tarea y estados candidatos de cada modo de verificación."""
+    if mode == VERIFY_BYTES:
+        return _compare_pair, (SAME, DATE_DIFF, CONTENT_DIFF)
+    return _hash_pair, (SAME, DATE_DIFF)
+
+
+def iter_verified(zip1_file, zip2_file, entries, mode=VERIFY_HASH, algorithm=DEFAULT_HASH_ALGORITHM,
+                  workers=None, cancel=None, hash_cache=None):
+    """Verifica en un grupo de hilos el contenido de un iterable de DiffEntry y genera (entrada, difiere).
+
+    Las entradas se generan en el mismo orden en que llegan; las que no son candidatas del modo
+    (directorios, entradas de un solo ZIP...) pasan con difiere=False. Como mucho hay workers * 4
+    entradas pendientes, así que el iterable puede ser un generador de cualquier tamaño.
+    hash_cache, si se indica, es una zip_cache.HashCache: los hashes ya calculados en sesiones
+    anteriores no se recalculan y los nuevos se guardan cada HASH_FLUSH_ENTRIES entradas
+    verificadas y al terminar (también si se cancela).
+    """
+    task, statuses = _verify_statuses(mode)
+    workers = workers or default_workers()
+    use_cache = hash_cache is not None and mode == VERIFY_HASH
+    fingerprint1, known1 = hash_cache.load(zip1_file, algorithm) if use_cache else (None, {})
+    fingerprint2, known2 = hash_cache.load(zip2_file, algorithm) if use_cache else (None, {})
+    verified = []  # Entradas verificadas cuyos hashes aún no se han guardado en la caché
+
+    def store_hashes():
+        hash_cache.store(fingerprint1, algorithm, _new_hashes(verified, known1, 1))
+        hash_cache.store(fingerprint2, algorithm, _new_hashes(verified, known2, 2))
+        verified.clear()
+
+    def finished(entry, future):
+        # Resultado de una entrada ya terminada; sus hashes quedan pendientes de guardar
+        differs = future is not None and future.result()
+        if use_cache and future is not None:
+            verified.append(entry)
+            if len(verified) >= HASH_FLUSH_ENTRIES:
+                store_hashes()
+        return differs
+
+    try:
+        with zipfile.ZipFile(zip1_file) as z1, zipfile.ZipFile(zip2_file) as z2, \
+                ArchiveMapping(zip1_file) as map1, ArchiveMapping(zip2_file) as map2, \
+                ThreadPoolExecutor(max_workers=workers) as pool:
+            archives = VerifyArchives(z1, z2, map1, map2, known1, known2)
+            # Ventana acotada de entradas en orden; cada una con su Future, o None si no se verifica
+            pending = deque()
+            try:
+                for entry in entries:
+                    candidate = not entry.is_dir and entry.status in statuses
+                    future = pool.submit(task, archives, entry, algorithm, cancel) if candidate else None
+                    pending.append((entry, future))
+                    while pending and (len(pending) >= workers * 4 or pending[0][1] is None or pending[0][1].done()):
+                        check_cancel(cancel)
+                        entry, future = pending.popleft()
+                        yield entry, finished(entry, future)
+                while pending:
+                    check_cancel(cancel)
+                    entry, future = pending.popleft()
+                    yield entry, finished(entry, future)
+            finally:
+                for _, future in pending:
+                    if future is not None:
+                        future.cancel()
+    finally:
+        if use_cache:
+            store_hashes()
+
+
+def verify_content(result, mode=VERIFY_HASH, algorithm=DEFAULT_HASH_ALGORITHM, workers=None,
+                   progress=None, cancel=None, hash_cache=None):
+    """Verifica el contenido de las entradas leyéndolas por bloques en un grupo de hilos.
+
+    En modo 'hash' se calcula un hash criptográfico de las entradas cuyo tamaño y CRC coinciden
+    (DiffEntry.hash1/hash2). En modo 'bytes' se comparan a la par todas las entradas presentes en
+    ambos ZIPs, parando en la primera diferencia (DiffEntry.diff_offset). Las entradas que no
+    coinciden pasan a 'content_diff'. hashlib y zlib liberan el GIL, así que los hilos escalan.
+    En ambos modos se comparan primero los datos comprimidos y solo se descomprime si difieren;
+    las entradas STORED se leen directamente de la proyección en memoria de cada ZIP.
+    hash_cache, si se indica, es una zip_cache.HashCache (ver iter_verified()).
+    """
+    _, statuses = _verify_statuses(mode)
+    candidates = [e for e in result.entries if not e.is_dir and e.status in statuses]
+    total = len(candidates)
+    total_bytes = sum(e.info1.file_size + e.info2.file_size for e in candidates)
+    done_bytes = 0
+    logger.info(f"Verificando contenido de {total} archivos en modo {mode} ({workers or default_workers()} hilos)")
+
+    last_progress = time.monotonic()
+    for done, (entry, differs) in enumerate(iter_verified(result.zip1, result.zip2, candidates, mode, algorithm,
+                                                          workers, cancel, hash_cache), 1):
+        if differs and entry.status != CONTENT_DIFF:
+            result.set_status(entry, CONTENT_DIFF)
+            logger.debug(f"Contenido distinto con igual tamaño y CRC: {entry.path}")
+        done_bytes += entry.info1.file_size + entry.info2.file_size
+        if progress and time.monotonic() - last_progress >= PROGRESS_SECONDS:
+            last_progress = time.monotonic()
+            progress(done, total, done_bytes, total_bytes)
+    if progress:
+        progress(total, total, done_bytes, total_bytes)
+
+    return result
+
+
+def _move_candidates(result):
+    """Empareja los archivos solo en ZIP1 con los solo en ZIP2 por (tamaño, CRC), en tiempo lineal.
+
+    Se prefieren parejas con el mismo nombre (archivo movido de directorio) y después cualquiera
+    con el mismo contenido (renombrado). Los archivos vacíos no se emparejan: todos coinciden.
+    """
+    # Colas de archivos de ZIP1 por (tamaño, CRC, nombre) y por (tamaño, CRC), en orden de ruta
+    by_name, by_key = {}, {}
+    for entry in result.entries:
+        if entry.status == ONLY_ZIP1 and entry.info1.file_size:
+            key = (entry.info1.file_size, entry.info1.CRC)
+            by_name.setdefault(key + (entry.name,), deque()).append(entry)
+            by_key.setdefault(key, deque()).append(entry)
+    taken = set()
+
+    def take(queue):
+        # Cada archivo está en dos colas: los ya emparejados se descartan al llegar a ellos
+        while queue:
+            old = queue.popleft()
+            if old.path not in taken:
+                taken.add(old.path)
+                return old
+        return None
+
+    pairs, unmatched = [], []
+    for entry in result.entries:
+        if entry.status != ONLY_ZIP2 or not entry.info2.file_size:
+            continue
+        key = (entry.info2.file_size, entry.info2.CRC)
+        old = take(by_name.get(key + (entry.name,), ()))
+        if old:
+            pairs.append((old, entry))
+        else:
+            unmatched.append(entry)
+    for entry in unmatched:
+        old = take(by_key.get((entry.info2.file_size, entry.info2.CRC), ()))
+        if old:
+            pairs.append((old, entry))
+    return pairs
+
+
+def _same_content(archives, old, new, algorithm, cancel):
+    """Confirma que dos entradas en rutas distintas tienen el mismo contenido (datos comprimidos o hash)."""
+    if can_compare_raw(old.info1, new.info2) and raw_streams_equal(archives.map1, old.info1, archives.map2,
+                                                                     new.info2, cancel=cancel):
+        return True
+    return (_hash_side(archives.zip1, archives.map1, old.path, old.info1, algorithm, cancel)
+            == _hash_side(archives.zip2, archives.map2, new.path, new.info2, algorithm, cancel))
+
+
+def _pair_dirs(result, old_dir, new_dir):
+    """Marca como movidos los dos extremos de un directorio movido y, a la par, todo su contenido."""
+    result.moved_dirs.append((old_dir, new_dir))
+    pending = [old_dir]
+    while pending:
+        old_path = pending.pop()
+        new_path = new_dir + old_path[len(old_dir):]
+        old, new = result.nodes[old_path], result.nodes[new_path]
+        old.counterpart, new.counterpart = new_path, old_path
+        if old.is_dir:
+            pending.extend(result.children[old_path])
+        else:
+            result.set_status(old, MOVED)
+            result.set_status(new, MOVED)
+
+
+def detect_moved_dirs(result):
+    """Empareja directorios completos que solo están en ZIP1 con otros que solo están en ZIP2 y tienen el
+    mismo hash de Merkle (mismos nombres, tamaños y CRC en todo el subárbol).
+
+    Se emparejan los directorios más externos posibles: un directorio dentro de otro ya emparejado no
+    se vuelve a considerar. Los archivos de cada pareja quedan como 'moved' con su counterpart, igual
+    que con detect_moves(). Devuelve la lista de parejas (ruta en ZIP1, ruta en ZIP2).
+    """
+    hashes = result.dir_hashes
+    candidates = {}
+    for dir_path, (hash1, hash2) in hashes.items():
+        # Solo directorios con archivos (los vacíos coinciden todos) presentes en un único lado
+        if dir_path and hash1 is None and hash2 is not None and result.dir_tags.get(dir_path):
+            candidates.setdefault(hash2, deque()).append(dir_path)
+    paired1, paired2 = set(), set()
+    # Ancestros de los directorios de ZIP2 ya emparejados: contienen alguno y no se pueden emparejar
+    enclosing2 = set()
+
+    def overlaps(dir_path):
+        # Emparejado, dentro de un directorio ya emparejado o conteniendo alguno (coste: su profundidad)
+        return (dir_path in paired2 or dir_path in enclosing2
+                or any(parent in paired2 for parent in parent_dirs(dir_path)))
+
+    pairs = []
+    # children está en orden de ruta, así que los directorios externos se ven antes que los internos
+    for dir_path in result.children:
+        hash1, hash2 = hashes[dir_path]
+        if not dir_path or hash2 is not None or hash1 not in candidates or not result.dir_tags.get(dir_path):
+            continue
+        if any(parent in paired1 for parent in parent_dirs(dir_path)):
+            continue
+        queue = candidates[hash1]
+        while queue and overlaps(queue[0]):
+            queue.popleft()
+        if not queue:
+            continue
+        new_dir = queue.popleft()
+        paired1.add(dir_path)
+        paired2.add(new_dir)
+        enclosing2.update(parent_dirs(new_dir))
+        pairs.append((dir_path, new_dir))
+    for old_dir, new_dir in pairs:
+        _pair_dirs(result, old_dir, new_dir)
+        logger.debug(f"Directorio movido: {old_dir} -> {new_dir}")
+    logger.info(f"Detectados {len(pairs)} directorios movidos o renombrados")
+    return pairs
+
+
+def detect_moves(result, confirm=False, algorithm=DEFAULT_HASH_ALGORITHM, workers=None, cancel=None):
+    """Marca como 'moved' las parejas de archivos solo en ZIP1 / solo en ZIP2 con el mismo contenido.
+
+    Las parejas se buscan con un hash join por (tamaño, CRC) (ver _move_candidates()); con confirm
+    se comprueba además el contenido en un grupo de hilos. Cada extremo queda con estado 'moved'
+    y la ruta del otro en DiffEntry.counterpart. Devuelve la lista de parejas (entrada ZIP1, entrada ZIP2).
+    """
+    pairs = _move_candidates(result)
+    check_cancel(cancel)
+    if confirm and pairs:
+        with zipfile.ZipFile(result.zip1) as z1, zipfile.ZipFile(result.zip2) as z2, \
+                ArchiveMapping(result.zip1) as map1, ArchiveMapping(result.zip2) as map2, \
+                ThreadPoolExecutor(max_workers=workers or default_workers()) as pool:
+            archives = VerifyArchives(z1, z2, map1, map2, {}, {})
+            confirmed = pool.map(lambda pair: _same_content(archives, *pair, algorithm, cancel), pairs)
+            pairs = [pair for pair, same in zip(pairs, confirmed) if same]
+    for old, new in pairs:
+        result.set_status(old, MOVED)
+        result.set_status(new, MOVED)
+        old.counterpart, new.counterpart = new.path, old.path
+        logger.debug(f"Archivo movido: {old.path} -> {new.path}")
+    logger.info(f"Detectados {len(pairs)} archivos movidos o renombrados")
+    return pairs
+
+
+def _sketch_side(archive, entries, side, workers, cancel):
+    """Sketches de las entradas de texto de un lado ({ruta: sketch}).
+
+    Los hilos solo leen y descomprimen las entradas (zlib libera el GIL). MinHash es Python puro y
+    en hilos se ejecutaría de uno en uno, así que los sketches se calculan en un grupo de procesos
+    (ver _sketch_in_processes()). Con menos de SKETCH_PROCESS_MIN_BYTES en total, con un solo
+    trabajador o si no se pueden arrancar los procesos, se calculan en este proceso, también por
+    tandas de workers * 4 entradas para no tener todos los textos leídos en memoria a la vez.
+    """
+    workers = workers or default_workers()
+
+    def read(entry):
+        return member_text(archive, entry.path, entry.info1 if side == 1 else entry.info2, cancel)
+
+    with ThreadPoolExecutor(max_workers=workers) as readers:
+        total = sum((e.info1 if side == 1 else e.info2).file_size for e in entries)
+        if total >= SKETCH_PROCESS_MIN_BYTES and workers > 1:
+            try:
+                return _sketch_in_processes(readers, read, entries, workers, cancel)
+            except (BrokenProcessPool, OSError) as e:
+                logger.warning(f"No se pudieron calcular los sketches en procesos ({e}); se calculan en este")
+        found = {}
+        window = workers * 4
+        for start in range(0, len(entries), window):
+            chunk = entries[start:start + window]
+            for entry, data in zip(chunk, readers.map(read, chunk)):
+                sketch = text_sketch(data)
+                if sketch is not None:
+                    found[entry.path] = sketch
+            check_cancel(cancel)
+    check_cancel(cancel)
+    return found
+
+
+def _sketch_in_processes(readers, read, entries, workers, cancel):
+    """Sketches de las entradas calculados en un grupo de procesos, a partir de los bytes que leen los hilos.
+
+    Las lecturas van por tandas de workers * 4 entradas, que se solapan con los sketches de la tanda
+    anterior, así que como mucho hay dos tandas en memoria.
+    """
+    found = {}
+    window = workers * 4
+    pending = deque()  # (ruta, Future del sketch), en orden
+    # 'spawn': los procesos no heredan los hilos (ni Tk) de este proceso
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as sketchers:
+        try:
+            for start in range(0, len(entries), window):
+                chunk = entries[start:start + window]
+                for entry, data in zip(chunk, readers.map(read, chunk)):
+                    if data:
+                        pending.append((entry.path, sketchers.submit(text_sketch, data)))
+                check_cancel(cancel)
+                while len(pending) > window or (pending and start + window >= len(entries)):
+                    path, future = pending.popleft()
+                    sketch = future.result()
+                    if sketch is not None:
+                        found[path] = sketch
+        finally:
+            for _, future in pending:
+                future.cancel()
+    check_cancel(cancel)
+    return found
+
+
+def detect_similar(result, threshold=SIMILARITY_THRESHOLD, workers=None, cancel=None):
+    """Marca como 'moved' las parejas de archivos de texto solo en ZIP1 / solo en ZIP2 con contenido parecido.
+
+    Complementa a detect_moves() para los archivos renombrados y editados: cada entrada de texto sin
+    pareja se resume en un sketch MinHash y las parejas candidatas salen de los cubos LSH
+    (zip_similarity.match_sketches()), sin comparar todas con todas. Cada extremo queda con la ruta
+    del otro en counterpart y la similitud estimada en similarity. Devuelve la lista de
+    (entrada ZIP1, entrada ZIP2, similitud).
+    """
+    only1 = [e for e in result.entries if e.status == ONLY_ZIP1 and 0 < e.info1.file_size <= MAX_TEXT_SIZE]
+    only2 = [e for e in result.entries if e.status == ONLY_ZIP2 and 0 < e.info2.file_size <= MAX_TEXT_SIZE]
+    if not only1 or not only2:
+        return []
+    with zipfile.ZipFile(result.zip1) as z1, zipfile.ZipFile(result.zip2) as z2:
+        sketches1 = _sketch_side(z1, only1, 1, workers, cancel)
+        sketches2 = _sketch_side(z2, only2, 2, workers, cancel)
+    pairs = []
+    for path1, path2, similarity in match_sketches(sketches1, sketches2, threshold):
+        old, new = result.nodes[path1], result.nodes[path2]
+        result.set_status(old, MOVED)
+        result.set_status(new, MOVED)
+        old.counterpart, new.counterpart = path2, path1
+        old.similarity = new.similarity = similarity
+        pairs.append((old, new, similarity))
+        logger.debug(f"Archivo movido con cambios: {path1} -> {path2} (similitud {similarity:.0%})")
+    logger.info(f"Detectados {len(pairs)} archivos movidos o renombrados con cambios "
+                f"({len(sketches1)} + {len(sketches2)} textos comparados)")
+    return pairs
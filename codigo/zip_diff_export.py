@@ -0,0 +1,62 @@
+# Exportación de diferencias de ZIP en streaming
+#
+# Descripción:
+# Escribe un registro por entrada, a medida que el motor las genera (zip_diff_engine.stream_diff),
+# sin esperar al resultado completo, para que otras herramientas (jq, tuberías de logs) empiecen a
+# consumirlo en seguida y la memoria no crezca con el tamaño de los ZIPs.
+# - NDJSON: un objeto JSON por línea.
+# - CSV: cabecera y una fila por entrada.
+# - Cada registro lleva la ruta, el estado y el tamaño, la fecha y el CRC de cada lado, y para los
+#   archivos movidos, la ruta del otro extremo (y la similitud estimada si se movieron con cambios).
+#
+# Dependencias:
+# - Python 3.x
+# - csv, json (módulos estándar de Python)
+
+import csv
+import json
+
+# Fecha ISO 8601 formateada directamente de la tupla date_time: datetime no admite la fecha DOS
+# cero (1980-00-00) que tienen muchos ZIPs reales
+ISO_DATE_FORMAT = '%04d-%02d-%02dT%02d:%02d:%02d'
+
+# Campos de cada registro, en el orden de las columnas CSV
+RECORD_FIELDS = ('path', 'is_dir', 'status', 'size1', 'date1', 'crc1', 'size2', 'date2', 'crc2', 'counterpart', 'similarity')
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+
+
+def entry_record(entry):
+    """Convierte un DiffEntry en un diccionario con los campos de RECORD_FIELDS."""
+    record = {'path': entry.path, 'is_dir': entry.is_dir, 'status': entry.status}
+    for side, info in (('1', entry.info1), ('2', entry.info2)):
+        record['size' + side] = info.file_size if info else None
+        record['date' + side] = ISO_DATE_FORMAT % info.date_time if info else None
+        record['crc' + side] = f"{info.CRC:08x}" if info else None
+    record['counterpart'] = entry.counterpart
+    record['similarity'] = entry.similarity
+    return record
+
+
+def write_ndjson(entries, out):
+    """Escribe un objeto JSON por línea para cada entrada. Devuelve el número de registros."""
+    count = 0
+    for entry in entries:
+        out.write(json.dumps(entry_record(entry), ensure_ascii=False))
+        out.write('\n')
+        count += 1
+    return count
+
+
+def write_csv(entries, out):
+    """Escribe una cabecera y una fila CSV por entrada. Devuelve el número de registros."""
+    writer = csv.DictWriter(out, fieldnames=RECORD_FIELDS, lineterminator='\n')
+    writer.writeheader()
+    count = 0
+    for entry in entries:
+        writer.writerow(entry_record(entry))
+        count += 1
+    return count
+
+
+WRITERS = {'ndjson': write_ndjson, 'csv': write_csv}
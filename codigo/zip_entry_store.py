@@ -0,0 +1,213 @@
+# Almacén compacto de entradas del modelo de diferencias
+#
+# Descripción:
+# Guarda las entradas de una comparación (archivos y directorios de ambos ZIPs) en columnas
+# paralelas (array y bytearray) en lugar de un objeto Python por entrada y lado, para que
+# comparar ZIPs con millones de entradas no necesite gigabytes de memoria.
+# - Cada fila guarda el índice de su directorio padre y el componente final de su ruta; los
+#   componentes se guardan una sola vez (internados), así que los nombres repetidos no ocupan más.
+# - Las rutas completas solo se guardan para los directorios; la de un archivo se obtiene uniendo
+#   la de su padre y su componente.
+# - Por cada lado, un registro binario de tamaño fijo: tamaño, CRC, fecha DOS empaquetada, tamaño
+#   comprimido, método, posición de la cabecera y flags, con una marca de presencia.
+# - Los datos poco frecuentes (hashes, primera diferencia, otro extremo de un movido...) van en un
+#   diccionario disperso por fila.
+# - Los hijos de cada directorio se guardan en orden de ruta, así que se buscan por bisección.
+#
+# Dependencias:
+# - Python 3.x
+# - array, struct (módulos estándar de Python)
+
+import struct
+from array import array
+
+# Bits de la columna de marcas
+IS_DIR = 1
+LISTED = 2  # Entrada del listado de algún ZIP (no un directorio implícito)
+IN_ZIP1 = 4
+IN_ZIP2 = 8
+
+ROOT = -1  # Fila "padre" de las entradas de primer nivel
+
+
+def pack_dos(date_time):
+    """Empaqueta la tupla date_time de zipfile en los 32 bits de fecha y hora DOS del ZIP."""
+    year, month, day, hour, minute, second = date_time
+    return (year - 1980) << 25 | month << 21 | day << 16 | hour << 11 | minute << 5 | second >> 1
+
+
+def unpack_dos(value):
+    """Inversa de pack_dos() (los segundos DOS tienen resolución de 2 s, como en el propio ZIP)."""
+    return ((value >> 25) + 1980, (value >> 21) & 0xF, (value >> 16) & 0x1F,
+            (value >> 11) & 0x1F, (value >> 5) & 0x3F, (value & 0x1F) * 2)
+
+
+# Registro de los datos de un lado: tamaño, CRC, fecha DOS, tamaño comprimido, método, posición de
+# la cabecera y flags (en el orden de los campos de MemberInfo)
+RECORD = struct.Struct('<QIIQHQH')
+_HEAD = struct.Struct('<QI')  # Solo tamaño y CRC, al principio del registro
+_EMPTY_RECORD = bytes(RECORD.size)
+
+
+class _SideRecords:
+    """Datos de un lado (ZIP1 o ZIP2): un registro de tamaño fijo por fila en un único bytearray."""
+    __slots__ = ('data',)
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def append(self, fields):
+        if not fields:
+            self.data += _EMPTY_RECORD
+            return
+        size, crc, date_time, compress_size, compress_type, offset, flag_bits = fields
+        self.data += RECORD.pack(size, crc, pack_dos(date_time), compress_size, compress_type, offset, flag_bits)
+
+    def set(self, row, fields):
+        size, crc, date_time, compress_size, compress_type, offset, flag_bits = fields
+        RECORD.pack_into(self.data, row * RECORD.size, size, crc, pack_dos(date_time), compress_size,
+                          compress_type, offset, flag_bits)
+
+    def get(self, row):
+        size, crc, dos, compress_size, compress_type, offset, flag_bits = RECORD.unpack_from(self.data,
+                                                                                             row * RECORD.size)
+        return size, crc, unpack_dos(dos), compress_size, compress_type, offset, flag_bits
+
+    def size_crc(self, row):
+        """(tamaño, CRC) de una fila, sin decodificar el resto del registro."""
+        return _HEAD.unpack_from(self.data, row * RECORD.size)
+
+    def nbytes(self):
+        return len(self.data)
+
+
+class EntryStore:
+    """Entradas de una comparación en columnas paralelas, con filas en orden de ruta.
+
+    Las filas se añaden con append() con los padres antes que los hijos y en orden de ruta (como
+    las genera el recorrido a la par de los listados ordenados); los campos de cada lado son las
+    tuplas (file_size, CRC, date_time, compress_size, compress_type, header_offset, flag_bits).
+    """
+
+    def __init__(self):
+        self.components = []  # Id -> componente final de la ruta (con '/' final en directorios)
+        self._component_ids = {}
+        self.name = array('I')  # Fila -> id del componente
+        self.parent = array('i')  # Fila -> fila del directorio padre (ROOT en el primer nivel)
+        self.flags = bytearray()
+        self.status = bytearray()  # Fila -> código de estado (índice en statuses)
+        self.statuses = [None]
+        self._status_codes = {None: 0}
+        self.sides = (_SideRecords(), _SideRecords())
+        self.listed = array('I')  # Filas de las entradas del listado, en orden
+        self.children = {ROOT: array('I')}  # Fila de directorio -> filas hijas en orden de ruta
+        self.dir_paths = {ROOT: ''}  # Fila de directorio -> ruta completa
+        self.dir_rows = {'': ROOT}  # Ruta completa de directorio -> fila
+        self.extra = {}  # Fila -> {atributo: valor} para los datos poco frecuentes
+
+    def __len__(self):
+        return len(self.name)
+
+    def _component_id(self, component):
+        component_id = self._component_ids.get(component)
+        if component_id is None:
+            component_id = self._component_ids[component] = len(self.components)
+            self.components.append(component)
+        return component_id
+
+    def status_code(self, status):
+        """Código de un estado en la columna status (se registra la primera vez que aparece)."""
+        code = self._status_codes.get(status)
+        if code is None:
+            code = self._status_codes[status] = len(self.statuses)
+            self.statuses.append(status)
+        return code
+
+    def append(self, parent_row, component, is_dir, status=None, fields1=None, fields2=None, listed=False):
+        """Añade una fila hija de parent_row y devuelve su índice."""
+        row = len(self.name)
+        self.name.append(self._component_id(component))
+        self.parent.append(parent_row)
+        self.flags.append((IS_DIR if is_dir else 0) | (LISTED if listed else 0)
+                          | (IN_ZIP1 if fields1 else 0) | (IN_ZIP2 if fields2 else 0))
+        self.status.append(self.status_code(status))
+        self.sides[0].append(fields1)
+        self.sides[1].append(fields2)
+        self.children[parent_row].append(row)
+        if listed:
+            self.listed.append(row)
+        if is_dir:
+            self.children[row] = array('I')
+            path = self.dir_paths[parent_row] + component
+            self.dir_paths[row] = path
+            self.dir_rows[path] = row
+        return row
+
+    def mark_listed(self, row, fields1=None, fields2=None):
+        """Convierte un directorio implícito en entrada del listado, completando los datos que falten."""
+        if not self.flags[row] & LISTED:
+            self.flags[row] |= LISTED
+            self.listed.append(row)
+        for side, (flag, fields) in enumerate(((IN_ZIP1, fields1), (IN_ZIP2, fields2))):
+            if fields and not self.flags[row] & flag:
+                self.flags[row] |= flag
+                self.sides[side].set(row, fields)
+
+    def path(self, row):
+        """Ruta completa de una fila."""
+        if row in self.dir_paths:
+            return self.dir_paths[row]
+        return self.dir_paths[self.parent[row]] + self.components[self.name[row]]
+
+    def component(self, row):
+        return self.components[self.name[row]]
+
+    def is_dir(self, row):
+        return bool(self.flags[row] & IS_DIR)
+
+    def fields(self, row, side):
+        """Tupla de campos de una fila en el lado indicado (1 o 2), o None si no está en ese ZIP."""
+        if not self.flags[row] & (IN_ZIP1 if side == 1 else IN_ZIP2):
+            return None
+        return self.sides[side - 1].get(row)
+
+    def find(self, path):
+        """Fila de una ruta, o None si no está. Los hijos se buscan por bisección."""
+        row = self.dir_rows.get(path)
+        if row is not None:
+            return row
+        head = path.rstrip('/').rpartition('/')[0]
+        parent = head + '/' if head else ''
+        children = self.children.get(self.dir_rows.get(parent))
+        if not children:
+            return None
+        component = path[len(parent):]
+        components, name = self.components, self.name
+        low, high = 0, len(children)
+        while low < high:
+            middle = (low + high) // 2
+            if components[name[children[middle]]] < component:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(children) and components[name[children[low]]] == component:
+            return children[low]
+        return None
+
+    def get_extra(self, row, key):
+        extra = self.extra.get(row)
+        return extra.get(key) if extra else None
+
+    def set_extra(self, row, key, value):
+        if value is None:
+            extra = self.extra.get(row)
+            if extra:
+                extra.pop(key, None)
+            return
+        self.extra.setdefault(row, {})[key] = value
+
+    def nbytes(self):
+        """Memoria aproximada de las columnas (sin contar los componentes ni los diccionarios)."""
+        return (sum(len(column) * column.itemsize for column in (self.name, self.parent, self.listed))
+                + len(self.flags) + len(self.status) + sum(side.nbytes() for side in self.sides)
+                + sum(len(children) * children.itemsize for children in self.children.values()))
@@ -0,0 +1,229 @@
+# Informe HTML autocontenido de la comparación de ZIP
+#
+# Descripción:
+# Genera un único archivo HTML, sin recursos externos, que reproduce los dos árboles coloreados lado a
+# lado y la leyenda de main(), para compartir resultados con quien no tiene el comparador.
+# - No se genera un nodo del DOM por entrada: los hijos de cada directorio se guardan como un bloque
+#   JSON comprimido (zlib) en base64 dentro del propio archivo, y el navegador solo lo descomprime
+#   (DecompressionStream) y lo pinta al expandir ese directorio. Al abrir solo se pinta la raíz.
+# - Los directorios con muchos hijos se pintan por tramos ("Mostrar más").
+# - Ambos lados comparten fila, así que el desplazamiento y la expansión van siempre sincronizados.
+#
+# Dependencias:
+# - Python 3.x
+# - base64, html, json, re, zlib, datetime (módulos estándar de Python)
+# - zip_diff_engine
+
+import base64
+import html
+import json
+import re
+import zlib
+from datetime import datetime
+
+from zip_diff_engine import TAG_STYLES, FILE_STATUSES
+
+# Textos de la leyenda de main() y su etiqueta de color
+LEGEND = (('Solo ZIP1', 'only_zip1'), ('Solo ZIP2', 'only_zip2'), ('Contenido Diferente', 'content_diff'),
+          ('Fecha Diferente', 'date_diff'), ('Movido', 'moved'), ('Idéntico', 'same'), ('Marcador', 'placeholder'),
+          ('Directorio con Diferencias', 'dir_diff'))
+
+# Filas que se pintan de cada vez al expandir un directorio
+PAGE_SIZE = 1000
+
+
+def css_color(tk_color):
+    """Traduce un nombre de color de Tk a CSS (CSS no conoce los grises 'grayNN' de Tk)."""
+    match = re.fullmatch(r'gr[ae]y(\d{1,3})', tk_color)
+    if match:
+        level = round(int(match.group(1)) * 255 / 100)
+        return f'#{level:02x}{level:02x}{level:02x}'
+    return tk_color
+
+
+def _row(result, entry, chunk_ids, dates):
+    """Fila compacta de un nodo: [nombre, etiqueta1, etiqueta2, tamaño1, fecha1, tamaño2, fecha2, bloque].
+
+    dates son sus fechas (ZIP1, ZIP2) ya formateadas; bloque es el índice del bloque con los hijos
+    del directorio, o -1 si no tiene hijos.
+    """
+    if entry.is_dir:
+        tag = result.dir_status(entry.path) if entry.path in result.dir_tags else ''
+        tag1 = tag2 = tag
+    else:
+        tag1, tag2 = entry.side_tag(1), entry.side_tag(2)
+    info1, info2 = entry.info1, entry.info2
+    size1 = f"{info1.file_size} bytes" if info1 else ''
+    size2 = f"{info2.file_size} bytes" if info2 else ''
+    date1, date2 = dates
+    if entry.diff_offset is not None:
+        size1 += f" (dif. en byte {entry.diff_offset})"
+        size2 += f" (dif. en byte {entry.diff_offset})"
+    if entry.counterpart:
+        if entry.info1:
+            size1 += entry.move_note()
+        else:
+            size2 += entry.move_note()
+    return [entry.name, tag1, tag2, size1, date1, size2, date2, chunk_ids.get(entry.path, -1)]
+
+
+def build_chunks(result):
+    """Devuelve la lista de bloques comprimidos en base64; el bloque 0 son los hijos de la raíz."""
+    chunk_ids = {}
+    for dir_path, children in result.children.items():
+        if children:
+            chunk_ids[dir_path] = len(chunk_ids)
+    chunks = []
+    for dir_path in chunk_ids:
+        entries = result.child_entries(dir_path)
+        # Fechas del bloque formateadas de una vez, con el mismo formato que las columnas de los Treeview
+        rows = [_row(result, entry, chunk_ids, dates) for entry, dates in zip(entries, result.format_dates(entries))]
+        data = json.dumps(rows, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        chunks.append(base64.b64encode(zlib.compress(data, 6)).decode('ascii'))
+    return chunks
+
+
+def _styles():
+    rules = []
+    for tag, style in TAG_STYLES.items():
+        rule = f"background:{css_color(style['background'])}"
+        if 'foreground' in style:
+            rule += f";color:{css_color(style['foreground'])}"
+        rules.append(f".t-{tag}{{{rule}}}")
+    return '\n'.join(rules)
+
+
+TEMPLATE = '''<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: Arial, sans-serif; font-size: 13px; margin: 10px; }}
+h1 {{ font-size: 16px; }}
+.legend span {{ padding: 1px 4px; margin-right: 4px; }}
+table {{ border-collapse: collapse; width: 100%; table-layout: fixed; }}
+th {{ text-align: left; background: #eee; position: sticky; top: 0; }}
+td, th {{ padding: 1px 6px; white-space: nowrap; overflow: hidden; text-overflow: ellipsis; }}
+td.sep, th.sep {{ width: 6px; background: #ccc; padding: 0; }}
+.toggle {{ cursor: pointer; display: inline-block; width: 14px; }}
+.more td {{ cursor: pointer; color: #0645ad; }}
+{styles}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<p>ZIP 1: {zip1} ({count1} entradas)<br>ZIP 2: {zip2} ({count2} entradas)<br>{summary}<br>Generado: {generated}</p>
+<p class="legend"><b>Leyenda:</b> {legend}</p>
+<table>
+<colgroup><col style="width:26%"><col style="width:12%"><col style="width:12%"><col class="sep">
+<col style="width:26%"><col style="width:12%"><col style="width:12%"></colgroup>
+<thead><tr><th>Archivos ZIP 1</th><th>Tamaño</th><th>Fecha</th><th class="sep"></th>
+<th>Archivos ZIP 2</th><th>Tamaño</th><th>Fecha</th></tr></thead>
+<tbody id="rows"></tbody>
+</table>
+<script id="chunks" type="application/json">{chunks}</script>
+<script>
+const PAGE_SIZE = {page_size};
+const CHUNKS = JSON.parse(document.getElementById('chunks').textContent);
+const decoded = new Map();
+const tbody = document.getElementById('rows');
+
+async function loadChunk(id) {{
+  if (!decoded.has(id)) {{
+    const bytes = Uint8Array.from(atob(CHUNKS[id]), c => c.charCodeAt(0));
+    const stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('deflate'));
+    decoded.set(id, JSON.parse(await new Response(stream).text()));
+  }}
+  return decoded.get(id);
+}}
+
+function cell(tr, text, tag, cls) {{
+  const td = tr.insertCell();
+  td.textContent = text;
+  if (tag) td.className = 't-' + tag;
+  if (cls) td.classList.add(cls);
+  return td;
+}}
+
+function makeRow(row, depth) {{
+  const [name, tag1, tag2, size1, date1, size2, date2, chunk] = row;
+  const tr = document.createElement('tr');
+  tr.dataset.depth = depth;
+  for (const [tag, size, date, side] of [[tag1, size1, date1, 1], [tag2, size2, date2, 2]]) {{
+    if (side === 2) cell(tr, '', '', 'sep');
+    const td = cell(tr, '', tag);
+    td.style.paddingLeft = (6 + depth * 16) + 'px';
+    const marker = document.createElement('span');
+    marker.className = 'toggle';
+    if (chunk >= 0) {{
+      marker.textContent = '\\u25b8';
+      marker.onclick = () => toggle(tr, chunk);
+    }}
+    td.append(marker, name);
+    td.title = name;
+    cell(tr, size, tag);
+    cell(tr, date, tag);
+  }}
+  return tr;
+}}
+
+function insertRows(after, rows, start, depth, chunk) {{
+  const fragment = document.createDocumentFragment();
+  const end = Math.min(rows.length, start + PAGE_SIZE);
+  for (let i = start; i < end; i++) fragment.append(makeRow(rows[i], depth));
+  if (end < rows.length) {{
+    const more = document.createElement('tr');
+    more.className = 'more';
+    more.dataset.depth = depth;
+    const td = more.insertCell();
+    td.colSpan = 7;
+    td.style.paddingLeft = (6 + depth * 16) + 'px';
+    td.textContent = 'Mostrar más (' + (rows.length - end) + ' restantes)';
+    td.onclick = () => {{ insertRows(more, rows, end, depth, chunk); more.remove(); }};
+    fragment.append(more);
+  }}
+  if (after) after.after(fragment); else tbody.append(fragment);
+}}
+
+async function toggle(tr, chunk) {{
+  const depth = Number(tr.dataset.depth);
+  const markers = tr.querySelectorAll('.toggle');
+  if (tr.dataset.open) {{
+    delete tr.dataset.open;
+    while (tr.nextSibling && Number(tr.nextSibling.dataset.depth) > depth) tr.nextSibling.remove();
+    markers.forEach(m => m.textContent = '\\u25b8');
+    return;
+  }}
+  tr.dataset.open = '1';
+  markers.forEach(m => m.textContent = '\\u25be');
+  insertRows(tr, await loadChunk(chunk), 0, depth + 1, chunk);
+}}
+
+if (!window.DecompressionStream) {{
+  tbody.innerHTML = '<tr><td colspan="7">Este navegador no admite DecompressionStream; use uno más reciente.</td></tr>';
+}} else if (CHUNKS.length) {{
+  loadChunk(0).then(rows => insertRows(null, rows, 0, 0, 0));
+}}
+</script>
+</body>
+</html>
+'''
+
+
+def render_html(result, title='Comparación de ZIP'):
+    """Devuelve el informe HTML autocontenido de un DiffResult."""
+    summary = result.summary()
+    legend = ''.join(f'<span class="t-{tag}">{html.escape(text)}</span>' for text, tag in LEGEND)
+    return TEMPLATE.format(
+        title=html.escape(title), zip1=html.escape(str(result.zip1)), zip2=html.escape(str(result.zip2)),
+        count1=result.count1, count2=result.count2,
+        summary=html.escape(', '.join(f"{status}: {summary[status]}" for status in FILE_STATUSES)),
+        generated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'), legend=legend, styles=_styles(),
+        chunks=json.dumps(build_chunks(result)), page_size=PAGE_SIZE)
+
+
+def write_html_report(result, path, title='Comparación de ZIP'):
+    """Escribe el informe HTML de un DiffResult en path."""
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(render_html(result, title))
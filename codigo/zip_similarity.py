@@ -0,0 +1,152 @@
+# Similitud aproximada de entradas de texto (MinHash y LSH)
+#
+# Descripción:
+# Funciones para detectar archivos renombrados o movidos que además se han editado ligeramente,
+# que la detección exacta por (tamaño, CRC) de zip_diff_engine no puede emparejar.
+# - Cada entrada de texto se resume en un sketch MinHash de tamaño fijo (NUM_PERM enteros) calculado
+#   sobre sus shingles (secuencias de SHINGLE_SIZE palabras consecutivas); la fracción de posiciones
+#   iguales de dos sketches estima la similitud de Jaccard de sus contenidos. Se usa la variante de
+#   una sola permutación (cada shingle se hashea una vez y cae en una de las NUM_PERM posiciones, que
+#   guarda el mínimo), de coste lineal en el número de shingles en vez de NUM_PERM veces mayor.
+# - Las entradas binarias (con bytes nulos), vacías o mayores que MAX_TEXT_SIZE no se resumen.
+# - Los candidatos se proponen con LSH: el sketch se divide en BANDS bandas y dos entradas son
+#   candidatas si coinciden en alguna banda completa, sin comparar todas las parejas (N×M).
+# - Las parejas candidatas con similitud estimada >= umbral se asignan de mayor a menor similitud,
+#   cada entrada como mucho una vez.
+#
+# Dependencias:
+# - Python 3.x
+# - random, re, zlib (módulos estándar de Python)
+
+import random
+import re
+import zlib
+
+# Umbral de similitud estimada (Jaccard) por defecto para aceptar una pareja
+SIMILARITY_THRESHOLD = 0.8
+
+# Tamaño del sketch y división en bandas para LSH (BANDS * ROWS == NUM_PERM). Con 16 bandas de 4 filas,
+# una pareja con similitud 0.8 es candidata con probabilidad > 0.99 y una con 0.3, con menos de 0.13.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Palabras por shingle
+SHINGLE_SIZE = 3
+
+# Las entradas mayores no se resumen (se leen completas en memoria)
+MAX_TEXT_SIZE = 4 * 1024 * 1024
+
+# Bytes iniciales en los que se buscan bytes nulos para descartar entradas binarias
+TEXT_SAMPLE_SIZE = 8192
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MASK = (1 << 64) - 1
+_WORD = re.compile(rb'\w+')
+
+# Permutación h -> (a*h + b) mod p; fija para que los sketches sean reproducibles
+_rng = random.Random(0x5EED)
+_A, _B = _rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME)
+del _rng
+_EMPTY = _MERSENNE_PRIME
+
+
+def is_text(data):
+    """Indica si un contenido parece texto (sin bytes nulos al principio)."""
+    return b'\0' not in data[:TEXT_SAMPLE_SIZE]
+
+
+def shingles(data, size=SHINGLE_SIZE):
+    """Devuelve los shingles de un texto: tuplas con los CRC de size palabras consecutivas."""
+    words = [zlib.crc32(word) for word in _WORD.findall(data)]
+    if len(words) < size:
+        return {tuple(words)} if words else set()
+    return set(zip(*(words[i:] for i in range(size))))
+
+
+def minhash(shingle_set):
+    """Sketch MinHash (tupla de NUM_PERM enteros) de un conjunto de shingles no vacío.
+
+    Una sola permutación: el resto módulo NUM_PERM elige la posición y el cociente es el valor.
+    Las posiciones vacías toman el valor de la siguiente ocupada (densificación por rotación),
+    desplazado según la distancia, para que sigan siendo comparables entre sketches.
+    """
+    sketch = [_EMPTY] * NUM_PERM
+    for s in shingle_set:
+        value, position = divmod((_A * (hash(s) & _MASK) + _B) % _MERSENNE_PRIME, NUM_PERM)
+        if value < sketch[position]:
+            sketch[position] = value
+    if _EMPTY in sketch:
+        occupied = list(sketch)
+        for i in range(NUM_PERM):
+            distance = 0
+            while occupied[(i + distance) % NUM_PERM] == _EMPTY:
+                distance += 1
+            sketch[i] = occupied[(i + distance) % NUM_PERM] + distance * _EMPTY
+    return tuple(sketch)
+
+
+def text_sketch(data):
+    """Sketch MinHash de un contenido, o None si es binario o no tiene palabras."""
+    if not data or len(data) > MAX_TEXT_SIZE or not is_text(data):
+        return None
+    shingle_set = shingles(data)
+    return minhash(shingle_set) if shingle_set else None
+
+
+def member_text(archive, name, info, cancel=None):
+    """Contenido de una entrada de un zipfile.ZipFile abierto que se puede resumir, o None.
+
+    info es su MemberInfo; el tamaño se comprueba antes de leer el contenido y los binarios se
+    descartan después.
+    """
+    if cancel is not None and cancel.is_set():
+        return None
+    if not info.file_size or info.file_size > MAX_TEXT_SIZE:
+        return None
+    data = archive.read(name)
+    return data if is_text(data) else None
+
+
+def member_sketch(archive, name, info, cancel=None):
+    """Sketch MinHash de una entrada de un zipfile.ZipFile abierto, o None si no es texto."""
+    return text_sketch(member_text(archive, name, info, cancel))
+
+
+def estimate_similarity(sketch1, sketch2):
+    """Similitud de Jaccard estimada: fracción de posiciones iguales de dos sketches."""
+    return sum(h1 == h2 for h1, h2 in zip(sketch1, sketch2)) / NUM_PERM
+
+
+def _bands(sketch):
+    return ((band, sketch[band * ROWS:(band + 1) * ROWS]) for band in range(BANDS))
+
+
+def match_sketches(sketches1, sketches2, threshold=SIMILARITY_THRESHOLD):
+    """Empareja claves de sketches1 y sketches2 ({clave: sketch}) con similitud estimada >= threshold.
+
+    Devuelve una lista de (clave1, clave2, similitud), de mayor a menor similitud; cada clave
+    aparece como mucho una vez. Solo se estiman las parejas que coinciden en alguna banda LSH.
+    """
+    buckets = {}
+    for key1, sketch in sketches1.items():
+        for band in _bands(sketch):
+            buckets.setdefault(band, []).append(key1)
+    scored = []
+    for key2, sketch in sketches2.items():
+        candidates = set()
+        for band in _bands(sketch):
+            candidates.update(buckets.get(band, ()))
+        for key1 in candidates:
+            similarity = estimate_similarity(sketches1[key1], sketch)
+            if similarity >= threshold:
+                scored.append((similarity, key1, key2))
+    # Orden determinista: mayor similitud primero y, a igualdad, por claves
+    scored.sort(key=lambda item: (-item[0], item[1], item[2]))
+    used1, used2, pairs = set(), set(), []
+    for similarity, key1, key2 in scored:
+        if key1 not in used1 and key2 not in used2:
+            used1.add(key1)
+            used2.add(key2)
+            pairs.append((key1, key2, similarity))
+    return pairs